@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from shemul.app import App  # noqa: E402
+from shemul.autocomplete import complete  # noqa: E402
+from shemul.command import Command  # noqa: E402
+from shemul.config import ConfigLoader, ShemulConfig  # noqa: E402
+from shemul.executor import Executor  # noqa: E402
+from shemul.pool import ShellPool, pool_supported  # noqa: E402
+from shemul.util import find_upward  # noqa: E402
+from shemul.version import __version__  # noqa: E402
+
+
+SIZES = [10, 100, 1000, 10000]
+SCHEMA_PATH = ROOT / "src" / "shemul" / "schema.json"
+GROUPS = ["core", "db", "quality", "build", "deploy", "setup"]
+VERBS = ["up", "down", "test", "lint", "build", "migrate", "deploy", "logs", "shell", "seed"]
+
+Case = Tuple[str, Callable[[], Any], int]
+
+
+def generate_config(size: int, seed: int = 7, var_count: Optional[int] = None) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    var_count = var_count if var_count is not None else max(1, size // 10)
+    variables = {f"VAR_{index}": f"value-{index}" for index in range(var_count)}
+    commands: Dict[str, Any] = {}
+    for index in range(size):
+        verb = VERBS[index % len(VERBS)]
+        name = f"{verb}:{index}"
+        tokens = " ".join("{{" + f"VAR_{rng.randrange(var_count)}" + "}}" for _ in range(3))
+        command: Dict[str, Any] = {
+            "run": f"docker compose exec svc-{index % 17} {verb} {tokens} -f {{{{env.compose}}}}",
+            "desc": f"Synthetic {verb} command {index}",
+            "group": GROUPS[index % len(GROUPS)],
+            "env": "local",
+        }
+        if index % 13 == 0:
+            command["confirm"] = True
+        commands[name] = command
+    return {
+        "name": f"bench-{size}",
+        "version": "1.0.0",
+        "env": {"local": {"compose": "docker-compose.yml"}},
+        "vars": variables,
+        "commands": commands,
+    }
+
+
+def write_config(directory: Path, size: int, seed: int = 7) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / "shemul.json"
+    path.write_text(json.dumps(generate_config(size, seed), indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        func()
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _cases(workdir: Path, sizes: List[int], quick: bool, stack: ExitStack) -> List[Case]:
+    cases: List[Case] = []
+    scale = 1 if quick else 5
+
+    cases.append(("startup.import_cli", lambda: _spawn([sys.executable, "-c", "import shemul.cli"]), 1))
+    cases.append(("startup.version", lambda: _spawn([sys.executable, "-m", "shemul.cli", "--version"]), 1))
+
+    for size in sizes:
+        project_dir = workdir / f"project-{size}"
+        global_dir = workdir / f"global-{size}"
+        project_path = write_config(project_dir, size, seed=size)
+        global_path = write_config(global_dir, size, seed=size + 1)
+        number = max(1, scale * 200 // size)
+
+        def load(path: Path = project_path, lazy: bool = False) -> ShemulConfig:
+            return ConfigLoader(SCHEMA_PATH, lazy=lazy).load(path)
+
+        project_cfg = load()
+        global_cfg = load(global_path)
+        loader = ConfigLoader(SCHEMA_PATH)
+        names = sorted(project_cfg.commands)
+        target = names[len(names) // 2]
+        app = App()
+        stack.callback(app.close)
+
+        cases.append((f"config.load[{size}]", load, number))
+        cases.append((f"config.load_lazy[{size}]", lambda path=project_path: load(path, lazy=True).commands, number))
+        cases.append((f"config.merge[{size}]", lambda p=project_cfg, g=global_cfg: loader.merge(p, g), number))
+        cases.append((f"autocomplete.complete[{size}]", lambda n=names: complete([n[0][:3]], n), number * 5))
+        cases.append((f"app.suggest[{size}]", lambda c=project_cfg, t=target: app.suggest(c, t + "x"), max(1, number // 5)))
+
+    for var_count in [10, 100, 1000]:
+        config = generate_config(10, var_count=var_count)
+        command = Command("bench", next(iter(config["commands"].values())), config["vars"], config["env"])
+        cases.append((f"command.template[vars={var_count}]", command.resolve, max(1, scale * 2000 // var_count)))
+
+    deep = workdir / "deep"
+    for index in range(40):
+        deep = deep / f"level{index}"
+    deep.mkdir(parents=True, exist_ok=True)
+    write_config(workdir / "deep", 1)
+    cases.append(("util.find_upward[depth=40]", lambda: find_upward(deep, "shemul.json"), scale * 40))
+
+    executor = Executor()
+    cases.append(("executor.spawn", lambda: executor.run("exit 0"), scale * 4))
+    if pool_supported():
+        pooled = Executor(pool=stack.enter_context(ShellPool(1)))
+        cases.append(("executor.pool", lambda: pooled.run("exit 0"), scale * 4))
+    return cases
+
+
+def _spawn(argv: List[str]) -> None:
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    subprocess.run(argv, check=True, env=env, stdout=subprocess.DEVNULL)
+
+
+def run_suite(sizes: List[int], repeat: int, quick: bool, name_filter: str = "") -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="shemul-bench-"))
+    try:
+        results: Dict[str, Any] = {}
+        with ExitStack() as stack:
+            for name, func, number in _cases(workdir, sizes, quick, stack):
+                if name_filter and name_filter not in name:
+                    continue
+                results[name] = measure(func, number=number, repeat=repeat)
+                print(f"{name:40s} {results[name]['median_s'] * 1000:10.3f} ms", file=sys.stderr)
+        return {
+            "meta": {
+                "shemul": __version__,
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "sizes": sizes,
+                "repeat": repeat,
+            },
+            "results": dict(sorted(results.items())),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for name, base in sorted(baseline.get("results", {}).items()):
+        now = current.get("results", {}).get(name)
+        if not now:
+            continue
+        ratio = now["median_s"] / base["median_s"] if base["median_s"] else 1.0
+        rows.append(
+            {
+                "name": name,
+                "baseline_s": base["median_s"],
+                "current_s": now["median_s"],
+                "ratio": ratio,
+                "regressed": ratio > 1.0 + threshold,
+            }
+        )
+    return rows
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="shemul-bench")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    run = sub.add_parser("run", help="run the benchmark suite")
+    run.add_argument("--sizes", default=",".join(str(size) for size in SIZES), help="comma separated command counts")
+    run.add_argument("--repeat", type=int, default=7, help="timed repeats per case")
+    run.add_argument("--quick", action="store_true", help="fewer iterations per repeat")
+    run.add_argument("--filter", default="", help="only run cases containing this text")
+    run.add_argument("--out", type=Path, default=None, help="write JSON results to this file")
+
+    cmp = sub.add_parser("compare", help="compare two result files")
+    cmp.add_argument("baseline", type=Path)
+    cmp.add_argument("current", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown ratio (0.15 = 15%%)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ns = _parser().parse_args(argv)
+    if ns.mode == "run":
+        sizes = [int(item) for item in ns.sizes.split(",") if item.strip()]
+        payload = run_suite(sizes, repeat=ns.repeat, quick=ns.quick, name_filter=ns.filter)
+        text = json.dumps(payload, indent=2, sort_keys=True) + "\n"
+        if ns.out:
+            ns.out.write_text(text, encoding="utf-8")
+        else:
+            sys.stdout.write(text)
+        return 0
+
+    baseline = json.loads(ns.baseline.read_text(encoding="utf-8"))
+    current = json.loads(ns.current.read_text(encoding="utf-8"))
+    rows = compare(baseline, current, ns.threshold)
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else "ok"
+        print(f"{row['name']:40s} {row['baseline_s'] * 1000:10.3f} ms -> {row['current_s'] * 1000:10.3f} ms  x{row['ratio']:.2f}  {flag}")
+    regressed = [row for row in rows if row["regressed"]]
+    if regressed:
+        print(f"{len(regressed)} case(s) regressed beyond {ns.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
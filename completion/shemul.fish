@@ -1,6 +1,6 @@
 # fish completion for shemul
 function __shemul_complete
-  set -l opts (shemul _complete -- (commandline -opc))
+  set -l opts (shemul _complete -- (commandline -opc)[2..-1] (commandline -ct))
   for o in $opts
     echo $o
   end
@@ -1,18 +1,40 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import difflib
+import os
+import shlex
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from .autocomplete import complete
-from .command import Command
+import jsonschema
+
+from .autocomplete import CompletionCache, complete
+from .cache import TaskCache
+from .command import Command, ResolvedCommand
 from .config import ConfigLoader, ShemulConfig
 from .context import ContextDiscovery, ProjectContext
+from .dynvars import VarResolver
 from .executor import Executor
-from .guard import Guard
+from .guard import ConfirmPolicy, Guard
+from .locks import CommandLock
+from .memo import ResolveCache
+from .output import OutputFilter, OutputOptions, OutputSink, Writer
+from .scheduler import Scheduler, TaskResult
+from .snapshot import Snapshot, SnapshotCommands, snapshot_path, snapshots_enabled, write_snapshot
+from .timings import Slot, TimingStore, plan
 from .ui import UI
-from .util import global_config_path
+from .util import global_config_path, is_truthy
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from .batch import BatchEntry, BatchError
+    from .logs import LogArchive
+    from .pool import ShellPool
+    from .session import ConfigSession
 
 
 @dataclass
@@ -21,24 +43,62 @@ class AppState:
     project_config: Optional[ShemulConfig]
     global_config: Optional[ShemulConfig]
     config: Optional[ShemulConfig]
+    snapshot: Optional[Path] = None
 
 
 class App:
     def __init__(self) -> None:
         self.ui = UI()
-        self.guard = Guard()
+        self.guard = Guard(ConfirmPolicy.from_env())
         self.executor = Executor()
+        self.pool: Optional[ShellPool] = None
         self.schema_path = Path(__file__).parent / "schema.json"
+        self.loader = ConfigLoader(self.schema_path)
+        self.resolved = ResolveCache()
+        self.vars = VarResolver()
+        self.completions = CompletionCache()
+        self.session: Optional[ConfigSession] = None
+
+    def batch_executor(self) -> Executor:
+        if self.pool is None:
+            from .pool import ShellPool, pool_size_from_env, pool_supported
+
+            size = pool_size_from_env()
+            if not size or not pool_supported():
+                return self.executor
+            self.pool = ShellPool(size)
+        return Executor(pool=self.pool)
 
-    def load_state(self, start: Path) -> AppState:
-        loader = ConfigLoader(self.schema_path)
+    def close(self) -> None:
+        self.resolved.flush()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.session is not None:
+            self.session.close()
+
+    def load_state(self, start: Path, use_snapshot: bool = True) -> AppState:
+        loader = self.loader
 
         context = ContextDiscovery(start).discover()
+        g_path = global_config_path()
+
+        if use_snapshot and snapshots_enabled():
+            scopes = [context.config_path if context else None, g_path if g_path.exists() else None]
+            snapshot = Snapshot.open(snapshot_path(scopes))
+            if snapshot and snapshot.is_fresh(scopes):
+                return AppState(
+                    context=context,
+                    project_config=snapshot.scope_config(0),
+                    global_config=snapshot.scope_config(1),
+                    config=snapshot.config(),
+                    snapshot=snapshot.path,
+                )
+
         project_config: Optional[ShemulConfig] = None
         if context:
             project_config = loader.load(context.config_path)
 
-        g_path = global_config_path()
         global_cfg: Optional[ShemulConfig] = None
         if g_path.exists():
             global_cfg = loader.load(g_path)
@@ -46,10 +106,40 @@ class App:
         config = loader.merge(project_config, global_cfg)
         return AppState(context=context, project_config=project_config, global_config=global_cfg, config=config)
 
+    def open_session(self, start: Path) -> ConfigSession:
+        from .session import ConfigSession
+
+        if self.session is not None:
+            self.session.close()
+        self.session = ConfigSession(self.loader, start)
+        return self.session
+
+    def session_state(self) -> AppState:
+        assert self.session is not None
+        session = self.session
+        session.refresh()
+        return AppState(
+            context=session.context,
+            project_config=session.project_config,
+            global_config=session.global_config,
+            config=session.config,
+        )
+
+    def compile(self, state: AppState) -> Optional[Path]:
+        if not state.config:
+            return None
+        scopes = [state.project_config, state.global_config]
+        target = snapshot_path([scope.path if scope else None for scope in scopes])
+        return write_snapshot(state.config, scopes, target)
+
     def list_commands(self, config: ShemulConfig) -> Dict[str, List[str]]:
+        commands = config.commands
+        if isinstance(commands, SnapshotCommands):
+            groups = commands.groups()
+        else:
+            groups = {name: str(cfg.get("group", "core")) for name, cfg in commands.items()}
         grouped: Dict[str, List[str]] = {}
-        for name, cfg in config.commands.items():
-            group = str(cfg.get("group", "core"))
+        for name, group in groups.items():
             grouped.setdefault(group, []).append(name)
         for key in grouped:
             grouped[key] = sorted(grouped[key])
@@ -58,54 +148,514 @@ class App:
     def command_names(self, config: ShemulConfig) -> List[str]:
         return sorted(config.commands.keys())
 
-    def resolve(self, config: ShemulConfig, name: str):
-        cmd_cfg = config.commands[name]
-        cmd = Command(name, cmd_cfg, config.vars, config.envs)
-        return cmd.resolve()
+    def command(self, config: ShemulConfig, name: str) -> Command:
+        return Command(
+            name,
+            config.commands[name],
+            config.vars,
+            config.envs,
+            resolver=self.vars,
+            cwd=config.path.parent,
+            commands=config.commands,
+        )
 
-    def run_command(self, config: ShemulConfig, name: str, dry: bool, trace: bool, extra_args: List[str]) -> int:
-        resolved = self.resolve(config, name)
+    def resolve(self, config: ShemulConfig, name: str, store: bool = True) -> ResolvedCommand:
+        command = self.command(config, name)
+        if command.dynamic_refs():
+            return command.resolve()
+        return self.resolved.get(config, name, command.resolve, store=store)
 
-        if extra_args:
-            resolved = resolved.__class__(
-                name=resolved.name,
-                command=resolved.command + " " + " ".join(extra_args),
-                env=resolved.env,
-                confirm=resolved.confirm,
-                danger=resolved.danger,
-                desc=resolved.desc,
-                group=resolved.group,
+    def resolve_all(self, config: ShemulConfig, names: Optional[List[str]] = None) -> Iterator[ResolvedCommand]:
+        for name in names if names is not None else self.command_names(config):
+            command = self.command(config, name)
+            if command.is_matrix:
+                yield from command.expand()
+            else:
+                yield self.resolve(config, name)
+
+    def run_command(
+        self,
+        config: ShemulConfig,
+        name: str,
+        dry: bool,
+        trace: bool,
+        extra_args: List[str],
+        jobs: Optional[int] = None,
+        root: Optional[Path] = None,
+        explain: bool = False,
+        cwd: Optional[Path] = None,
+    ) -> int:
+        command = self.command(config, name)
+        timings = TimingStore(root or Path.cwd())
+        if command.is_matrix:
+            return self._run_matrix(
+                command,
+                config,
+                dry=dry,
+                trace=trace,
+                extra_args=extra_args,
+                jobs=jobs,
+                timings=timings,
+                explain=explain,
+                root=root or Path.cwd(),
+                cwd=cwd,
             )
 
+        if command.is_pipe:
+            return self._run_pipe(config, name, dry=dry, trace=trace, extra_args=extra_args, root=root, cwd=cwd)
+
+        try:
+            resolved = self.resolve(config, name, store=dry)
+        except ValueError as exc:
+            self.ui.error(str(exc))
+            return 1
+
+        if extra_args:
+            resolved = replace(resolved, command=resolved.command + " " + " ".join(extra_args))
+
         if trace:
             env_text = "\n".join([f"{k}={v}" for k, v in resolved.env.items()]) or "(none)"
-            self.ui.panel("Trace", f"Command: {resolved.command}\nEnv: {env_text}")
-
-        if resolved.danger:
-            if not self.guard.confirm("This command is marked as dangerous. Continue?"):
-                self.ui.warn("Aborted.")
-                return 1
+            self.ui.panel("Trace", f"Command: {resolved.command}\nEnv: {env_text}" + self._reload_trace())
 
-        if resolved.confirm:
-            if not self.guard.confirm("Are you sure you want to run this command?"):
-                self.ui.warn("Aborted.")
-                return 1
+        if not self._confirm(resolved):
+            return 1
 
         if dry:
             self.ui.info(resolved.command)
             return 0
 
-        result = self.executor.run(resolved.command, env=None, dry=False)
-        if result.return_code == 0:
+        filters: Dict[str, OutputFilter] = {}
+        archive = self._log_archive(command, config)
+        project_root = root or Path.cwd()
+        scheduler = Scheduler(
+            self.executor,
+            root=project_root,
+            task_cache=self._task_cache(command, config),
+            sink_factory=lambda task: self._output_sinks(task, filters, archive, project_root),
+            timings=timings,
+            cwd=cwd,
+            locks=CommandLock(project_root, self.ui.write),
+        )
+        planned = plan([resolved.name], timings, 1)
+        task = scheduler.run([resolved])[0]
+        self._show_summaries(filters)
+        if explain:
+            self._explain_schedule(planned, [task])
+        if task.status in {"up-to-date", "cached"}:
+            self.ui.success(f"Command skipped ({task.status})")
+            return 0
+        if task.status == "skipped":
+            self.ui.success("Command skipped (already running)")
+            return 0
+        if task.status == "shared":
+            self.ui.info("Shared the result of a concurrent run")
+        if task.return_code == 0:
             self.ui.success("Command completed")
         else:
-            self.ui.error(f"Command failed with exit code {result.return_code}")
-        return result.return_code
+            self.ui.error(f"Command failed with exit code {task.return_code}")
+        return task.return_code
+
+    def run_projects(
+        self,
+        name: str,
+        projects: List[Path],
+        base: Path,
+        dry: bool,
+        trace: bool,
+        extra_args: List[str],
+        jobs: Optional[int] = None,
+        explain: bool = False,
+        changed: Optional[Dict[Path, List[Path]]] = None,
+    ) -> int:
+        from .workspace import touches_inputs
+
+        rows: List[List[str]] = []
+        code = 0
+        for root in projects:
+            label = str(root.relative_to(base)) if root != base and base in root.parents else str(root)
+            try:
+                state = self.load_state(root)
+            except (OSError, ValueError, jsonschema.ValidationError) as exc:
+                rows.append([label, "error", "-", str(exc)])
+                code = code or 1
+                continue
+            config = state.config
+            if config is None or name not in config.commands:
+                rows.append([label, "skipped", "-", f"no {name} command"])
+                continue
+            if changed is not None:
+                inputs = [item for task in self.resolve_all(config, [name]) for item in task.inputs]
+                if not touches_inputs(inputs, root, changed.get(root, [])):
+                    rows.append([label, "unaffected", "-", "no changed inputs"])
+                    continue
+            self.ui.info(f"==> {label}: {name}")
+            result = self.run_command(
+                config, name, dry=dry, trace=trace, extra_args=extra_args, jobs=jobs, root=root, explain=explain, cwd=root
+            )
+            rows.append([label, "ok" if result == 0 else "failed", str(result), "-"])
+            code = code or result
+        self.ui.table(f"Projects: {name}", ["project", "status", "exit", "detail"], rows)
+        return code
+
+    def run_batch(
+        self,
+        config: ShemulConfig,
+        entries: Iterable[Union[BatchEntry, BatchError]],
+        emit: Callable[[str], None],
+        writer: Writer,
+        jobs: int = 1,
+        dry: bool = False,
+        keep_going: bool = False,
+        root: Optional[Path] = None,
+    ) -> int:
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .batch import BatchError, result_line
+
+        project_root = root or Path.cwd()
+        timings = TimingStore(project_root)
+        lock = threading.Lock()
+        failures: List[Tuple[int, int]] = []
+        pending: List["Future[None]"] = []
+
+        def report(entry: Union[BatchEntry, BatchError], status: str, code: int, **extra: object) -> None:
+            line = result_line(entry, status, code, **extra)
+            with lock:
+                if code:
+                    failures.append((entry.index, code))
+                emit(line)
+
+        def stopped() -> bool:
+            with lock:
+                return bool(failures) and not keep_going
+
+        def execute(entry: BatchEntry, tasks: List[ResolvedCommand]) -> None:
+            if stopped():
+                report(entry, "not-run", 0)
+                return
+            started = time.perf_counter()
+            try:
+                results = self._batch_run(config, entry, tasks, timings, project_root, writer)
+            except OSError as exc:
+                report(entry, "error", 1, error=str(exc))
+                return
+            failed = [item for item in results if item.return_code != 0]
+            if len(tasks) == 1:
+                status = results[0].status if results else "ok"
+            else:
+                status = "failed" if failed else "ok"
+            cells = [{"name": item.name, "status": item.status, "code": item.return_code} for item in results]
+            report(
+                entry,
+                status,
+                failed[0].return_code if failed else 0,
+                duration=round(time.perf_counter() - started, 3),
+                cells=cells if len(tasks) > 1 else None,
+            )
+
+        planned: List[Tuple[Union[BatchEntry, BatchError], List[ResolvedCommand], Optional[str]]] = []
+        for entry in entries:
+            if isinstance(entry, BatchError):
+                planned.append((entry, [], entry.error))
+                continue
+            try:
+                planned.append((entry, self._batch_tasks(config, entry), None))
+            except ValueError as exc:
+                planned.append((entry, [], str(exc)))
+        decisions = self.guard.approve_all([task for _, tasks, error in planned if error is None for task in tasks])
+
+        pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="shemul-batch") if jobs > 1 else None
+        try:
+            for entry, tasks, error in planned:
+                if isinstance(entry, BatchError):
+                    report(entry, "error", 2, error=error)
+                    continue
+                if stopped():
+                    report(entry, "not-run", 0)
+                    continue
+                if error is not None:
+                    report(entry, "error", 1, error=error)
+                    continue
+                if not all(decisions[task.name] for task in tasks):
+                    report(entry, "refused", 1, error="confirmation required")
+                    continue
+                if dry or entry.dry:
+                    report(entry, "dry", 0, commands=[task.command for task in tasks])
+                elif pool is None:
+                    execute(entry, tasks)
+                else:
+                    pending.append(pool.submit(execute, entry, tasks))
+            for future in pending:
+                future.result()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return min(failures)[1] if failures else 0
+
+    def _batch_tasks(self, config: ShemulConfig, entry: BatchEntry) -> List[ResolvedCommand]:
+        if entry.command not in config.commands:
+            raise ValueError(f"Unknown command: {entry.command}")
+        command = self.command(config, entry.command)
+        if command.is_pipe:
+            raise ValueError(f"{entry.command}: pipe commands cannot run in batch mode")
+        tasks = command.expand() if command.is_matrix else [self.resolve(config, entry.command)]
+        if entry.args:
+            tasks = [replace(task, command=task.command + " " + shlex.join(entry.args)) for task in tasks]
+        if entry.env:
+            tasks = [replace(task, environ={**task.environ, **entry.env}) for task in tasks]
+        return tasks
+
+    def _batch_run(
+        self,
+        config: ShemulConfig,
+        entry: BatchEntry,
+        tasks: List[ResolvedCommand],
+        timings: TimingStore,
+        root: Path,
+        writer: Writer,
+    ) -> List[TaskResult]:
+        command = self.command(config, entry.command)
+        filters: Dict[str, OutputFilter] = {}
+        archive = self._log_archive(command, config)
+        scheduler = Scheduler(
+            self.batch_executor(),
+            root=root,
+            task_cache=self._task_cache(command, config),
+            sink_factory=lambda task: self._output_sinks(task, filters, archive, root, writer),
+            timings=timings,
+            locks=CommandLock(root, writer),
+        )
+        return scheduler.run(tasks)
+
+    def _run_matrix(
+        self,
+        command: Command,
+        config: ShemulConfig,
+        dry: bool,
+        trace: bool,
+        extra_args: List[str],
+        jobs: Optional[int],
+        timings: Optional[TimingStore] = None,
+        explain: bool = False,
+        root: Optional[Path] = None,
+        cwd: Optional[Path] = None,
+    ) -> int:
+        try:
+            cells = command.expand()
+        except ValueError as exc:
+            self.ui.error(str(exc))
+            return 1
+        if extra_args:
+            cells = [replace(cell, command=cell.command + " " + " ".join(extra_args)) for cell in cells]
+
+        if trace:
+            lines = [f"{cell.name}: {cell.command}" for cell in cells]
+            env_text = "\n".join([f"{k}={v}" for k, v in cells[0].env.items()]) or "(none)"
+            self.ui.panel("Trace", "Cells:\n" + "\n".join(lines) + f"\nEnv: {env_text}" + self._reload_trace())
+
+        if not self._confirm_all(cells):
+            return 1
+
+        if dry:
+            for cell in cells:
+                self.ui.info(f"{cell.name}: {cell.command}")
+            return 0
+
+        from contextlib import nullcontext
+
+        from .dashboard import Dashboard, dashboard_mode
+        from .jobserver import SpawnGate
+
+        limit = jobs or int(command.config.get("jobs", 0)) or os.cpu_count() or 1
+        filters: Dict[str, OutputFilter] = {}
+        archive = self._log_archive(command, config)
+        project_root = root or Path.cwd()
+        planned = plan([cell.name for cell in cells], timings, limit)
+        mode = dashboard_mode(self.ui.console) if limit > 1 and len(cells) > 1 else "off"
+        dashboard = Dashboard(self.ui.console, self.ui.write, live=mode == "live") if mode != "off" else None
+
+        def sinks(task: ResolvedCommand) -> List[OutputSink]:
+            if dashboard is None:
+                return self._output_sinks(task, filters, archive, project_root)
+            view = dashboard.task(task.name)
+            return [*self._output_sinks(task, filters, archive, project_root, view.feed), view]
+
+        with SpawnGate.for_jobs(limit) as gate, dashboard or nullcontext():
+            scheduler = Scheduler(
+                self.batch_executor(),
+                jobs=limit,
+                root=project_root,
+                task_cache=self._task_cache(command, config),
+                sink_factory=sinks,
+                timings=timings,
+                gate=gate,
+                cwd=cwd,
+                locks=CommandLock(project_root, self.ui.write),
+            )
+            results = scheduler.run(cells)
+        rows = [[item.name, item.status, str(item.return_code), f"{item.duration:.2f}s"] for item in results]
+        self.ui.table(f"Matrix: {command.name}", ["cell", "status", "exit", "duration"], rows)
+        self._show_summaries(filters)
+        if explain:
+            self._explain_schedule(planned, results)
+
+        failed = [item for item in results if item.return_code != 0]
+        if failed:
+            self.ui.error(f"{len(failed)} of {len(results)} cells failed")
+            return failed[0].return_code
+        self.ui.success(f"{len(results)} cells completed")
+        return 0
+
+    def _run_pipe(
+        self,
+        config: ShemulConfig,
+        name: str,
+        dry: bool,
+        trace: bool,
+        extra_args: List[str],
+        root: Optional[Path] = None,
+        cwd: Optional[Path] = None,
+    ) -> int:
+        try:
+            resolved = self.resolve(config, name, store=dry)
+            tasks = [
+                replace(self.resolve(config, item["name"], store=dry), command=item["command"]) for item in resolved.stages
+            ]
+        except ValueError as exc:
+            self.ui.error(str(exc))
+            return 1
+        if extra_args:
+            tasks[-1] = replace(tasks[-1], command=tasks[-1].command + " " + " ".join(extra_args))
+
+        if trace:
+            lines = [f"{task.name}: {task.command}" for task in tasks]
+            self.ui.panel("Trace", "Stages:\n" + "\n".join(lines) + self._reload_trace())
+
+        if not self._confirm_all([resolved, *tasks]):
+            return 1
+
+        if dry:
+            self.ui.info(" | ".join(task.command for task in tasks))
+            return 0
+
+        from .pipeline import Pipeline, Stage, pipefail
+
+        base = cwd or root or config.path.parent
+        stages = [
+            Stage(task.name, task.command, tee=base / item["tee"] if item["tee"] else None)
+            for task, item in zip(tasks, resolved.stages)
+        ]
+        results = Pipeline(stages, cwd=cwd).run()
+        rows = []
+        for item in results:
+            moved = "-" if item.bytes_out is None else str(item.bytes_out)
+            rate = "-" if item.throughput is None else f"{item.throughput / (1024 * 1024):.1f} MB/s"
+            rows.append([item.name, str(item.return_code), moved, f"{item.duration:.2f}s", rate, item.transfer])
+        self.ui.table(f"Pipe: {name}", ["stage", "exit", "bytes out", "duration", "throughput", "transfer"], rows)
+        for item in results:
+            if item.error:
+                self.ui.error(f"{item.name}: {item.error}")
+        code = pipefail(results)
+        if code == 0:
+            self.ui.success("Pipe completed")
+        else:
+            failed = [item.name for item in results if item.return_code != 0]
+            self.ui.error(f"Pipe failed with exit code {code} ({', '.join(failed)})")
+        return code
+
+    def _output_sinks(
+        self,
+        resolved: ResolvedCommand,
+        filters: Dict[str, OutputFilter],
+        archive: Optional[LogArchive] = None,
+        root: Optional[Path] = None,
+        writer: Optional[Writer] = None,
+    ) -> List[OutputSink]:
+        options = OutputOptions.from_config(resolved.output)
+        if options is None and archive is None and writer is None:
+            return []
+        filters[resolved.name] = OutputFilter(options or OutputOptions(), writer or self.ui.write)
+        sinks: List[OutputSink] = [filters[resolved.name]]
+        if archive is not None:
+            sinks.append(archive.sink(resolved, root or Path.cwd()))
+        return sinks
+
+    def _log_archive(self, command: Command, config: ShemulConfig) -> Optional[LogArchive]:
+        from .logs import LogArchive
+
+        settings = config.raw.get("logs") or {}
+        enabled = command.config.get("log")
+        if enabled is None and os.environ.get("SHEMUL_LOGS", "").strip():
+            enabled = is_truthy(os.environ["SHEMUL_LOGS"])
+        if enabled is None:
+            enabled = settings.get("enabled", False)
+        return LogArchive.from_settings(settings) if enabled else None
+
+    def log_archive(self, config: Optional[ShemulConfig]) -> LogArchive:
+        from .logs import LogArchive
+
+        return LogArchive.from_settings(config.raw.get("logs") if config else None)
+
+    def _reload_trace(self) -> str:
+        if self.session is None:
+            return ""
+        return "\n" + self.session.stats.describe()
+
+    def _explain_schedule(self, planned: List[Slot], results: List[TaskResult]) -> None:
+        actual = {item.name: item for item in results}
+        rows = []
+        for slot in planned:
+            item = actual.get(slot.name)
+            if item is None or item.status == "up-to-date":
+                ran = "skipped"
+            else:
+                ran = f"{item.started:.2f}s -> {item.started + item.duration:.2f}s"
+            rows.append([slot.name, str(slot.lane), f"{slot.start:.2f}s -> {slot.end:.2f}s", ran])
+        self.ui.table("Schedule", ["task", "lane", "planned", "actual"], rows)
+
+    def _show_summaries(self, filters: Dict[str, OutputFilter]) -> None:
+        for name, output in filters.items():
+            if output.summary:
+                lines = [line.decode("utf-8", "replace") for line in output.summary]
+                self.ui.panel(f"Summary: {name}", "\n".join(lines))
+
+    def _task_cache(self, command: Command, config: ShemulConfig) -> Optional[TaskCache]:
+        if not command.config.get("cache"):
+            return None
+        return TaskCache.from_settings(config.raw.get("cache"))
+
+    def configure_guard(self, config: Optional[ShemulConfig], yes: bool = False) -> None:
+        settings = config.raw.get("guard") if config else None
+        allow = [str(item) for item in (settings or {}).get("allow", [])]
+        self.guard.policy = ConfirmPolicy.from_env(yes=yes, allow=allow)
+
+    def _confirm(self, resolved: ResolvedCommand) -> bool:
+        return self._confirm_all([resolved])
+
+    def _confirm_all(self, tasks: List[ResolvedCommand]) -> bool:
+        decisions = self.guard.approve_all(tasks)
+        if all(decisions.values()):
+            return True
+        policy = self.guard.policy
+        if policy.assume is None and not policy.interactive:
+            self.ui.warn("Aborted: confirmation required. Pass --yes or set SHEMUL_ASSUME=yes.")
+        else:
+            self.ui.warn("Aborted.")
+        return False
 
     def help_for(self, config: ShemulConfig, name_or_group: str) -> bool:
         if name_or_group in config.commands:
-            resolved = self.resolve(config, name_or_group)
-            body = f"Run: {resolved.command}\nGroup: {resolved.group}\nConfirm: {resolved.confirm}\nDanger: {resolved.danger}"
+            try:
+                resolved = self.resolve(config, name_or_group)
+            except ValueError as exc:
+                self.ui.error(str(exc))
+                return True
+            run = " | ".join(stage["command"] for stage in resolved.stages) if resolved.stages else resolved.command
+            body = f"Run: {run}\nGroup: {resolved.group}\nConfirm: {resolved.confirm}\nDanger: {resolved.danger}"
+            matrix = config.commands[name_or_group].get("matrix")
+            if matrix:
+                axes = ", ".join(f"{key}={'|'.join(str(value) for value in values)}" for key, values in matrix.items())
+                body += f"\nMatrix: {axes}"
             self.ui.panel(f"Help: {name_or_group}", body)
             return True
         grouped = self.list_commands(config)
@@ -116,7 +666,13 @@ class App:
         return False
 
     def completion(self, config: ShemulConfig, words: List[str]) -> List[str]:
-        builtins = ["init", "ls", "info", "help", "doctor", "schema", "_complete"]
+        if len(words) > 1:
+            if words[0] in {"help", "logs", "resolve"}:
+                return complete(words, self.command_names(config))
+            spec = config.commands[words[0]].get("complete") if words[0] in config.commands else None
+            if spec is not None:
+                return complete(words, self.completions.values(spec, config.path.parent))
+        builtins = ["init", "ls", "info", "help", "doctor", "schema", "compile", "resolve", "batch", "shell", "logs", "_complete"]
         candidates = list(set(builtins + self.command_names(config)))
         return complete(words, candidates)
 
@@ -1,6 +1,20 @@
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .util import cache_dir, file_stamps, json_loads, write_atomic
+
+
+DEFAULT_TTL = 300.0
+FIRST_TIMEOUT = 0.3
+REFRESH_TIMEOUT = 60.0
+REFRESH_GRACE = 30.0
 
 
 def complete(words: List[str], candidates: List[str]) -> List[str]:
@@ -8,3 +22,94 @@ def complete(words: List[str], candidates: List[str]) -> List[str]:
         return sorted(candidates)
     current = words[-1]
     return sorted([c for c in candidates if c.startswith(current)])
+
+
+def provider_spec(spec: Any) -> Tuple[str, float, List[str]]:
+    if isinstance(spec, dict):
+        return str(spec["cmd"]), float(spec.get("ttl", DEFAULT_TTL)), [str(item) for item in spec.get("deps", [])]
+    return str(spec), DEFAULT_TTL, []
+
+
+class CompletionCache:
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = root or (cache_dir() / "complete")
+
+    def values(self, spec: Any, cwd: Path) -> List[str]:
+        if isinstance(spec, list):
+            return [str(item) for item in spec]
+        command, ttl, deps = provider_spec(spec)
+        key = hashlib.sha1(f"{cwd}\0{command}".encode("utf-8")).hexdigest()
+        entry = self._load(key)
+        if entry is None:
+            values = self.refresh(key, command, deps, cwd, FIRST_TIMEOUT)
+            if values is not None:
+                return values
+            self._write(key, {"values": [], "refreshing": time.time()})
+            self._spawn_refresh(key, command, deps, cwd)
+            return []
+        now = time.time()
+        stale = now - float(entry.get("at", 0)) >= ttl or (deps and file_stamps(deps, cwd) != entry.get("deps"))
+        if stale and now - float(entry.get("refreshing", 0)) >= REFRESH_GRACE:
+            entry["refreshing"] = now
+            self._write(key, entry)
+            self._spawn_refresh(key, command, deps, cwd)
+        return [str(item) for item in entry.get("values", [])]
+
+    def refresh(self, key: str, command: str, deps: List[str], cwd: Path, timeout: float) -> Optional[List[str]]:
+        try:
+            completed = subprocess.run(
+                command,
+                shell=True,
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                check=False,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            completed = None
+        if completed is None or completed.returncode != 0:
+            entry = self._load(key)
+            if entry is not None and entry.pop("refreshing", None) is not None:
+                self._write(key, entry)
+            return None
+        values = [line.strip() for line in completed.stdout.splitlines() if line.strip()]
+        self._write(key, {"values": values, "at": time.time(), "deps": file_stamps(deps, cwd)})
+        return values
+
+    def _spawn_refresh(self, key: str, command: str, deps: List[str], cwd: Path) -> None:
+        args = [sys.executable, "-m", "shemul.autocomplete", str(self.root), key, command, json.dumps(deps)]
+        try:
+            subprocess.Popen(
+                args,
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError:
+            pass
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = json_loads((self.root / f"{key}.json").read_bytes())
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _write(self, key: str, entry: Dict[str, Any]) -> None:
+        try:
+            write_atomic(self.root / f"{key}.json", json.dumps(entry))
+        except OSError:
+            pass
+
+
+def _refresh_main(argv: List[str]) -> None:
+    root, key, command, deps = argv
+    CompletionCache(Path(root)).refresh(key, command, json.loads(deps), Path.cwd(), REFRESH_TIMEOUT)
+
+
+if __name__ == "__main__":
+    _refresh_main(sys.argv[1:])
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import re
+import shlex
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+
+ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+@dataclass
+class BatchEntry:
+    index: int
+    command: str
+    args: List[str] = field(default_factory=list)
+    dry: bool = False
+    env: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class BatchError:
+    index: int
+    line: str
+    error: str
+
+
+def stderr_writer(data: bytes) -> None:
+    sys.stderr.buffer.write(data)
+    sys.stderr.buffer.flush()
+
+
+def parse_entry(line: str, index: int) -> BatchEntry:
+    text = line.strip()
+    if text.startswith("{"):
+        return _from_json(text, index)
+    try:
+        tokens = shlex.split(text, comments=True)
+    except ValueError as exc:
+        raise ValueError(f"line {index}: {exc}") from None
+
+    env: Dict[str, str] = {}
+    dry = False
+    while tokens and (ASSIGNMENT.match(tokens[0]) or tokens[0] == "--dry"):
+        token = tokens.pop(0)
+        if token == "--dry":
+            dry = True
+        else:
+            key, _, value = token.partition("=")
+            env[key] = value
+    if not tokens:
+        raise ValueError(f"line {index}: missing command")
+    return BatchEntry(index=index, command=tokens[0], args=tokens[1:], dry=dry, env=env)
+
+
+def read_plan(lines: Iterable[str]) -> Iterator[Union[BatchEntry, BatchError]]:
+    for number, line in enumerate(lines, start=1):
+        text = line.strip()
+        if not text or text.startswith("#"):
+            continue
+        try:
+            yield parse_entry(text, number)
+        except ValueError as exc:
+            yield BatchError(index=number, line=text, error=str(exc))
+
+
+def result_line(entry: Union[BatchEntry, BatchError], status: str, code: int, **extra: Any) -> str:
+    record: Dict[str, Any] = {"index": entry.index}
+    if isinstance(entry, BatchEntry):
+        record.update({"command": entry.command, "args": entry.args})
+    record.update({"status": status, "code": code})
+    record.update({key: value for key, value in extra.items() if value is not None})
+    return json.dumps(record, separators=(",", ":"))
+
+
+def _from_json(text: str, index: int) -> BatchEntry:
+    try:
+        data = json.loads(text)
+    except ValueError as exc:
+        raise ValueError(f"line {index}: invalid JSON: {exc}") from None
+    command: Optional[Any] = data.get("command") if isinstance(data, dict) else None
+    if not isinstance(command, str) or not command:
+        raise ValueError(f"line {index}: missing command")
+    args = data.get("args", [])
+    env = data.get("env", {})
+    if not isinstance(args, list) or not isinstance(env, dict):
+        raise ValueError(f"line {index}: args must be a list and env an object")
+    return BatchEntry(
+        index=index,
+        command=command,
+        args=[str(item) for item in args],
+        dry=bool(data.get("dry", False)),
+        env={str(key): str(value) for key, value in env.items()},
+    )
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Dict, Optional
+
+from .command import ResolvedCommand
+from .inputs import expand_globs
+from .util import cache_dir, json_loads
+
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_OBJECT_SIZE = 256 * 1024 * 1024
+MANIFEST_SUFFIX = ".manifest"
+
+
+class CacheBackend:
+    def has(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, key: str, dest: BinaryIO) -> bool:
+        raise NotImplementedError
+
+    def put(self, key: str, source: BinaryIO, size: int) -> None:
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    durable = False
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def has(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def get(self, key: str, dest: BinaryIO) -> bool:
+        try:
+            with self._path(key).open("rb") as handle:
+                shutil.copyfileobj(handle, dest, CHUNK_SIZE)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, key: str, source: BinaryIO, size: int) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{key[:16]}.", dir=str(target.parent))
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                shutil.copyfileobj(source, handle, CHUNK_SIZE)
+                if self.durable:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+
+class FileShareCache(LocalCache):
+    durable = True
+
+    def has(self, key: str) -> bool:
+        try:
+            return self._path(key).stat().st_size >= 0
+        except OSError:
+            return False
+
+    def get(self, key: str, dest: BinaryIO) -> bool:
+        try:
+            return super().get(key, dest)
+        except OSError:
+            return False
+
+    def put(self, key: str, source: BinaryIO, size: int) -> None:
+        if not key.endswith(MANIFEST_SUFFIX) and self.has(key):
+            return
+        super().put(key, source, size)
+
+
+class HttpCache(CacheBackend):
+    def __init__(self, url: str, timeout: float = 30.0) -> None:
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, key: str, method: str, data: Optional[BinaryIO] = None, size: int = 0) -> Any:
+        import urllib.request
+
+        headers = {"Content-Length": str(size), "Content-Type": "application/octet-stream"} if data is not None else {}
+        request = urllib.request.Request(f"{self.url}/{key}", data=data, method=method, headers=headers)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def has(self, key: str) -> bool:
+        import urllib.error
+
+        try:
+            with self._open(key, "HEAD") as response:
+                return response.status == 200
+        except urllib.error.HTTPError:
+            return False
+
+    def get(self, key: str, dest: BinaryIO) -> bool:
+        import urllib.error
+
+        try:
+            with self._open(key, "GET") as response:
+                shutil.copyfileobj(response, dest, CHUNK_SIZE)
+            return True
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return False
+            raise
+
+    def put(self, key: str, source: BinaryIO, size: int) -> None:
+        with self._open(key, "PUT", source, size):
+            pass
+
+
+class TaskCache:
+    def __init__(self, backend: CacheBackend, max_object_size: int = DEFAULT_MAX_OBJECT_SIZE, workers: int = 4) -> None:
+        self.backend = backend
+        self.max_object_size = max_object_size
+        self.workers = max(1, workers)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> "TaskCache":
+        settings = dict(settings or {})
+        url = os.environ.get("SHEMUL_CACHE_URL") or settings.get("url")
+        share = os.environ.get("SHEMUL_CACHE_DIR") or settings.get("path")
+        backend_name = settings.get("backend") or ("http" if url else "file" if share else "local")
+
+        backend: CacheBackend
+        if backend_name == "http":
+            if not url:
+                raise ValueError("HTTP task cache requires a url")
+            backend = HttpCache(str(url))
+        elif backend_name == "file":
+            if not share:
+                raise ValueError("File-share task cache requires a path")
+            backend = FileShareCache(Path(str(share)).expanduser())
+        else:
+            backend = LocalCache(cache_dir() / "tasks")
+        return cls(
+            backend,
+            max_object_size=int(settings.get("max_object_size", DEFAULT_MAX_OBJECT_SIZE)),
+            workers=int(settings.get("workers", 4)),
+        )
+
+    def key_for(self, resolved: ResolvedCommand, root: Path) -> str:
+        digest = hashlib.sha256()
+        identity = {
+            "name": resolved.name,
+            "command": resolved.command,
+            "env": resolved.env,
+            "cell": resolved.cell,
+            "outputs": resolved.outputs,
+        }
+        if resolved.environ:
+            identity["environ"] = resolved.environ
+        digest.update(json.dumps(identity, sort_keys=True, default=str).encode("utf-8"))
+        for path in expand_globs(resolved.inputs, root):
+            digest.update(b"\0" + _relative(path, root).encode("utf-8") + b"\0")
+            digest.update(file_digest(path).encode("ascii"))
+        return digest.hexdigest()
+
+    def restore(self, key: str, root: Path) -> bool:
+        manifest = self._fetch_manifest(key)
+        if manifest is None:
+            return False
+        try:
+            targets = [(entry, _target(root, name)) for name, entry in manifest["outputs"].items()]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return False
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            staged = list(pool.map(lambda item: self._download(item[0], item[1]), targets))
+        try:
+            if not all(staged):
+                return False
+            for tmp, (_, target) in zip(staged, targets):
+                os.replace(tmp, target)
+            return True
+        finally:
+            for tmp in staged:
+                if tmp and os.path.exists(tmp):
+                    os.unlink(tmp)
+
+    def store(self, key: str, resolved: ResolvedCommand, root: Path) -> bool:
+        files = expand_globs(resolved.outputs, root)
+        if not files:
+            return False
+        if any(not _inside(path, root) for path in files):
+            return False
+        if any(path.stat().st_size > self.max_object_size for path in files):
+            return False
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            entries = list(pool.map(self._upload, files))
+
+        manifest = {
+            "command": resolved.command,
+            "outputs": {_relative(path, root): entry for path, entry in zip(files, entries)},
+        }
+        payload = json.dumps(manifest, sort_keys=True).encode("utf-8")
+        with tempfile.TemporaryFile() as handle:
+            handle.write(payload)
+            handle.seek(0)
+            self.backend.put(_manifest_key(key), handle, len(payload))
+        return True
+
+    def _fetch_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        with tempfile.TemporaryFile() as handle:
+            if not self.backend.get(_manifest_key(key), handle):
+                return None
+            handle.seek(0)
+            try:
+                return json_loads(handle.read())
+            except ValueError:
+                return None
+
+    def _upload(self, path: Path) -> Dict[str, Any]:
+        digest = file_digest(path)
+        size = path.stat().st_size
+        if not self.backend.has(digest):
+            with path.open("rb") as handle:
+                self.backend.put(digest, handle, size)
+        return {"digest": digest, "size": size, "mode": path.stat().st_mode & 0o777}
+
+    def _download(self, entry: Dict[str, Any], target: Path) -> Optional[str]:
+        if int(entry["size"]) > self.max_object_size:
+            return None
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", dir=str(target.parent))
+        staged = False
+        try:
+            with os.fdopen(fd, "w+b") as handle:
+                hashing = _HashingWriter(handle, self.max_object_size)
+                try:
+                    if not self.backend.get(entry["digest"], hashing):
+                        return None
+                except (OSError, ValueError):
+                    return None
+                if hashing.overflow or hashing.hexdigest() != entry["digest"]:
+                    return None
+            os.chmod(tmp, int(entry.get("mode", 0o644)))
+            staged = True
+            return tmp
+        finally:
+            if not staged and os.path.exists(tmp):
+                os.unlink(tmp)
+
+
+class _HashingWriter:
+    def __init__(self, handle: BinaryIO, limit: int) -> None:
+        self._handle = handle
+        self._hash = hashlib.sha256()
+        self._limit = limit
+        self.size = 0
+        self.overflow = False
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self._limit:
+            self.overflow = True
+            raise ValueError("Cached object exceeds the configured size limit")
+        self._hash.update(data)
+        return self._handle.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_key(key: str) -> str:
+    return f"{key}{MANIFEST_SUFFIX}"
+
+
+def _target(root: Path, name: str) -> Path:
+    relative = PurePosixPath(name)
+    if not name or relative.is_absolute() or Path(name).is_absolute() or ".." in relative.parts:
+        raise ValueError(f"Unsafe path in cache manifest: {name}")
+    base = root.resolve()
+    target = (base / relative).resolve()
+    if not _inside(target, base):
+        raise ValueError(f"Cache manifest path escapes the project: {name}")
+    return target
+
+
+def _inside(path: Path, root: Path) -> bool:
+    try:
+        path.resolve().relative_to(root.resolve())
+    except ValueError:
+        return False
+    return True
+
+
+def _relative(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import json
+import os
+import re
 import sys
+import time
+from dataclasses import asdict
 from pathlib import Path
 
-from .app import App
+from .app import App, AppState
 from .doctor import Doctor
 from .template import list_templates, resolve_template_key, template_aliases, write_template_file
 from .util import global_config_path, open_in_editor
@@ -16,6 +21,12 @@ def _build_parser() -> argparse.ArgumentParser:
     parser.add_argument("-v", "--v", "--version", dest="version", action="store_true", help="show version")
     parser.add_argument("--dry", action="store_true", help="print resolved command only")
     parser.add_argument("--trace", action="store_true", help="show resolved vars and env")
+    parser.add_argument("-y", "--yes", action="store_true", help="answer yes to confirm/danger prompts")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="max parallel matrix cells")
+    parser.add_argument("--explain-schedule", action="store_true", help="show planned vs actual task timeline")
+    parser.add_argument("--all", dest="all_projects", action="store_true", help="run in every project below cwd")
+    parser.add_argument("--affected", nargs="?", const="", default=None, metavar="BASE", help="run in changed projects")
+    parser.add_argument("--changed", metavar="FILE", help="read changed paths from FILE (- for stdin)")
     parser.add_argument("-h", "--h", "--help", dest="help", action="store_true", help="show help")
     parser.add_argument("command", nargs="?", help="command to run")
     parser.add_argument("args", nargs=argparse.REMAINDER)
@@ -43,6 +54,12 @@ def _show_help(app: App, state) -> None:
         ["-v, --v, --version", "Show version"],
         ["--dry", "Print resolved command only"],
         ["--trace", "Show resolved vars and env"],
+        ["-y, --yes", "Approve confirm/danger commands without prompting"],
+        ["-j, --jobs N", "Run up to N matrix cells in parallel"],
+        ["--explain-schedule", "Show the planned and actual task timeline"],
+        ["--all", "Run the command in every project below the current directory"],
+        ["--affected[=BASE]", "Run only in projects changed since BASE (default: merge-base with the default branch)"],
+        ["--changed FILE", "Use the changed paths listed in FILE (- for stdin) instead of git"],
     ]
     ui.table("Global Options", ["option", "description"], option_rows)
 
@@ -53,6 +70,11 @@ def _show_help(app: App, state) -> None:
         ["info", "Show detected project and active config"],
         ["help [name|group]", "Show command/group help or full help"],
         ["doctor", "Run system readiness checks"],
+        ["compile", "Write a binary snapshot of the merged config"],
+        ["resolve [name...|--all]", "Print resolved commands as JSON lines"],
+        ["batch [-f plan] [-j N] [-k]", "Run one invocation per line of plan (or stdin), report NDJSON"],
+        ["shell", "Interactive prompt that keeps config loaded between commands"],
+        ["logs [name] [--grep RE]", "Show or search archived command output"],
         ["schema", "Print built-in JSON schema"],
     ]
     ui.table("Global Commands", ["command", "description"], global_rows)
@@ -79,6 +101,7 @@ def _show_init_help(app: App) -> None:
     app.ui.info("Usage: shemul init [template] [--force]")
     app.ui.info("Usage: shemul init -g [template] [--force]")
     app.ui.info("Usage: shemul init --list")
+    app.ui.info("Usage: shemul init --bulk [--template=KEY] [--force] <dir|glob>...")
     app.ui.info("Example: shemul init docker fastapi backend")
     app.ui.info("Example: shemul init -g")
     app.ui.info("Example: shemul init nextjs-frontend")
@@ -91,7 +114,7 @@ def _open_config_for_edit(app: App, target: Path) -> None:
         app.ui.warn(f"Could not open editor automatically. Edit this file manually: {target}")
 
 
-def _handle_init(app: App, cwd: Path, args: list[str]) -> None:
+def _handle_init(app: App, cwd: Path, args: list[str]) -> int:
     flags = {arg for arg in args if arg.startswith("-")}
     force = "--force" in flags or "-f" in flags
     list_only = "--list" in flags or "-l" in flags
@@ -100,14 +123,17 @@ def _handle_init(app: App, cwd: Path, args: list[str]) -> None:
 
     if list_only:
         _show_init_help(app)
-        return
+        return 0
+
+    if "--bulk" in flags:
+        return _handle_bulk_init(app, cwd, template_tokens, flags, force)
 
     target = global_config_path() if global_scope else (cwd / "shemul.json")
     if target.exists() and not force:
         scope_label = "Global" if global_scope else "Project"
         app.ui.warn(f"{scope_label} config already initialized at {target}")
         _open_config_for_edit(app, target)
-        return
+        return 0
 
     if not template_tokens:
         template_key = "none"
@@ -117,7 +143,7 @@ def _handle_init(app: App, cwd: Path, args: list[str]) -> None:
         if not template_key:
             app.ui.error(f"Unknown template: {template_input}")
             _show_init_help(app)
-            return
+            return 0
 
     target.parent.mkdir(parents=True, exist_ok=True)
     project_name = "global" if global_scope else cwd.name
@@ -128,6 +154,196 @@ def _handle_init(app: App, cwd: Path, args: list[str]) -> None:
     app.ui.info(f"Template: {template_key}")
     app.ui.info("Next: run `shemul ls` to inspect commands.")
     _open_config_for_edit(app, target)
+    return 0
+
+
+def _handle_bulk_init(app: App, cwd: Path, patterns: list[str], flags: set[str], force: bool) -> int:
+    from .scaffold import expand_targets, scaffold_many
+
+    template = None
+    for flag in flags:
+        if flag.startswith("--template="):
+            name = flag.split("=", 1)[1]
+            template = resolve_template_key(name)
+            if not template:
+                app.ui.error(f"Unknown template: {name}")
+                return 1
+
+    roots = expand_targets(patterns, cwd)
+    if not roots:
+        app.ui.error("No matching directories. Usage: shemul init --bulk <dir|glob>...")
+        return 1
+
+    results = scaffold_many(roots, app.loader.validate, template=template, force=force)
+    rows = [[str(item.path.parent), item.template, item.status, item.detail or "-"] for item in results]
+    app.ui.table("Init", ["directory", "template", "status", "detail"], rows)
+    counts = {status: sum(1 for item in results if item.status == status) for status in ("created", "overwritten", "skipped", "failed")}
+    app.ui.info(", ".join(f"{count} {status}" for status, count in counts.items() if count))
+    return 1 if counts["failed"] else 0
+
+
+def _handle_logs(app: App, state: AppState, args: list[str]) -> int:
+    pattern = None
+    last = None
+    names = []
+    items = iter(args)
+    for arg in items:
+        if arg == "--grep" or arg == "--last":
+            value = next(items, None)
+            if value is None:
+                app.ui.error(f"Missing value for {arg}")
+                return 2
+            arg = f"{arg}={value}"
+        if arg.startswith("--grep="):
+            pattern = arg.split("=", 1)[1]
+        elif arg.startswith("--last="):
+            value = arg.split("=", 1)[1]
+            if not value.isdigit() or int(value) < 1:
+                app.ui.error(f"Invalid --last value: {value}")
+                return 2
+            last = int(value)
+        elif not arg.startswith("-"):
+            names.append(arg)
+
+    archive = app.log_archive(state.config)
+    root = state.context.root if state.context else None
+    records = archive.runs(names[0] if names else None, root=root)
+
+    if not names and pattern is None:
+        rows = []
+        for record in records[-(last or 20):]:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.started))
+            duration = f"{record.ended - record.started:.2f}s"
+            rows.append([record.id, record.name, started, duration, str(record.code), str(record.size)])
+        app.ui.table("Logs", ["run", "command", "started", "duration", "exit", "bytes"], rows)
+        return 0
+
+    if not records:
+        app.ui.warn(f"No archived runs for {names[0]}." if names else "No archived runs.")
+        return 1
+
+    if pattern is None:
+        for record in records[-(last or 1):]:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.started))
+            app.ui.info(f"run {record.id}: {record.name} at {started} (exit {record.code})")
+            for chunk in archive.chunks(record):
+                app.ui.write(chunk)
+        return 0
+
+    try:
+        regex = re.compile(pattern)
+    except re.error as exc:
+        app.ui.error(f"Invalid pattern: {exc}")
+        return 2
+    found = 0
+    for record, line in archive.grep(records[-last:] if last else records, regex):
+        found += 1
+        sys.stdout.write(f"{record.id} {record.name}: {line}\n")
+    return 0 if found else 1
+
+
+def _handle_batch(app: App, state: AppState, ns: argparse.Namespace) -> int:
+    from .batch import read_plan, stderr_writer
+
+    plan = "-"
+    jobs = ns.jobs or 1
+    keep_going = False
+    items = iter(ns.args)
+    for arg in items:
+        if arg in {"-f", "--file", "-j", "--jobs"}:
+            value = next(items, None)
+            if value is None:
+                app.ui.error(f"Missing value for {arg}")
+                return 2
+            arg = f"{'--file' if arg in {'-f', '--file'} else '--jobs'}={value}"
+        if arg.startswith("--file="):
+            plan = arg.split("=", 1)[1]
+        elif arg.startswith("--jobs="):
+            value = arg.split("=", 1)[1]
+            if not value.isdigit() or int(value) < 1:
+                app.ui.error(f"Invalid --jobs value: {value}")
+                return 2
+            jobs = int(value)
+        elif arg in {"-k", "--keep-going"}:
+            keep_going = True
+        elif arg == "--dry":
+            ns.dry = True
+        else:
+            app.ui.error(f"Unknown batch option: {arg}")
+            return 2
+
+    assert state.config is not None
+    try:
+        stream = sys.stdin if plan == "-" else open(plan, encoding="utf-8")
+    except OSError as exc:
+        app.ui.error(f"Cannot read plan: {exc}")
+        return 2
+
+    def emit(line: str) -> None:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    try:
+        return app.run_batch(
+            state.config,
+            read_plan(stream),
+            emit,
+            stderr_writer,
+            jobs=jobs,
+            dry=ns.dry,
+            keep_going=keep_going,
+            root=state.context.root if state.context else None,
+        )
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _handle_projects(app: App, ns: argparse.Namespace, cwd: Path) -> int:
+    from .workspace import ProjectIndex, changed_files, default_base, discover_projects, read_changed_list
+
+    if not ns.command and ns.affected:
+        ns.command, ns.affected = ns.affected, ""
+    if not ns.command:
+        app.ui.error("Usage: shemul --all|--affected[=BASE] <command>")
+        return 2
+
+    base = cwd.resolve()
+    changed = None
+    if ns.all_projects and ns.affected is None and not ns.changed:
+        projects = discover_projects(base)
+    else:
+        try:
+            if ns.changed:
+                paths = read_changed_list(ns.changed, base)
+            else:
+                ref = ns.affected or os.environ.get("SHEMUL_AFFECTED_BASE", "")
+                if not ref:
+                    ref, found = default_base(base)
+                    if not found:
+                        app.ui.warn("No upstream or default branch to compare against; using uncommitted changes (HEAD).")
+                paths = changed_files(base, ref)
+        except (OSError, ValueError) as exc:
+            app.ui.error(str(exc))
+            return 2
+        changed = ProjectIndex(base).owners(paths)
+        projects = sorted(changed)
+        app.ui.info(f"{len(paths)} changed paths in {len(projects)} projects")
+
+    if not projects:
+        app.ui.warn("No projects to run.")
+        return 0
+    return app.run_projects(
+        ns.command,
+        projects,
+        base,
+        dry=ns.dry,
+        trace=ns.trace,
+        extra_args=ns.args,
+        jobs=ns.jobs,
+        explain=ns.explain_schedule,
+        changed=changed,
+    )
 
 
 def main() -> None:
@@ -135,24 +351,41 @@ def main() -> None:
     ns = parser.parse_args()
 
     app = App()
+    try:
+        if ns.command == "shell" and not (ns.version or ns.help):
+            from .shell import Shell
+
+            code = Shell(app, Path.cwd(), dispatch, _build_parser).run()
+        else:
+            state = app.load_state(Path.cwd(), use_snapshot=ns.command != "compile")
+            code = dispatch(app, state, ns, Path.cwd())
+    finally:
+        app.close()
+    if code:
+        sys.exit(code)
+
+
+def dispatch(app: App, state: AppState, ns: argparse.Namespace, cwd: Path) -> int:
     ui = app.ui
-    state = app.load_state(Path.cwd())
+    app.configure_guard(state.config, yes=ns.yes)
 
     if ns.version:
         print(__version__)
-        return
+        return 0
 
     if ns.help:
         _show_help(app, state)
-        return
+        return 0
+
+    if ns.all_projects or ns.affected is not None or ns.changed:
+        return _handle_projects(app, ns, cwd)
 
     if not ns.command:
         _show_help(app, state)
-        return
+        return 0
 
     if ns.command == "init":
-        _handle_init(app, Path.cwd(), ns.args)
-        return
+        return _handle_init(app, cwd, ns.args)
 
     if ns.command == "doctor":
         checks = Doctor().run()
@@ -161,28 +394,57 @@ def main() -> None:
             status = "ok" if check.ok else "fail"
             rows.append([status, check.name, check.detail])
         ui.table("Doctor", ["status", "check", "detail"], rows)
-        return
+        return 0
 
     if ns.command == "schema":
         print(app.schema_path.read_text(encoding="utf-8"))
-        return
+        return 0
+
+    if ns.command == "logs":
+        return _handle_logs(app, state, ns.args)
 
     if ns.command == "_complete":
         words = [w for w in ns.args if not w.startswith("-")]
         if not state.config:
-            for item in ["init", "ls", "info", "help", "doctor", "schema", "_complete"]:
+            for item in ["init", "ls", "info", "help", "doctor", "schema", "compile", "resolve", "batch", "shell", "logs", "_complete"]:
                 print(item)
-            return
+            return 0
         for item in app.completion(state.config, words):
             print(item)
-        return
+        return 0
 
     if not state.config:
         if ns.command in {"info", "ls", "help"}:
             _show_help(app, state)
-            return
+            return 0
         ui.error("No shemul config found. Run `shemul init -g` to create a global config.")
-        return
+        return 0
+
+    if ns.command == "compile":
+        target = app.compile(state)
+        ui.success(f"Compiled config snapshot: {target}")
+        ui.info(f"Commands: {len(state.config.commands)}")
+        return 0
+
+    if ns.command == "batch":
+        return _handle_batch(app, state, ns)
+
+    if ns.command == "resolve":
+        names = [arg for arg in ns.args if not arg.startswith("-")]
+        if "--all" in ns.args or not names:
+            names = app.command_names(state.config)
+        unknown = [name for name in names if name not in state.config.commands]
+        if unknown:
+            ui.error(f"Unknown command: {', '.join(unknown)}")
+            return 1
+        try:
+            resolved = list(app.resolve_all(state.config, names))
+        except ValueError as exc:
+            ui.error(str(exc))
+            return 1
+        lines = [json.dumps(asdict(item), separators=(",", ":")) for item in resolved]
+        sys.stdout.write("\n".join(lines) + "\n" if lines else "")
+        return 0
 
     if ns.command == "info":
         lines = []
@@ -204,9 +466,14 @@ def main() -> None:
         if state.global_config:
             active.append("global")
         lines.append(f"active scope: {' + '.join(active) if active else '(none)'}")
+        if state.snapshot:
+            lines.append(f"snapshot: {state.snapshot}")
         ui.panel("Info", "\n".join(lines))
+
+        source_rows = [[name, str(state.config.source_of(name))] for name in app.command_names(state.config)]
+        ui.table("Command Sources", ["command", "file"], source_rows)
         _about_box(app)
-        return
+        return 0
 
     if ns.command == "ls":
         grouped = app.list_commands(state.config)
@@ -215,16 +482,16 @@ def main() -> None:
             for name in names:
                 rows.append([group, name])
         ui.table("Commands", ["group", "command"], rows)
-        return
+        return 0
 
     if ns.command == "help":
         if not ns.args:
             _show_help(app, state)
-            return
+            return 0
         target = ns.args[0]
         if not app.help_for(state.config, target):
             ui.error(f"Unknown command or group: {target}")
-        return
+        return 0
 
     if ns.command not in state.config.commands:
         ui.error(f"Unknown command: {ns.command}")
@@ -235,9 +502,18 @@ def main() -> None:
                 ui.info(f"  {item}")
         if not state.global_config:
             ui.info("Tip: initialize global commands with `shemul init -g`.")
-        return
-
-    sys.exit(app.run_command(state.config, ns.command, dry=ns.dry, trace=ns.trace, extra_args=ns.args))
+        return 0
+
+    return app.run_command(
+        state.config,
+        ns.command,
+        dry=ns.dry,
+        trace=ns.trace,
+        extra_args=ns.args,
+        jobs=ns.jobs,
+        root=state.context.root if state.context else None,
+        explain=ns.explain_schedule,
+    )
 
 
 if __name__ == "__main__":
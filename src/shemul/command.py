@@ -1,7 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict
+import itertools
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from .dynvars import VarResolver, dynamic_vars, is_dynamic, references, shared_resolver
 
 
 @dataclass
@@ -13,35 +17,133 @@ class ResolvedCommand:
     danger: bool
     desc: str
     group: str
+    cell: Dict[str, Any] = field(default_factory=dict)
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    cache: bool = False
+    output: Dict[str, Any] = field(default_factory=dict)
+    stages: List[Dict[str, Any]] = field(default_factory=list)
+    lock: str = ""
+    environ: Dict[str, str] = field(default_factory=dict)
 
 
 class Command:
-    def __init__(self, name: str, config: Dict[str, Any], vars_map: Dict[str, Any], envs: Dict[str, Any]) -> None:
+    def __init__(
+        self,
+        name: str,
+        config: Dict[str, Any],
+        vars_map: Dict[str, Any],
+        envs: Dict[str, Any],
+        resolver: Optional[VarResolver] = None,
+        cwd: Optional[Path] = None,
+        commands: Optional[Mapping[str, Dict[str, Any]]] = None,
+    ) -> None:
         self.name = name
         self.config = config
         self.vars_map = vars_map
         self.envs = envs
+        self.resolver = resolver
+        self.cwd = cwd
+        self.commands = commands
+
+    @property
+    def is_pipe(self) -> bool:
+        return bool(self.config.get("pipe"))
+
+    @property
+    def is_matrix(self) -> bool:
+        return bool(self.config.get("matrix"))
+
+    def dynamic_refs(self) -> Set[str]:
+        specs = dynamic_vars(self.vars_map)
+        if not specs:
+            return set()
+        names = references(self._templated_fields())
+        pending = list(names)
+        while pending:
+            value = self.vars_map.get(pending.pop())
+            if value is None or is_dynamic(value):
+                continue
+            texts = [str(item) for item in value.values()] if isinstance(value, dict) else [str(value)]
+            found = references(texts) - names
+            names |= found
+            pending.extend(found)
+        return names & set(specs)
 
-    def resolve(self) -> ResolvedCommand:
-        run = str(self.config["run"])
+    def cells(self) -> List[Dict[str, Any]]:
+        matrix = self.config.get("matrix") or {}
+        if not matrix:
+            return []
+        keys = list(matrix.keys())
+        return [dict(zip(keys, values)) for values in itertools.product(*(matrix[key] for key in keys))]
+
+    def expand(self) -> List[ResolvedCommand]:
+        cells = self.cells()
+        if not cells:
+            return [self.resolve()]
+        return [self.resolve(cell) for cell in cells]
+
+    def resolve(self, cell: Optional[Dict[str, Any]] = None) -> ResolvedCommand:
+        pipe = [_pipe_stage(item) for item in self.config.get("pipe", [])]
+        run = "" if pipe else str(self.config["run"])
         env_name = self.config.get("env")
         env_data = {}
         if env_name:
             env_data = dict(self.envs.get(env_name, {}))
 
-        template_vars = {**self.vars_map, "env": env_data}
+        cell = dict(cell or {})
+        template_vars = {**self.vars_map, **cell, "env": env_data}
+        dynamic = self.dynamic_refs() - set(cell)
+        if dynamic:
+            resolver = self.resolver or shared_resolver()
+            template_vars.update(resolver.values(dynamic_vars(self.vars_map), dynamic, template_vars, self.cwd))
         resolved = self._template(run, template_vars)
+        stages = [
+            {
+                "name": stage["command"],
+                "command": self.stage(stage["command"]).resolve().command,
+                "tee": self._template(str(stage["tee"]), template_vars) if stage["tee"] else None,
+            }
+            for stage in pipe
+        ]
 
         return ResolvedCommand(
-            name=self.name,
+            name=f"{self.name}[{cell_label(cell)}]" if cell else self.name,
             command=resolved,
             env=env_data,
             confirm=bool(self.config.get("confirm", False)),
             danger=bool(self.config.get("danger", False)),
             desc=str(self.config.get("desc", "")),
             group=str(self.config.get("group", "core")),
+            cell=cell,
+            inputs=[self._template(str(item), template_vars) for item in self.config.get("inputs", [])],
+            outputs=[self._template(str(item), template_vars) for item in self.config.get("outputs", [])],
+            cache=bool(self.config.get("cache", False)),
+            output=dict(self.config.get("output") or {}),
+            stages=stages,
+            lock=str(self.config.get("lock", "")),
         )
 
+    def _templated_fields(self) -> List[str]:
+        fields = [str(self.config.get("run", "")), *(str(item) for item in self.config.get("inputs", []))]
+        fields.extend(str(item) for item in self.config.get("outputs", []))
+        for item in self.config.get("pipe", []):
+            stage = _pipe_stage(item)
+            fields.append(str(stage["tee"] or ""))
+            try:
+                fields.extend(self.stage(stage["command"])._templated_fields())
+            except ValueError:
+                continue
+        return fields
+
+    def stage(self, name: str) -> "Command":
+        if self.commands is None or name not in self.commands:
+            raise ValueError(f"pipe {self.name}: unknown command {name}")
+        command = Command(name, self.commands[name], self.vars_map, self.envs, self.resolver, self.cwd, self.commands)
+        if command.is_pipe or command.is_matrix:
+            raise ValueError(f"pipe {self.name}: stage {name} must be a plain command")
+        return command
+
     def _template(self, text: str, vars_map: Dict[str, Any]) -> str:
         result = text
         for key, value in vars_map.items():
@@ -53,3 +155,19 @@ class Command:
                 token = "{{" + f"{key}" + "}}"
                 result = result.replace(token, str(value))
         return result
+
+
+def _pipe_stage(item: Any) -> Dict[str, Any]:
+    if isinstance(item, dict):
+        return {"command": str(item["command"]), "tee": item.get("tee")}
+    return {"command": str(item), "tee": None}
+
+
+def cell_label(cell: Dict[str, Any]) -> str:
+    return ",".join(f"{key}={value}" for key, value in cell.items())
+
+
+def base_name(resolved: ResolvedCommand) -> str:
+    if not resolved.cell:
+        return resolved.name
+    return resolved.name[: -len(cell_label(resolved.cell)) - 2]
@@ -1,26 +1,41 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import copy
+import glob
+import os
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
 import jsonschema
 
-from .util import read_json
+from .lazy import LazyCommands, merge_commands, split_commands
+from .util import is_truthy, read_json
+
+
+_LAYER_KEYS = ("include", "extends")
+LAZY_THRESHOLD = 256 * 1024
 
 
 @dataclass
 class ShemulConfig:
     raw: Dict[str, Any]
     path: Path
+    sources: Mapping[str, Path] = field(default_factory=dict)
+    files: List[Path] = field(default_factory=list)
+    include_dirs: List[Path] = field(default_factory=list)
 
     @property
     def name(self) -> str:
         return str(self.raw.get("name", ""))
 
     @property
-    def commands(self) -> Dict[str, Any]:
-        return dict(self.raw.get("commands", {}))
+    def commands(self) -> Mapping[str, Any]:
+        commands = self.raw.get("commands", {})
+        if isinstance(commands, dict):
+            return dict(commands)
+        return commands
 
     @property
     def vars(self) -> Dict[str, Any]:
@@ -30,16 +45,25 @@ class ShemulConfig:
     def envs(self) -> Dict[str, Any]:
         return dict(self.raw.get("env", {}))
 
+    def source_of(self, name: str) -> Path:
+        return self.sources.get(name, self.path)
+
 
 class ConfigLoader:
-    def __init__(self, schema_path: Path) -> None:
+    def __init__(self, schema_path: Path, max_workers: Optional[int] = None, lazy: Optional[bool] = None) -> None:
         self.schema_path = schema_path
+        self.max_workers = max_workers
+        self.lazy = lazy
+        self._validators: Dict[str, Any] = {}
+        self._fragments: Dict[Tuple[Path, bool], Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
 
     def load(self, path: Path) -> ShemulConfig:
-        raw = read_json(path)
-        schema = read_json(self.schema_path)
-        jsonschema.validate(instance=raw, schema=schema)
-        return ShemulConfig(raw=raw, path=path)
+        raw = self._read(path, fragment=False)
+        return self._expand(path, raw, seen=frozenset())
+
+    def validate(self, raw: Dict[str, Any]) -> None:
+        self._validator("root").validate(raw)
 
     def schema_text(self) -> str:
         return self.schema_path.read_text(encoding="utf-8")
@@ -53,11 +77,219 @@ class ConfigLoader:
             return None
 
         assert project is not None and global_cfg is not None
+        return self._combine(global_cfg, project)
+
+    def remerge(
+        self,
+        merged: Optional[ShemulConfig],
+        project: Optional[ShemulConfig],
+        global_cfg: Optional[ShemulConfig],
+        previous: Optional[ShemulConfig],
+        scope: str,
+    ) -> Optional[ShemulConfig]:
+        current, other = (project, global_cfg) if scope == "project" else (global_cfg, project)
+        if merged is None or previous is None or current is None or other is None:
+            return self.merge(project, global_cfg)
+        if merged is previous or merged is other or not isinstance(merged.sources, dict):
+            return self.merge(project, global_cfg)
+        tables = [config.raw.get("commands", {}) for config in (merged, previous, current, other)]
+        if not all(type(table) is dict for table in tables):
+            return self.merge(project, global_cfg)
+
+        assert project is not None and global_cfg is not None
+        current_commands, old, new, fallback = tables
+        commands = dict(current_commands)
+        sources = dict(merged.sources)
+        shadowed = scope == "global"
+        for name in old:
+            if name in new or (shadowed and name in fallback):
+                continue
+            if not shadowed and name in fallback:
+                commands[name] = fallback[name]
+                sources[name] = other.source_of(name)
+            else:
+                commands.pop(name, None)
+                sources.pop(name, None)
+        for name, value in new.items():
+            if shadowed and name in fallback:
+                continue
+            if old.get(name) is value and name in commands:
+                continue
+            if name not in old or old[name] != value or name not in commands:
+                commands[name] = value
+                sources[name] = current.source_of(name)
+
+        raw = {**global_cfg.raw, **project.raw}
+        raw["vars"] = {**global_cfg.vars, **project.vars}
+        raw["env"] = {**global_cfg.envs, **project.envs}
+        raw["commands"] = commands
+        raw["name"] = project.name or global_cfg.name
+        return ShemulConfig(
+            raw=raw,
+            path=project.path,
+            sources=sources,
+            files=_unique(global_cfg.files + project.files),
+            include_dirs=_unique(global_cfg.include_dirs + project.include_dirs),
+        )
+
+    def _combine(self, lower: ShemulConfig, upper: ShemulConfig) -> ShemulConfig:
+        merged = {**lower.raw, **upper.raw}
+        merged["vars"] = {**lower.vars, **upper.vars}
+        merged["env"] = {**lower.envs, **upper.envs}
+        merged["commands"] = merge_commands(lower.commands, upper.commands)
+        merged["name"] = upper.name or lower.name
+        sources = {**lower.sources, **upper.sources}
+        return ShemulConfig(
+            raw=merged,
+            path=upper.path,
+            sources=sources,
+            files=_unique(lower.files + upper.files),
+            include_dirs=_unique(lower.include_dirs + upper.include_dirs),
+        )
+
+    def _expand(self, path: Path, raw: Dict[str, Any], seen: frozenset) -> ShemulConfig:
+        key = path.resolve()
+        if key in seen:
+            raise ValueError(f"Config include cycle detected at {path}")
+        seen = seen | {key}
+
+        own = {k: v for k, v in raw.items() if k not in _LAYER_KEYS}
+        own_cfg = ShemulConfig(
+            raw=own,
+            path=path,
+            sources={name: path for name in own.get("commands", {})},
+            files=[path],
+            include_dirs=_include_dirs(path, raw),
+        )
+
+        layers = self._layer_paths(path, raw)
+        if not layers:
+            return own_cfg
+
+        fragments = self._read_many(layers)
+        result: Optional[ShemulConfig] = None
+        for layer_path, layer_raw in zip(layers, fragments):
+            layer = self._expand(layer_path, layer_raw, seen)
+            result = layer if result is None else self._combine(result, layer)
+        assert result is not None
+        return self._combine(result, own_cfg)
+
+    def _layer_paths(self, path: Path, raw: Dict[str, Any]) -> List[Path]:
+        base = path.parent
+        paths: List[Path] = []
+        for pattern in _as_list(raw.get("extends")):
+            paths.append(base / os.path.expanduser(pattern))
+        for pattern in _as_list(raw.get("include")):
+            full = os.path.join(str(base), os.path.expanduser(pattern))
+            for match in sorted(glob.glob(full, recursive=True)):
+                candidate = Path(match)
+                if candidate not in paths and candidate.resolve() != path.resolve():
+                    paths.append(candidate)
+        return paths
+
+    def _read_many(self, paths: List[Path]) -> List[Dict[str, Any]]:
+        if len(paths) == 1:
+            return [self._read(paths[0], fragment=True)]
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda item: self._read(item, fragment=True), paths))
+
+    def _read(self, path: Path, fragment: bool) -> Dict[str, Any]:
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cache_key = (path.resolve(), fragment)
+        with self._lock:
+            cached = self._fragments.get(cache_key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        if self._is_lazy(stat.st_size):
+            raw = self._read_lazy(path, fragment)
+        else:
+            raw = read_json(path)
+            self._validator("fragment" if fragment else "root").validate(raw)
+        with self._lock:
+            self._fragments[cache_key] = (stamp, raw)
+        return raw
+
+    def _is_lazy(self, size: int) -> bool:
+        if self.lazy is not None:
+            return self.lazy
+        override = os.environ.get("SHEMUL_LAZY")
+        if override:
+            return is_truthy(override)
+        return size >= LAZY_THRESHOLD
+
+    def _read_lazy(self, path: Path, fragment: bool) -> Dict[str, Any]:
+        top, pending = split_commands(path.read_bytes(), path)
+        if pending is None:
+            self._validator("fragment" if fragment else "root").validate(top)
+            return top
+
+        self._validator("lazy-fragment" if fragment else "lazy-root").validate({**top, "commands": dict.fromkeys(pending, {})})
+        command_validator = self._validator("command")
+
+        def validate(name: str, value: Dict[str, Any]) -> None:
+            try:
+                command_validator.validate(value)
+            except jsonschema.ValidationError as exc:
+                exc.path.appendleft(name)
+                exc.path.appendleft("commands")
+                raise
+
+        top["commands"] = LazyCommands(dict(pending), validate)
+        return top
+
+    def _validator(self, kind: str) -> Any:
+        with self._lock:
+            validator = self._validators.get(kind)
+            if validator is None:
+                schema = _schema_for(read_json(self.schema_path), kind)
+                validator_cls = jsonschema.validators.validator_for(schema)
+                validator = validator_cls(schema)
+                self._validators[kind] = validator
+        return validator
+
+
+def _schema_for(schema: Dict[str, Any], kind: str) -> Dict[str, Any]:
+    if kind == "root":
+        return schema
+    schema = copy.deepcopy(schema)
+    command_schema = schema.get("properties", {}).get("commands", {}).get("additionalProperties", {})
+    if kind == "command":
+        return {"$schema": schema.get("$schema"), **command_schema} if "$schema" in schema else command_schema
+    if kind.endswith("fragment"):
+        schema.pop("anyOf", None)
+        schema.pop("required", None)
+    if kind.startswith("lazy") and "commands" in schema.get("properties", {}):
+        schema["properties"]["commands"].pop("additionalProperties", None)
+    return schema
+
+
+def _include_dirs(path: Path, raw: Dict[str, Any]) -> List[Path]:
+    dirs: List[Path] = []
+    for pattern in _as_list(raw.get("include")):
+        full = os.path.join(str(path.parent), os.path.expanduser(pattern))
+        parts = Path(full).parts
+        magic = next((index for index, part in enumerate(parts) if glob.has_magic(part)), None)
+        if magic is None:
+            dirs.append(Path(full).parent)
+            continue
+        dirs.append(Path(*parts[:magic]))
+        for depth in range(magic + 1, len(parts)):
+            walked = glob.glob(os.path.join(*parts[:depth]), recursive=True)
+            dirs.extend(Path(item) for item in sorted(walked) if os.path.isdir(item))
+    return _unique(dirs)
+
+
+def _unique(paths: List[Path]) -> List[Path]:
+    return list(dict.fromkeys(paths))
+
 
-        merged = dict(global_cfg.raw)
-        merged["vars"] = {**global_cfg.vars, **project.vars}
-        merged["env"] = {**global_cfg.envs, **project.envs}
-        merged["commands"] = {**global_cfg.commands, **project.commands}
-        merged["name"] = project.name or global_cfg.name
-        merged_path = project.path
-        return ShemulConfig(raw=merged, path=merged_path)
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value]
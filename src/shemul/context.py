@@ -2,9 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Optional
 
-from .util import find_upward
+from .util import detect_project_type, find_upward
 
 
 @dataclass
@@ -27,20 +27,4 @@ class ContextDiscovery:
         return ProjectContext(root=root, config_path=config_path, project_type=project_type)
 
     def _detect_type(self, root: Path) -> str:
-        has_docker = (root / "docker-compose.yml").exists() or (root / "compose.yml").exists()
-        has_node = (root / "package.json").exists()
-        has_python = (root / "pyproject.toml").exists() or (root / "requirements.txt").exists()
-
-        types = []
-        if has_docker:
-            types.append("docker")
-        if has_node:
-            types.append("node")
-        if has_python:
-            types.append("python")
-
-        if not types:
-            return "unknown"
-        if len(types) == 1:
-            return types[0]
-        return "mixed"
+        return detect_project_type(root)
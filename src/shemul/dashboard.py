@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from .output import OutputSink, Writer
+
+
+FRAME_RATE = 4.0
+LAST_LINE = 512
+TAIL_BYTES = 8 * 1024
+MODES = ("auto", "live", "plain", "off")
+
+
+def dashboard_mode(console: Console) -> str:
+    mode = os.environ.get("SHEMUL_DASHBOARD", "auto").strip().lower() or "auto"
+    if mode not in MODES:
+        mode = "auto"
+    if mode == "auto":
+        return "live" if console.is_terminal else "plain"
+    return mode
+
+
+@dataclass
+class TaskState:
+    name: str
+    started: float
+    ended: Optional[float] = None
+    code: Optional[int] = None
+    bytes: int = 0
+    last_line: bytes = b""
+    partial: bytes = b""
+    tail: bytes = b""
+
+    @property
+    def elapsed(self) -> float:
+        return (self.ended or time.monotonic()) - self.started
+
+
+class TaskView(OutputSink):
+    def __init__(self, dashboard: "Dashboard", state: TaskState) -> None:
+        self.dashboard = dashboard
+        self.state = state
+
+    def write(self, data: bytes) -> None:
+        self.state.bytes += len(data)
+
+    def feed(self, data: bytes) -> None:
+        self.dashboard.feed(self.state, data)
+
+    def close(self, return_code: int) -> None:
+        self.dashboard.finish(self.state, return_code)
+
+
+class Dashboard:
+    def __init__(self, console: Console, writer: Writer, live: bool, frame_rate: float = FRAME_RATE) -> None:
+        self.console = console
+        self.writer = writer
+        self.live = live
+        self.frame_rate = frame_rate
+        self.tasks: Dict[str, TaskState] = {}
+        self._lock = threading.Lock()
+        self._display: Optional[Live] = None
+
+    def __enter__(self) -> "Dashboard":
+        if self.live:
+            self._display = Live(
+                console=self.console,
+                refresh_per_second=self.frame_rate,
+                get_renderable=self.render,
+                transient=True,
+            )
+            self._display.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._display is not None:
+            self._display.stop()
+            self._display = None
+            self.console.print(self.render())
+            for state in self.tasks.values():
+                if state.code and state.tail:
+                    self.console.rule(Text(f"{state.name} (exit {state.code})"))
+                    self.writer(state.tail if state.tail.endswith(b"\n") else state.tail + b"\n")
+
+    def task(self, name: str) -> TaskView:
+        state = TaskState(name=name, started=time.monotonic())
+        with self._lock:
+            self.tasks[name] = state
+        return TaskView(self, state)
+
+    def feed(self, state: TaskState, data: bytes) -> None:
+        if self.live:
+            state.tail = (state.tail + data)[-TAIL_BYTES:]
+            text = state.partial + data
+            cut = text.rfind(b"\n")
+            if cut < 0:
+                state.partial = text[-LAST_LINE:]
+                return
+            start = text.rfind(b"\n", 0, cut) + 1
+            if cut > start:
+                state.last_line = text[start:cut][:LAST_LINE]
+            state.partial = text[cut + 1 :][-LAST_LINE:]
+            return
+        text = state.partial + data
+        cut = text.rfind(b"\n")
+        if cut < 0:
+            state.partial = text
+            return
+        state.partial = text[cut + 1 :]
+        self._emit(state, text[: cut + 1])
+
+    def finish(self, state: TaskState, code: int) -> None:
+        state.ended = time.monotonic()
+        state.code = code
+        if state.partial:
+            if self.live:
+                state.last_line = state.partial
+            else:
+                self._emit(state, state.partial + b"\n")
+            state.partial = b""
+
+    def render(self) -> Table:
+        table = Table(box=None, show_header=True, pad_edge=False, expand=True)
+        table.add_column("", width=1, no_wrap=True)
+        table.add_column("task", no_wrap=True)
+        table.add_column("time", justify="right", no_wrap=True)
+        table.add_column("output", justify="right", no_wrap=True)
+        table.add_column("last line", no_wrap=True, overflow="ellipsis", ratio=1)
+        with self._lock:
+            states: List[TaskState] = list(self.tasks.values())
+        for state in states:
+            if state.code is None:
+                mark = Text("•", style="cyan")
+            elif state.code == 0:
+                mark = Text("✓", style="green")
+            else:
+                mark = Text("✗", style="red")
+            line = (state.last_line or state.partial).decode("utf-8", "replace").expandtabs()
+            table.add_row(mark, Text(state.name), f"{state.elapsed:.1f}s", _size(state.bytes), Text(line, style="dim"))
+        return table
+
+    def _emit(self, state: TaskState, lines: bytes) -> None:
+        prefix = f"[{state.name}] ".encode("utf-8")
+        body = b"".join(prefix + line + b"\n" for line in lines[:-1].split(b"\n"))
+        with self._lock:
+            self.writer(body)
+
+
+def _size(count: int) -> str:
+    value = float(count)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}GB"
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .util import cache_dir, file_stamps, json_loads, write_atomic
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+
+TOKEN = re.compile(r"\{\{([^{}]+)\}\}")
+MAX_WORKERS = 8
+
+
+@dataclass
+class DynamicVar:
+    name: str
+    cmd: str
+    ttl: Optional[float] = None
+    deps: List[str] = field(default_factory=list)
+
+    @property
+    def persistent(self) -> bool:
+        return self.ttl is not None or bool(self.deps)
+
+
+def is_dynamic(value: Any) -> bool:
+    return isinstance(value, dict) and "cmd" in value
+
+
+def dynamic_vars(vars_map: Dict[str, Any]) -> Dict[str, DynamicVar]:
+    specs: Dict[str, DynamicVar] = {}
+    for name, value in vars_map.items():
+        if is_dynamic(value):
+            ttl = value.get("ttl")
+            specs[name] = DynamicVar(
+                name=name,
+                cmd=str(value["cmd"]),
+                ttl=float(ttl) if ttl is not None else None,
+                deps=[str(item) for item in value.get("deps", [])],
+            )
+    return specs
+
+
+def references(texts: Iterable[str]) -> Set[str]:
+    names: Set[str] = set()
+    for text in texts:
+        for match in TOKEN.finditer(text):
+            names.add(match.group(1).partition(".")[0])
+    return names
+
+
+class VarResolver:
+    def __init__(self, root: Optional[Path] = None, persist: bool = True) -> None:
+        self.root = root or (cache_dir() / "vars")
+        self.persist = persist
+        self.spawned = 0
+        self._memory: Dict[str, Tuple[str, float, Dict[str, Optional[int]]]] = {}
+        self._inflight: Dict[str, "Future[str]"] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def values(
+        self,
+        specs: Dict[str, DynamicVar],
+        names: Iterable[str],
+        static: Dict[str, Any],
+        cwd: Optional[Path] = None,
+    ) -> Dict[str, str]:
+        cwd = cwd or Path.cwd()
+        waves = _waves(specs, names)
+        values: Dict[str, str] = {}
+        for wave in waves:
+            scope = {**static, **values}
+            commands = {name: _substitute(specs[name].cmd, scope) for name in wave}
+            futures = {name: self._submit(specs[name], commands[name], cwd) for name in wave}
+            for name, future in futures.items():
+                values[name] = future.result()
+        return values
+
+    def _submit(self, spec: DynamicVar, command: str, cwd: Path) -> "Future[str]":
+        from concurrent.futures import Future, ThreadPoolExecutor
+
+        key = hashlib.sha1(f"{cwd}\0{command}".encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and _fresh(spec, cwd, cached[1], cached[2]):
+                done: "Future[str]" = Future()
+                done.set_result(cached[0])
+                return done
+            running = self._inflight.get(key)
+            if running is not None:
+                return running
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="shemul-var")
+            future = self._pool.submit(self._evaluate, spec, command, cwd, key)
+            self._inflight[key] = future
+        return future
+
+    def _evaluate(self, spec: DynamicVar, command: str, cwd: Path, key: str) -> str:
+        try:
+            entry = self._load(spec, cwd, key)
+            if entry is None:
+                entry = (self._spawn(spec, command, cwd), time.time(), file_stamps(spec.deps, cwd))
+                self._save(spec, key, entry)
+            with self._lock:
+                self._memory[key] = entry
+            return entry[0]
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _spawn(self, spec: DynamicVar, command: str, cwd: Path) -> str:
+        with self._lock:
+            self.spawned += 1
+        completed = subprocess.run(command, shell=True, cwd=cwd, capture_output=True, text=True, check=False)
+        if completed.returncode != 0:
+            detail = completed.stderr.strip().splitlines()
+            reason = f": {detail[-1]}" if detail else ""
+            raise ValueError(f"var {spec.name}: `{command}` exited with {completed.returncode}{reason}")
+        return completed.stdout.rstrip("\n")
+
+    def _load(self, spec: DynamicVar, cwd: Path, key: str) -> Optional[Tuple[str, float, Dict[str, Optional[int]]]]:
+        if not (self.persist and spec.persistent):
+            return None
+        try:
+            data = json_loads((self.root / f"{key}.json").read_bytes())
+            entry = (str(data["value"]), float(data["at"]), dict(data["deps"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return entry if _fresh(spec, cwd, entry[1], entry[2]) else None
+
+    def _save(self, spec: DynamicVar, key: str, entry: Tuple[str, float, Dict[str, Optional[int]]]) -> None:
+        if not (self.persist and spec.persistent):
+            return
+        payload = {"value": entry[0], "at": entry[1], "deps": entry[2]}
+        try:
+            write_atomic(self.root / f"{key}.json", json.dumps(payload))
+        except OSError:
+            pass
+
+
+_shared: Optional[VarResolver] = None
+
+
+def shared_resolver() -> VarResolver:
+    global _shared
+    if _shared is None:
+        _shared = VarResolver()
+    return _shared
+
+
+def _substitute(text: str, scope: Dict[str, Any]) -> str:
+    def replace(match: "re.Match[str]") -> str:
+        value = scope.get(match.group(1))
+        if value is None or isinstance(value, dict):
+            return match.group(0)
+        return str(value)
+
+    return TOKEN.sub(replace, text)
+
+
+def _waves(specs: Dict[str, DynamicVar], names: Iterable[str]) -> List[List[str]]:
+    needed: Set[str] = set()
+    stack = [name for name in names if name in specs]
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        needed.add(name)
+        stack.extend(item for item in references([specs[name].cmd]) if item in specs)
+
+    waves: List[List[str]] = []
+    done: Set[str] = set()
+    while needed - done:
+        wave = sorted(
+            name for name in needed - done if all(item in done for item in references([specs[name].cmd]) if item in specs)
+        )
+        if not wave:
+            raise ValueError(f"vars reference each other in a cycle: {', '.join(sorted(needed - done))}")
+        waves.append(wave)
+        done.update(wave)
+    return waves
+
+
+def _fresh(spec: DynamicVar, cwd: Path, at: float, deps: Dict[str, Optional[int]]) -> bool:
+    if spec.ttl is not None and time.time() - at >= spec.ttl:
+        return False
+    return not spec.deps or file_stamps(spec.deps, cwd) == deps
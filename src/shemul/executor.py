@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import os
 import subprocess
 from dataclasses import dataclass
-from typing import Dict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+from .output import OutputSink
+
+if TYPE_CHECKING:
+    from .pool import ShellPool
+
+
+READ_SIZE = 256 * 1024
 
 
 @dataclass
@@ -12,9 +22,60 @@ class ExecutionResult:
 
 
 class Executor:
-    def run(self, command: str, env: Dict[str, str] | None = None, dry: bool = False) -> ExecutionResult:
+    def __init__(self, pool: Optional[ShellPool] = None) -> None:
+        self.pool = pool
+
+    def run(
+        self,
+        command: str,
+        env: Dict[str, str] | None = None,
+        dry: bool = False,
+        cwd: Optional[Path] = None,
+        sinks: Optional[Sequence[OutputSink]] = None,
+        pass_fds: Sequence[int] = (),
+    ) -> ExecutionResult:
         if dry:
             return ExecutionResult(command=command, return_code=0)
 
-        completed = subprocess.run(command, shell=True, check=False, env=env)
+        if sinks:
+            return ExecutionResult(command=command, return_code=self._stream(command, env, cwd, sinks, pass_fds))
+
+        if self.pool is not None and not pass_fds:
+            return ExecutionResult(command=command, return_code=self.pool.run(command, cwd=cwd, env=env))
+
+        completed = subprocess.run(command, shell=True, check=False, env=env, cwd=cwd, pass_fds=pass_fds)
         return ExecutionResult(command=command, return_code=completed.returncode)
+
+    def _stream(
+        self,
+        command: str,
+        env: Optional[Dict[str, str]],
+        cwd: Optional[Path],
+        sinks: Sequence[OutputSink],
+        pass_fds: Sequence[int] = (),
+    ) -> int:
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            env=env,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+            pass_fds=pass_fds,
+        )
+        assert process.stdout is not None
+        fd = process.stdout.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, READ_SIZE)
+                if not chunk:
+                    break
+                for sink in sinks:
+                    sink.write(chunk)
+        finally:
+            process.stdout.close()
+            return_code = process.wait()
+        for sink in sinks:
+            sink.close(return_code)
+        return return_code
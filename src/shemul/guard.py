@@ -1,8 +1,92 @@
 from __future__ import annotations
 
+import fnmatch
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
 from rich.prompt import Confirm
 
+from .command import ResolvedCommand, base_name
+
+
+DANGER_PROMPT = "This command is marked as dangerous. Continue?"
+CONFIRM_PROMPT = "Are you sure you want to run this command?"
+
+_ASSUME_VALUES = {
+    "yes": True,
+    "y": True,
+    "true": True,
+    "1": True,
+    "no": False,
+    "n": False,
+    "false": False,
+    "0": False,
+}
+
+
+@dataclass
+class ConfirmPolicy:
+    assume: Optional[bool] = None
+    allow: List[str] = field(default_factory=list)
+    interactive: bool = True
+
+    @classmethod
+    def from_env(cls, yes: bool = False, allow: Iterable[str] = ()) -> "ConfirmPolicy":
+        assume = _ASSUME_VALUES.get(os.environ.get("SHEMUL_ASSUME", "").strip().lower())
+        env_allow = [item.strip() for item in os.environ.get("SHEMUL_ALLOW", "").split(",") if item.strip()]
+        return cls(
+            assume=True if yes else assume,
+            allow=[*env_allow, *allow],
+            interactive=sys.stdin.isatty(),
+        )
+
+    def allows(self, resolved: ResolvedCommand) -> bool:
+        name = base_name(resolved)
+        for pattern in self.allow:
+            if pattern.startswith("group:"):
+                if fnmatch.fnmatchcase(resolved.group, pattern[len("group:"):]):
+                    return True
+            elif fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(resolved.name, pattern):
+                return True
+        return False
+
 
 class Guard:
+    def __init__(self, policy: Optional[ConfirmPolicy] = None) -> None:
+        self.policy = policy or ConfirmPolicy()
+
     def confirm(self, message: str) -> bool:
         return Confirm.ask(message, default=False)
+
+    def decide(self, resolved: ResolvedCommand) -> Optional[bool]:
+        if not (resolved.confirm or resolved.danger):
+            return True
+        if self.policy.allows(resolved):
+            return True
+        if self.policy.assume is not None:
+            return self.policy.assume
+        if not self.policy.interactive:
+            return False
+        return None
+
+    def approve(self, resolved: ResolvedCommand) -> bool:
+        decision = self.decide(resolved)
+        if decision is not None:
+            return decision
+        if resolved.danger and not self.confirm(DANGER_PROMPT):
+            return False
+        if resolved.confirm and not self.confirm(CONFIRM_PROMPT):
+            return False
+        return True
+
+    def approve_all(self, tasks: Sequence[ResolvedCommand]) -> Dict[str, bool]:
+        by_command: Dict[str, bool] = {}
+        decisions: Dict[str, bool] = {}
+        for task in tasks:
+            key = base_name(task)
+            if key not in by_command:
+                by_command[key] = self.approve(task)
+            decisions[task.name] = by_command[key]
+        return decisions
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import glob
+import os
+from pathlib import Path
+from typing import List, Sequence
+
+
+def expand_globs(patterns: Sequence[str], root: Path) -> List[Path]:
+    paths: List[Path] = []
+    seen = set()
+    for pattern in patterns:
+        full = os.path.join(str(root), os.path.expanduser(pattern))
+        for match in sorted(glob.glob(full, recursive=True)):
+            if match in seen or not os.path.isfile(match):
+                continue
+            seen.add(match)
+            paths.append(Path(match))
+    return paths
+
+
+def is_up_to_date(inputs: Sequence[str], outputs: Sequence[str], root: Path) -> bool:
+    if not inputs or not outputs:
+        return False
+    output_files = expand_globs(outputs, root)
+    if not output_files:
+        return False
+    for pattern in outputs:
+        if not glob.has_magic(pattern) and not (root / pattern).exists():
+            return False
+    input_files = expand_globs(inputs, root)
+    if not input_files:
+        return False
+    newest_input = max(path.stat().st_mtime_ns for path in input_files)
+    oldest_output = min(path.stat().st_mtime_ns for path in output_files)
+    return newest_input <= oldest_output
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import re
+import select
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+from .util import is_truthy
+
+
+_AUTH = re.compile(r"--jobserver-(?:auth|fds)=(\S+)")
+TOKEN = b"+"
+
+
+class Jobserver:
+    def __init__(self, read_fd: int, write_fd: int, makeflags: str, owner: bool = False, opened: bool = False) -> None:
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+        self.makeflags = makeflags
+        self.owner = owner
+        self._opened = opened
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> Optional["Jobserver"]:
+        environ = os.environ if environ is None else environ
+        makeflags = environ.get("MAKEFLAGS", "")
+        match = _AUTH.search(makeflags)
+        if not match:
+            return None
+        auth = match.group(1)
+        try:
+            if auth.startswith("fifo:"):
+                fd = os.open(auth[len("fifo:"):], os.O_RDWR)
+                return cls(fd, fd, makeflags, opened=True)
+            read_fd, write_fd = (int(item) for item in auth.split(","))
+            if read_fd < 0 or write_fd < 0:
+                return None
+            os.fstat(read_fd)
+            os.fstat(write_fd)
+            return cls(read_fd, write_fd, makeflags)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def create(cls, jobs: int, environ: Optional[Mapping[str, str]] = None) -> "Jobserver":
+        environ = os.environ if environ is None else environ
+        read_fd, write_fd = os.pipe()
+        os.set_inheritable(read_fd, True)
+        os.set_inheritable(write_fd, True)
+        os.write(write_fd, TOKEN * max(0, jobs - 1))
+        inherited = _AUTH.sub("", environ.get("MAKEFLAGS", "")).strip()
+        makeflags = f"{inherited} -j{jobs} --jobserver-auth={read_fd},{write_fd}".strip()
+        return cls(read_fd, write_fd, makeflags, owner=True)
+
+    @property
+    def fds(self) -> Tuple[int, ...]:
+        if self.read_fd == self.write_fd:
+            return ()
+        return (self.read_fd, self.write_fd)
+
+    def acquire(self) -> bytes:
+        while True:
+            try:
+                token = os.read(self.read_fd, 1)
+            except InterruptedError:
+                continue
+            except BlockingIOError:
+                select.select([self.read_fd], [], [])
+                continue
+            if token:
+                return token
+
+    def release(self, token: bytes) -> None:
+        os.write(self.write_fd, token or TOKEN)
+
+    def env(self) -> Dict[str, str]:
+        return {"MAKEFLAGS": self.makeflags}
+
+    def close(self) -> None:
+        if self.owner:
+            for fd in {self.read_fd, self.write_fd}:
+                if fd >= 0:
+                    os.close(fd)
+        elif self._opened and self.read_fd >= 0:
+            os.close(self.read_fd)
+        self.read_fd = self.write_fd = -1
+
+
+@dataclass
+class LoadLimits:
+    max_load: float
+    min_memory: float = 0.05
+    max_pressure: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "LoadLimits":
+        cpus = os.cpu_count() or 1
+        return cls(
+            max_load=float(os.environ.get("SHEMUL_MAX_LOAD", cpus)),
+            min_memory=float(os.environ.get("SHEMUL_MIN_MEMORY", 0.05)),
+            max_pressure=float(os.environ.get("SHEMUL_MAX_PRESSURE", 60.0)),
+        )
+
+
+class LoadMonitor:
+    def __init__(self, limits: LoadLimits, proc: Path = Path("/proc"), interval: float = 0.25) -> None:
+        self.limits = limits
+        self.proc = proc
+        self.interval = interval
+        self.throttled = 0
+        self._checked = 0.0
+        self._admit = True
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked >= self.interval:
+                self._checked = now
+                self._admit = self._sample()
+            return self._admit
+
+    def _sample(self) -> bool:
+        if self._loadavg() > self.limits.max_load:
+            return False
+        if self._memory_available() < self.limits.min_memory:
+            return False
+        if max(self._pressure("cpu"), self._pressure("memory")) > self.limits.max_pressure:
+            return False
+        return True
+
+    def _loadavg(self) -> float:
+        try:
+            return float((self.proc / "loadavg").read_text().split()[0])
+        except (OSError, ValueError, IndexError):
+            return 0.0
+
+    def _memory_available(self) -> float:
+        values: Dict[str, int] = {}
+        try:
+            for line in (self.proc / "meminfo").read_text().splitlines():
+                key, _, rest = line.partition(":")
+                if key in {"MemTotal", "MemAvailable"}:
+                    values[key] = int(rest.split()[0])
+        except (OSError, ValueError, IndexError):
+            return 1.0
+        if not values.get("MemTotal") or "MemAvailable" not in values:
+            return 1.0
+        return values["MemAvailable"] / values["MemTotal"]
+
+    def _pressure(self, resource: str) -> float:
+        try:
+            text = (self.proc / "pressure" / resource).read_text()
+        except OSError:
+            return 0.0
+        for line in text.splitlines():
+            if line.startswith("some "):
+                for field in line.split()[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "avg10":
+                        try:
+                            return float(value)
+                        except ValueError:
+                            return 0.0
+        return 0.0
+
+
+class SpawnGate:
+    def __init__(self, jobserver: Optional[Jobserver] = None, monitor: Optional[LoadMonitor] = None) -> None:
+        self.jobserver = jobserver
+        self.monitor = monitor
+        self._implicit_free = True
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_jobs(cls, jobs: int) -> "SpawnGate":
+        jobserver: Optional[Jobserver] = None
+        if os.name == "posix" and is_truthy(os.environ.get("SHEMUL_JOBSERVER", "1")):
+            jobserver = Jobserver.from_env()
+            if jobserver is None and jobs > 1:
+                try:
+                    jobserver = Jobserver.create(jobs)
+                except OSError:
+                    jobserver = None
+        monitor = None
+        if jobs > 1 and is_truthy(os.environ.get("SHEMUL_ADMISSION", "1")) and Path("/proc/loadavg").exists():
+            monitor = LoadMonitor(LoadLimits.from_env())
+        return cls(jobserver, monitor)
+
+    def acquire(self) -> Optional[bytes]:
+        with self._lock:
+            implicit = self._implicit_free
+            self._implicit_free = False
+        token: Optional[bytes] = None
+        if not implicit:
+            self._wait_for_capacity()
+            token = self.jobserver.acquire() if self.jobserver else b""
+        with self._lock:
+            self._active += 1
+        return token
+
+    def release(self, token: Optional[bytes]) -> None:
+        with self._lock:
+            self._active -= 1
+            if token is None:
+                self._implicit_free = True
+        if token and self.jobserver is not None:
+            self.jobserver.release(token)
+
+    def env(self) -> Optional[Dict[str, str]]:
+        if self.jobserver is None:
+            return None
+        return {**os.environ, **self.jobserver.env()}
+
+    def fds(self) -> Tuple[int, ...]:
+        return self.jobserver.fds if self.jobserver is not None else ()
+
+    def close(self) -> None:
+        if self.jobserver is not None:
+            self.jobserver.close()
+
+    def __enter__(self) -> "SpawnGate":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _wait_for_capacity(self) -> None:
+        if self.monitor is None:
+            return
+        delay = 0.05
+        while not self.monitor.admit():
+            with self._lock:
+                if self._active == 0:
+                    return
+            self.monitor.throttled += 1
+            time.sleep(delay)
+            delay = min(1.0, delay * 2)
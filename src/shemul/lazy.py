@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Mapping, NamedTuple, Optional, Tuple
+
+from .util import json_loads
+
+
+_STRING_BODY = rb'[^"\\]*(?:\\.[^"\\]*)*'
+_FLAT_MEMBER = re.compile(
+    rb'[\s,]*"(' + _STRING_BODY + rb')"\s*:\s*(\{[^{}"\[\]]*(?:"' + _STRING_BODY + rb'"[^{}"\[\]]*)*\})'
+)
+_KEY = re.compile(rb'[\s,]*"(' + _STRING_BODY + rb')"\s*:\s*')
+_STRING_END = re.compile(_STRING_BODY + rb'"')
+_STRUCTURE = re.compile(rb'[{}\[\]"]')
+_SCALAR = re.compile(rb'[^,}\]\s]*')
+_OBJECT_END = re.compile(rb'[\s,]*\}')
+
+
+class PendingCommand(NamedTuple):
+    data: bytes
+    start: int
+    end: int
+    path: Path
+
+
+Validate = Callable[[str, Dict[str, Any]], None]
+
+
+class LazyCommands(Mapping[str, Dict[str, Any]]):
+    def __init__(self, entries: Dict[str, Any], validate: Optional[Validate] = None) -> None:
+        self._entries = entries
+        self._validate = validate
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        value = self._entries[name]
+        if isinstance(value, PendingCommand):
+            value = json_loads(value.data[value.start:value.end])
+            if self._validate is not None:
+                self._validate(name, value)
+            self._entries[name] = value
+        return value
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def pending(self) -> int:
+        return sum(1 for value in self._entries.values() if isinstance(value, PendingCommand))
+
+
+def merge_commands(lower: Mapping[str, Any], upper: Mapping[str, Any]) -> Mapping[str, Any]:
+    if not isinstance(lower, LazyCommands) and not isinstance(upper, LazyCommands):
+        return {**lower, **upper}
+    entries: Dict[str, Any] = {}
+    validate: Optional[Validate] = None
+    for table in (lower, upper):
+        if isinstance(table, LazyCommands):
+            entries.update(table._entries)
+            validate = validate or table._validate
+        else:
+            entries.update(table)
+    return LazyCommands(entries, validate)
+
+
+def split_commands(data: bytes, path: Path) -> Tuple[Dict[str, Any], Optional[Dict[str, PendingCommand]]]:
+    start = _skip_ws(data, 0)
+    if data[start:start + 1] != b"{":
+        return json_loads(data), None
+
+    commands: Optional[Dict[str, PendingCommand]] = None
+    span: Optional[Tuple[int, int]] = None
+    pos = start + 1
+    while True:
+        member = _KEY.match(data, pos)
+        if member is None:
+            break
+        value_start = member.end()
+        if _key(member.group(1)) == "commands" and data[value_start:value_start + 1] == b"{":
+            commands = {}
+            for name, cmd_start, cmd_end in _members(data, value_start):
+                commands[name] = PendingCommand(data, cmd_start, cmd_end, path)
+                pos = cmd_end
+            pos = _OBJECT_END.match(data, pos if commands else value_start + 1).end()
+            span = (value_start, pos)
+        else:
+            pos = _skip_value(data, value_start)
+
+    if span is None or commands is None:
+        return json_loads(data), None
+    top = json_loads(data[:span[0]] + b"{}" + data[span[1]:])
+    return top, commands
+
+
+def _members(data: bytes, pos: int) -> Iterator[Tuple[str, int, int]]:
+    pos += 1
+    flat_match = _FLAT_MEMBER.match
+    key_match = _KEY.match
+    while True:
+        member = flat_match(data, pos)
+        if member is not None:
+            yield _key(member.group(1)), member.start(2), member.end(2)
+            pos = member.end()
+            continue
+        member = key_match(data, pos)
+        if member is None:
+            if _OBJECT_END.match(data, pos) is None:
+                raise json.JSONDecodeError("Malformed object", data.decode("utf-8", "replace"), pos)
+            return
+        value_start = member.end()
+        value_end = _skip_value(data, value_start)
+        yield _key(member.group(1)), value_start, value_end
+        pos = value_end
+
+
+def _skip_value(data: bytes, pos: int) -> int:
+    head = data[pos:pos + 1]
+    if head == b'"':
+        return _STRING_END.match(data, pos + 1).end()
+    if head not in (b"{", b"["):
+        return _SCALAR.match(data, pos).end()
+
+    depth = 0
+    search = _STRUCTURE.search
+    while True:
+        token = search(data, pos)
+        if token is None:
+            raise json.JSONDecodeError("Unterminated value", data.decode("utf-8", "replace"), pos)
+        char = token.group()
+        if char == b'"':
+            pos = _STRING_END.match(data, token.end()).end()
+            continue
+        pos = token.end()
+        if char in (b"{", b"["):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _skip_ws(data: bytes, pos: int) -> int:
+    while pos < len(data) and data[pos:pos + 1] in (b" ", b"\t", b"\r", b"\n"):
+        pos += 1
+    return pos
+
+
+def _key(raw: bytes) -> str:
+    if b"\\" in raw:
+        return json.loads(b'"' + raw + b'"')
+    return raw.decode("utf-8")
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .command import ResolvedCommand
+from .inputs import expand_globs
+from .output import OutputFilter, OutputOptions, OutputSink, Writer
+from .util import json_loads, write_atomic
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+LOCK_MODES = ("wait", "skip", "share")
+POLL_INTERVAL = 0.05
+
+Execute = Callable[[Optional[Sequence[OutputSink]]], int]
+
+
+class FileSink(OutputSink):
+    def __init__(self, path: Path) -> None:
+        self._handle = path.open("wb", buffering=0)
+
+    def write(self, data: bytes) -> None:
+        self._handle.write(data)
+
+    def close(self, return_code: int) -> None:
+        self._handle.close()
+
+
+class CommandLock:
+    def __init__(self, root: Path, writer: Writer) -> None:
+        self.root = root
+        self.dir = root / ".shemul" / "locks"
+        self.writer = writer
+
+    def key(self, task: ResolvedCommand) -> str:
+        digest = hashlib.sha1()
+        identity = [task.name, task.command, task.env, task.cell]
+        if task.environ:
+            identity.append(task.environ)
+        digest.update(json.dumps(identity, sort_keys=True, default=str).encode("utf-8"))
+        for path in expand_globs(task.inputs, self.root):
+            stat = path.stat()
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:24]
+
+    def run(self, task: ResolvedCommand, sinks: Optional[Sequence[OutputSink]], execute: Execute) -> Tuple[str, int]:
+        if fcntl is None or task.lock not in LOCK_MODES:
+            return _status(execute(sinks))
+        self.dir.mkdir(parents=True, exist_ok=True)
+        key = self.key(task)
+        with (self.dir / f"{key}.lock").open("a+") as handle:
+            if task.lock == "wait":
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                return _status(execute(sinks))
+            if not _try_lock(handle, fcntl.LOCK_EX):
+                if task.lock == "skip":
+                    return "skipped", 0
+                shared = self._follow(handle, key)
+                if shared is not None:
+                    return "shared", shared
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            if task.lock == "skip":
+                return _status(execute(sinks))
+            return _status(self._lead(key, sinks, execute))
+
+    def _lead(self, key: str, sinks: Optional[Sequence[OutputSink]], execute: Execute) -> int:
+        run_id = uuid.uuid4().hex[:12]
+        log_name = f"{key}-{run_id}.log"
+        for stale in self.dir.glob(f"{key}-*.log"):
+            stale.unlink()
+        self._write_state(key, {"state": "running", "id": run_id, "pid": os.getpid(), "log": log_name})
+        extended: List[OutputSink] = list(sinks) if sinks else [OutputFilter(OutputOptions(), self.writer)]
+        extended.append(FileSink(self.dir / log_name))
+        code = 1
+        try:
+            code = execute(extended)
+        finally:
+            self._write_state(key, {"state": "done", "id": run_id, "code": code, "log": log_name})
+        return code
+
+    def _follow(self, handle: IO[str], key: str) -> Optional[int]:
+        log: Optional[IO[bytes]] = None
+        log_name = ""
+        try:
+            while True:
+                state = self._read_state(key)
+                if log is None and state.get("state") == "running":
+                    log_name = str(state.get("log", ""))
+                    log = _open_log(self.dir / log_name)
+                    if log is not None:
+                        self.writer(f"[shemul] sharing running {key[:8]} (pid {state.get('pid')})\n".encode("utf-8"))
+                if log is not None:
+                    self._drain(log)
+                if _try_lock(handle, fcntl.LOCK_SH):
+                    break
+                time.sleep(POLL_INTERVAL)
+
+            state = self._read_state(key)
+            if state.get("state") != "done":
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                return None
+            if log is None or state.get("log") != log_name:
+                if log is not None:
+                    log.close()
+                log = _open_log(self.dir / str(state.get("log", "")))
+            if log is not None:
+                self._drain(log)
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            return int(state.get("code", 1))
+        finally:
+            if log is not None:
+                log.close()
+
+    def _drain(self, log: IO[bytes]) -> None:
+        while True:
+            data = log.read(256 * 1024)
+            if not data:
+                return
+            self.writer(data)
+
+    def _read_state(self, key: str) -> Dict[str, Any]:
+        try:
+            data = json_loads((self.dir / f"{key}.json").read_bytes())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write_state(self, key: str, state: Dict[str, Any]) -> None:
+        write_atomic(self.dir / f"{key}.json", json.dumps(state))
+
+
+def _status(code: int) -> Tuple[str, int]:
+    return ("ok" if code == 0 else "failed"), code
+
+
+def _try_lock(handle: IO[str], operation: int) -> bool:
+    try:
+        fcntl.flock(handle.fileno(), operation | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _open_log(path: Path) -> Optional[IO[bytes]]:
+    try:
+        return path.open("rb")
+    except OSError:
+        return None
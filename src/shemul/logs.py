@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Pattern, Tuple
+
+from .command import ResolvedCommand, base_name
+from .output import OutputSink
+from .util import data_dir, json_loads
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+SEGMENT_SIZE = 8 * 1024 * 1024
+DEFAULT_BUDGET = 256 * 1024 * 1024
+SPOOL_SIZE = 1024 * 1024
+READ_SIZE = 256 * 1024
+GZIP_WBITS = 31
+
+_SEGMENT = re.compile(r"^segment-(\d+)\.gz$")
+
+
+@dataclass
+class LogRecord:
+    id: str
+    name: str
+    command: str
+    root: str
+    started: float
+    ended: float
+    code: int
+    segment: str
+    offset: int
+    length: int
+    size: int
+
+
+class LogSink(OutputSink):
+    def __init__(self, archive: "LogArchive", resolved: ResolvedCommand, root: Path) -> None:
+        self.archive = archive
+        self.name = resolved.name
+        self.command = base_name(resolved)
+        self.root = str(root)
+        self.started = time.time()
+        self.size = 0
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+        self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        self._spool.write(self._compressor.compress(data))
+
+    def close(self, return_code: int) -> None:
+        try:
+            self._spool.write(self._compressor.flush())
+            self.archive.append(self, self._spool, return_code)
+        except OSError:
+            pass
+        finally:
+            self._spool.close()
+
+
+class LogArchive:
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        budget: int = DEFAULT_BUDGET,
+        segment_size: int = SEGMENT_SIZE,
+    ) -> None:
+        self.root = root or data_dir() / "logs"
+        self.budget = budget
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> "LogArchive":
+        settings = settings or {}
+        path = settings.get("path")
+        return cls(
+            root=Path(str(path)).expanduser() if path else None,
+            budget=int(settings.get("budget_mb", DEFAULT_BUDGET // (1024 * 1024))) * 1024 * 1024,
+            segment_size=int(settings.get("segment_mb", SEGMENT_SIZE // (1024 * 1024))) * 1024 * 1024,
+        )
+
+    def sink(self, resolved: ResolvedCommand, root: Path) -> LogSink:
+        return LogSink(self, resolved, root)
+
+    def append(self, sink: LogSink, payload: BinaryIO, return_code: int) -> LogRecord:
+        with self._locked():
+            segment = self._current_segment()
+            offset = segment.stat().st_size if segment.exists() else 0
+            payload.seek(0)
+            with segment.open("ab") as handle:
+                shutil.copyfileobj(payload, handle, READ_SIZE)
+                length = handle.tell() - offset
+            record = LogRecord(
+                id=uuid.uuid4().hex[:12],
+                name=sink.name,
+                command=sink.command,
+                root=sink.root,
+                started=sink.started,
+                ended=time.time(),
+                code=return_code,
+                segment=segment.name,
+                offset=offset,
+                length=length,
+                size=sink.size,
+            )
+            with _index_path(segment).open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(asdict(record), separators=(",", ":")) + "\n")
+            self._evict()
+        return record
+
+    def runs(self, command: Optional[str] = None, root: Optional[Path] = None) -> List[LogRecord]:
+        records: List[LogRecord] = []
+        for _, segment in self._segments():
+            try:
+                lines = _index_path(segment).read_text(encoding="utf-8").splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                try:
+                    record = LogRecord(**json_loads(line))
+                except (TypeError, ValueError):
+                    continue
+                if command is not None and command not in {record.name, record.command}:
+                    continue
+                if root is not None and record.root != str(root):
+                    continue
+                records.append(record)
+        records.sort(key=lambda item: item.started)
+        return records
+
+    def chunks(self, record: LogRecord) -> Iterator[bytes]:
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        remaining = record.length
+        with (self.root / record.segment).open("rb") as handle:
+            handle.seek(record.offset)
+            while remaining > 0:
+                data = handle.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield decompressor.decompress(data)
+        yield decompressor.flush()
+
+    def lines(self, record: LogRecord) -> Iterator[bytes]:
+        partial = b""
+        for chunk in self.chunks(record):
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            yield from lines
+        if partial:
+            yield partial
+
+    def grep(self, records: List[LogRecord], pattern: Pattern[str]) -> Iterator[Tuple[LogRecord, str]]:
+        for record in records:
+            for raw in self.lines(record):
+                line = raw.decode("utf-8", "replace").rstrip("\r")
+                if pattern.search(line):
+                    yield record, line
+
+    def disk_usage(self) -> int:
+        return sum(_segment_bytes(segment) for _, segment in self._segments())
+
+    def _segments(self) -> List[Tuple[int, Path]]:
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return []
+        segments = []
+        for entry in entries:
+            match = _SEGMENT.match(entry.name)
+            if match:
+                segments.append((int(match.group(1)), Path(entry.path)))
+        return sorted(segments)
+
+    def _current_segment(self) -> Path:
+        segments = self._segments()
+        if segments:
+            number, segment = segments[-1]
+            if segment.stat().st_size < self.segment_size:
+                return segment
+            return self.root / _segment_name(number + 1)
+        return self.root / _segment_name(1)
+
+    def _evict(self) -> None:
+        segments = self._segments()
+        total = sum(_segment_bytes(segment) for _, segment in segments)
+        for _, segment in segments[:-1]:
+            if total <= self.budget:
+                break
+            total -= _segment_bytes(segment)
+            for path in (_index_path(segment), segment):
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock, (self.root / ".lock").open("a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            yield
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:08d}.gz"
+
+
+def _index_path(segment: Path) -> Path:
+    return segment.with_suffix(".jsonl")
+
+
+def _segment_bytes(segment: Path) -> int:
+    total = 0
+    for path in (segment, _index_path(segment)):
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return total
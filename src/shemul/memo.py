@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .command import ResolvedCommand
+from .config import ShemulConfig
+from .snapshot import fingerprint
+from .util import cache_dir, is_truthy, json_loads, write_atomic
+
+
+DEFAULT_CAPACITY = 512
+MAX_GENERATIONS = 8
+
+
+def memo_enabled() -> bool:
+    return is_truthy(os.environ.get("SHEMUL_MEMO", "1"))
+
+
+class ResolveCache:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, root: Optional[Path] = None, persist: bool = True) -> None:
+        self.capacity = max(1, capacity)
+        self.root = root or (cache_dir() / "resolved")
+        self.persist = persist
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], ResolvedCommand]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], ResolvedCommand] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        config: ShemulConfig,
+        name: str,
+        resolve: Callable[[], ResolvedCommand],
+        store: bool = True,
+    ) -> ResolvedCommand:
+        identity = fingerprint(config) if memo_enabled() else None
+        if identity is None:
+            return resolve()
+
+        key = (identity, name)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        resolved = self._load(identity, name)
+        if resolved is None:
+            self.misses += 1
+            resolved = resolve()
+            if store and self.persist:
+                with self._lock:
+                    self._pending[key] = resolved
+        else:
+            self.hits += 1
+
+        with self._lock:
+            self._entries[key] = resolved
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return resolved
+
+    def _path(self, identity: str, name: str) -> Path:
+        digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return self.root / identity / f"{digest}.json"
+
+    def _load(self, identity: str, name: str) -> Optional[ResolvedCommand]:
+        if not self.persist:
+            return None
+        try:
+            data = json_loads(self._path(identity, name).read_bytes())
+            return ResolvedCommand(**data)
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def flush(self) -> None:
+        with self._lock:
+            pending = list(self._pending.items())
+            self._pending.clear()
+        fresh: Set[str] = set()
+        for (identity, name), resolved in pending:
+            if identity not in fresh and not (self.root / identity).exists():
+                fresh.add(identity)
+            try:
+                write_atomic(self._path(identity, name), json.dumps(asdict(resolved), separators=(",", ":")))
+            except (OSError, TypeError, ValueError):
+                continue
+        for identity in fresh:
+            self._prune(identity)
+
+    def _prune(self, keep: str) -> None:
+        try:
+            generations = [path for path in self.root.iterdir() if path.is_dir() and path.name != keep]
+            generations.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+        except OSError:
+            return
+        for path in generations[MAX_GENERATIONS - 1:]:
+            shutil.rmtree(path, ignore_errors=True)
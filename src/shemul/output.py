@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Pattern
+
+
+Writer = Callable[[bytes], None]
+
+MAX_LINE = 64 * 1024
+
+
+class OutputSink:
+    def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self, return_code: int) -> None:
+        pass
+
+
+@dataclass
+class OutputOptions:
+    quiet: bool = False
+    tail: int = 200
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+    summary: List[str] = field(default_factory=list)
+    summary_limit: int = 50
+
+    @classmethod
+    def from_config(cls, raw: Optional[Dict[str, Any]]) -> Optional["OutputOptions"]:
+        if not raw:
+            return None
+        return cls(
+            quiet=bool(raw.get("quiet", False)),
+            tail=int(raw.get("tail", 200)),
+            include=[str(item) for item in raw.get("include", [])],
+            exclude=[str(item) for item in raw.get("exclude", [])],
+            summary=[str(item) for item in raw.get("summary", [])],
+            summary_limit=int(raw.get("summary_limit", 50)),
+        )
+
+
+class OutputFilter(OutputSink):
+    def __init__(self, options: OutputOptions, writer: Writer) -> None:
+        self.options = options
+        self.writer = writer
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.summary: Deque[bytes] = deque(maxlen=max(1, options.summary_limit))
+        self._ring: Deque[bytes] = deque(maxlen=max(1, options.tail))
+        self._partial = b""
+        self._include = _line_pattern(options.include)
+        self._exclude = _line_pattern(options.exclude)
+        self._summary = _line_pattern(options.summary)
+        self._passthrough = not (options.quiet or options.include or options.exclude or options.summary)
+
+    def write(self, data: bytes) -> None:
+        self.bytes_in += len(data)
+        if self._passthrough:
+            self._emit(data)
+            return
+
+        buffer = self._partial + data if self._partial else data
+        cut = buffer.rfind(b"\n")
+        if cut < 0:
+            self._partial = buffer
+            if len(self._partial) > MAX_LINE:
+                self._partial = b""
+                self._process(buffer + b"\n")
+            return
+        self._partial = buffer[cut + 1:]
+        self._process(buffer[:cut + 1])
+
+    def close(self, return_code: int) -> None:
+        if self._partial:
+            tail, self._partial = self._partial + b"\n", b""
+            if not self._passthrough:
+                self._process(tail)
+            else:
+                self._emit(tail)
+        if self.options.quiet and return_code != 0 and self._ring:
+            self._emit(f"--- last {len(self._ring)} lines of output ---\n".encode("utf-8"))
+            self._emit(b"".join(self._ring))
+
+    def _process(self, block: bytes) -> None:
+        if self._summary is not None:
+            for match in self._summary.finditer(block):
+                self.summary.append(match.group().rstrip(b"\n"))
+
+        if self._include is not None:
+            block = b"".join(match.group() for match in self._include.finditer(block))
+        if self._exclude is not None and block:
+            block = self._exclude.sub(b"", block)
+        if not block:
+            return
+
+        if self.options.quiet:
+            lines = block.splitlines(keepends=True)
+            self._ring.extend(lines[-self._ring.maxlen:] if self._ring.maxlen else lines)
+            return
+        self._emit(block)
+
+    def _emit(self, data: bytes) -> None:
+        self.bytes_out += len(data)
+        self.writer(data)
+
+
+def _line_pattern(patterns: List[str]) -> Optional[Pattern[bytes]]:
+    if not patterns:
+        return None
+    joined = "|".join(f"(?:{pattern})" for pattern in patterns)
+    return re.compile(rb"(?m)^[^\n]*?(?:" + joined.encode("utf-8") + rb")[^\n]*\n")
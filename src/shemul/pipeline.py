@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import errno
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class Stage:
+    name: str
+    command: str
+    env: Optional[Dict[str, str]] = None
+    tee: Optional[Path] = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    return_code: int
+    bytes_out: Optional[int]
+    duration: float
+    transfer: str = "-"
+    error: Optional[str] = None
+
+    @property
+    def throughput(self) -> Optional[float]:
+        if self.bytes_out is None or self.duration <= 0:
+            return None
+        return self.bytes_out / self.duration
+
+
+class Relay(threading.Thread):
+    def __init__(self, src: int, dst: int, tee: Optional[Path] = None) -> None:
+        super().__init__(daemon=True)
+        self.src = src
+        self.dst = dst
+        self.tee = tee
+        self.bytes = 0
+        self.mode = "splice" if hasattr(os, "splice") else "copy"
+        self.error: Optional[str] = None
+
+    def run(self) -> None:
+        tee_fd: Optional[int] = None
+        try:
+            if self.tee is not None:
+                self.tee.parent.mkdir(parents=True, exist_ok=True)
+                tee_fd = os.open(self.tee, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            if self.mode == "splice":
+                self._splice(tee_fd)
+            if self.mode == "copy":
+                self._copy(tee_fd)
+        except BrokenPipeError:
+            pass
+        except OSError as exc:
+            self.error = f"tee {self.tee}: {exc.strerror or exc}"
+        finally:
+            if tee_fd is not None:
+                os.close(tee_fd)
+            os.close(self.src)
+            os.close(self.dst)
+
+    def _splice(self, tee_fd: Optional[int]) -> None:
+        while True:
+            try:
+                if tee_fd is None:
+                    moved = os.splice(self.src, self.dst, CHUNK_SIZE)
+                else:
+                    offset = os.lseek(tee_fd, 0, os.SEEK_CUR)
+                    moved = os.splice(self.src, tee_fd, CHUNK_SIZE)
+                    _send_all(self.dst, tee_fd, offset, moved)
+            except OSError as exc:
+                if exc.errno in {errno.EINVAL, errno.ENOSYS} and self.bytes == 0:
+                    self.mode = "copy"
+                    return
+                if exc.errno == errno.EPIPE:
+                    raise BrokenPipeError from exc
+                raise
+            if not moved:
+                return
+            self.bytes += moved
+
+    def _copy(self, tee_fd: Optional[int]) -> None:
+        while True:
+            data = os.read(self.src, CHUNK_SIZE)
+            if not data:
+                return
+            if tee_fd is not None:
+                _write_all(tee_fd, data)
+            _write_all(self.dst, data)
+            self.bytes += len(data)
+
+
+class Pipeline:
+    def __init__(self, stages: Sequence[Stage], cwd: Optional[Path] = None) -> None:
+        self.stages = list(stages)
+        self.cwd = cwd
+
+    def run(self) -> List[StageResult]:
+        processes: List[subprocess.Popen] = []
+        relays: List[Optional[Relay]] = []
+        started: List[float] = []
+        upstream: Optional[int] = None
+        try:
+            for index, stage in enumerate(self.stages):
+                last = index == len(self.stages) - 1
+                read_out, write_out = (None, None) if last else os.pipe()
+                started.append(time.perf_counter())
+                try:
+                    process = subprocess.Popen(
+                        stage.command, shell=True, env=stage.env, cwd=self.cwd, stdin=upstream, stdout=write_out
+                    )
+                finally:
+                    if upstream is not None:
+                        os.close(upstream)
+                        upstream = None
+                    if write_out is not None:
+                        os.close(write_out)
+                processes.append(process)
+                if read_out is None or stage.tee is None:
+                    relays.append(None)
+                    upstream = read_out
+                    continue
+                next_read, next_write = os.pipe()
+                relay = Relay(read_out, next_write, stage.tee)
+                relay.start()
+                relays.append(relay)
+                upstream = next_read
+        except BaseException:
+            if upstream is not None:
+                os.close(upstream)
+            for process in processes:
+                process.kill()
+                process.wait()
+            raise
+
+        ended: Dict[int, float] = {}
+        pending = set(range(len(processes)))
+        while pending:
+            for index in list(pending):
+                if processes[index].poll() is not None:
+                    ended[index] = time.perf_counter()
+                    pending.discard(index)
+            if pending:
+                time.sleep(0.01)
+        results: List[StageResult] = []
+        for index, stage in enumerate(self.stages):
+            relay = relays[index]
+            if relay is not None:
+                relay.join()
+            error = relay.error if relay is not None else None
+            return_code = processes[index].returncode
+            results.append(
+                StageResult(
+                    name=stage.name,
+                    return_code=return_code or (1 if error else 0),
+                    bytes_out=relay.bytes if relay is not None else None,
+                    duration=ended[index] - started[index],
+                    transfer=relay.mode if relay is not None else "pipe" if index < len(self.stages) - 1 else "-",
+                    error=error,
+                )
+            )
+        return results
+
+
+def pipefail(results: Sequence[StageResult]) -> int:
+    for result in reversed(results):
+        if result.return_code != 0:
+            return result.return_code
+    return 0
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _send_all(dst: int, src: int, offset: int, count: int) -> None:
+    while count > 0:
+        sent = os.sendfile(dst, src, offset, count)
+        if not sent:
+            return
+        offset += sent
+        count -= sent
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+import queue
+import shlex
+import shutil
+import socket
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .util import is_truthy
+
+
+_SHELL_MANAGED = {"PWD", "OLDPWD", "SHLVL", "_"}
+
+_LOOP = """
+while :; do
+  script=""
+  got=0
+  while IFS= read -r line; do
+    got=1
+    [ "$line" = "{eot}" ] && break
+    script="$script$line
+"
+  done
+  [ "$got" = 1 ] || exit 0
+  ( eval "$script" ) </dev/null
+  printf '%s\\n' "$?" >&0
+done
+"""
+
+
+def pool_supported() -> bool:
+    return os.name == "posix" and shutil.which("sh") is not None
+
+
+def pool_size_from_env() -> int:
+    value = os.environ.get("SHEMUL_POOL", "").strip()
+    if not value:
+        return 0
+    if value.isdigit():
+        return int(value)
+    if is_truthy(value):
+        return os.cpu_count() or 1
+    return 0
+
+
+class ShellWorker:
+    def __init__(self, shell: str = "/bin/sh", env: Optional[Dict[str, str]] = None) -> None:
+        self.base_env = dict(os.environ if env is None else env)
+        self._eot = f"__SHEMUL_EOT_{uuid.uuid4().hex}__"
+        parent, child = socket.socketpair()
+        try:
+            self.process = subprocess.Popen([shell, "-c", _LOOP.format(eot=self._eot)], stdin=child, env=self.base_env)
+        finally:
+            child.close()
+        self._socket = parent
+        self._commands = parent.makefile("w", encoding="utf-8")
+        self._status = parent.makefile("r", encoding="utf-8")
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, command: str, cwd: Optional[Path] = None, env: Optional[Dict[str, str]] = None) -> int:
+        lines: List[str] = []
+        if cwd is not None:
+            lines.append(f"cd {shlex.quote(str(cwd))} || exit 127")
+        lines.extend(self._env_lines(env))
+        lines.append(command)
+        lines.append(self._eot)
+        try:
+            self._commands.write("\n".join(lines) + "\n")
+            self._commands.flush()
+            status = self._status.readline()
+        except (BrokenPipeError, OSError):
+            status = ""
+        if not status.strip():
+            self.close()
+            return self.process.returncode if self.process.returncode not in (None, 0) else 1
+        return int(status.strip())
+
+    def _env_lines(self, env: Optional[Dict[str, str]]) -> List[str]:
+        if env is None:
+            return []
+        lines = [f"unset {key}" for key in self.base_env if key not in env and key not in _SHELL_MANAGED and key.isidentifier()]
+        for key, value in env.items():
+            if key.isidentifier() and self.base_env.get(key) != value:
+                lines.append(f"export {key}={shlex.quote(str(value))}")
+        return lines
+
+    def close(self) -> None:
+        for handle in (self._commands, self._status, self._socket):
+            try:
+                handle.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class ShellPool:
+    def __init__(self, size: int, shell: Optional[str] = None) -> None:
+        self.size = max(1, size)
+        self.shell = shell or shutil.which("sh") or "/bin/sh"
+        self._idle: "queue.Queue[ShellWorker]" = queue.Queue()
+        self._workers: List[ShellWorker] = []
+        self._lock = threading.Lock()
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> ShellWorker:
+        worker = ShellWorker(self.shell)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def run(self, command: str, cwd: Optional[Path] = None, env: Optional[Dict[str, str]] = None) -> int:
+        worker = self._idle.get()
+        try:
+            return worker.run(command, cwd=cwd, env=env)
+        finally:
+            if worker.alive:
+                self._idle.put(worker)
+            else:
+                with self._lock:
+                    self._workers.remove(worker)
+                self._idle.put(self._spawn())
+
+    def close(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+    def __enter__(self) -> "ShellPool":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
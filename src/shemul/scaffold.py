@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import glob
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import jsonschema
+
+from .template import build_template_config, suggest_template
+from .util import write_atomic
+
+
+Validate = Callable[[Dict[str, Any]], None]
+
+
+@dataclass
+class ScaffoldResult:
+    path: Path
+    template: str
+    status: str
+    detail: str = ""
+
+
+def expand_targets(patterns: Sequence[str], cwd: Path) -> List[Path]:
+    targets: List[Path] = []
+    seen = set()
+    for pattern in patterns:
+        full = os.path.join(str(cwd), os.path.expanduser(pattern))
+        matches = sorted(glob.glob(full)) if glob.has_magic(pattern) else [full]
+        for match in matches:
+            path = Path(match)
+            key = os.path.realpath(path)
+            if key in seen or not path.is_dir():
+                continue
+            seen.add(key)
+            targets.append(path)
+    return targets
+
+
+def scaffold_one(root: Path, validate: Validate, template: Optional[str] = None, force: bool = False) -> ScaffoldResult:
+    target = root / "shemul.json"
+    existed = target.exists()
+    if existed and not force:
+        return ScaffoldResult(target, "-", "skipped", "already initialized")
+    key = template or suggest_template(root)
+    try:
+        payload = build_template_config(key, root.resolve().name)
+        validate(payload)
+        write_atomic(target, json.dumps(payload, indent=2) + "\n")
+    except jsonschema.ValidationError as exc:
+        return ScaffoldResult(target, key, "failed", exc.message)
+    except OSError as exc:
+        return ScaffoldResult(target, key, "failed", str(exc))
+    return ScaffoldResult(target, key, "overwritten" if existed else "created")
+
+
+def scaffold_many(
+    roots: Sequence[Path],
+    validate: Validate,
+    template: Optional[str] = None,
+    force: bool = False,
+    max_workers: Optional[int] = None,
+) -> List[ScaffoldResult]:
+    if len(roots) <= 1:
+        return [scaffold_one(root, validate, template, force) for root in roots]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda root: scaffold_one(root, validate, template, force), roots))
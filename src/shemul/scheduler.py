@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
+
+from .cache import TaskCache
+from .command import ResolvedCommand
+from .executor import Executor
+from .inputs import is_up_to_date
+from .locks import CommandLock
+from .output import OutputSink
+from .timings import TimingStore, longest_first
+
+if TYPE_CHECKING:
+    from .jobserver import SpawnGate
+
+
+SinkFactory = Callable[[ResolvedCommand], List[OutputSink]]
+
+
+@dataclass
+class TaskResult:
+    name: str
+    command: str
+    status: str
+    return_code: int
+    duration: float
+    started: float = 0.0
+
+
+class Scheduler:
+    def __init__(
+        self,
+        executor: Executor,
+        jobs: int = 1,
+        root: Optional[Path] = None,
+        task_cache: Optional[TaskCache] = None,
+        sink_factory: Optional[SinkFactory] = None,
+        timings: Optional[TimingStore] = None,
+        gate: Optional[SpawnGate] = None,
+        cwd: Optional[Path] = None,
+        locks: Optional[CommandLock] = None,
+    ) -> None:
+        self.executor = executor
+        self.jobs = max(1, jobs)
+        self.root = root or Path.cwd()
+        self.task_cache = task_cache
+        self.sink_factory = sink_factory
+        self.timings = timings
+        self.gate = gate
+        self.cwd = cwd
+        self.locks = locks
+        self._origin = 0.0
+
+    def run(self, tasks: Sequence[ResolvedCommand]) -> List[TaskResult]:
+        self._origin = time.perf_counter()
+        results: List[Optional[TaskResult]] = [None] * len(tasks)
+        pending: List[int] = []
+        for index, task in enumerate(tasks):
+            if is_up_to_date(task.inputs, task.outputs, self.root):
+                results[index] = TaskResult(task.name, task.command, "up-to-date", 0, 0.0)
+            else:
+                pending.append(index)
+        pending = [pending[order] for order in longest_first([tasks[index].name for index in pending], self.timings)]
+
+        if self.jobs == 1 or len(pending) <= 1:
+            for index in pending:
+                results[index] = self._run_one(tasks[index])
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(self.jobs, len(pending))) as pool:
+                futures = {index: pool.submit(self._run_one, tasks[index]) for index in pending}
+                for index, future in futures.items():
+                    results[index] = future.result()
+
+        if self.timings is not None:
+            self.timings.save()
+        return [result for result in results if result is not None]
+
+    def _run_one(self, task: ResolvedCommand) -> TaskResult:
+        started = time.perf_counter()
+        offset = started - self._origin
+        key = self._cache_key(task)
+        if key and self._restore(key):
+            return TaskResult(task.name, task.command, "cached", 0, time.perf_counter() - started, offset)
+
+        sinks = self.sink_factory(task) if self.sink_factory else None
+        if self.locks is not None and task.lock:
+            status, code = self.locks.run(task, sinks, lambda chosen: self._execute(task, chosen))
+        else:
+            code = self._execute(task, sinks)
+            status = "ok" if code == 0 else "failed"
+        if key and status == "ok":
+            self._store(key, task)
+        duration = time.perf_counter() - started
+        if self.timings is not None and status == "ok":
+            self.timings.record(task.name, duration)
+        return TaskResult(task.name, task.command, status, code, duration, offset)
+
+    def _execute(self, task: ResolvedCommand, sinks: Optional[Sequence[OutputSink]]) -> int:
+        if self.gate is None:
+            return self.executor.run(task.command, env=self._environ(task, None), cwd=self.cwd, sinks=sinks).return_code
+        token = self.gate.acquire()
+        try:
+            env = self._environ(task, self.gate.env())
+            result = self.executor.run(task.command, env=env, cwd=self.cwd, sinks=sinks, pass_fds=self.gate.fds())
+        finally:
+            self.gate.release(token)
+        return result.return_code
+
+    def _environ(self, task: ResolvedCommand, base: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        if not task.environ:
+            return base
+        return {**(base or os.environ), **task.environ}
+
+    def _cache_key(self, task: ResolvedCommand) -> Optional[str]:
+        if self.task_cache is None or not task.cache or not task.outputs:
+            return None
+        return self.task_cache.key_for(task, self.root)
+
+    def _restore(self, key: str) -> bool:
+        assert self.task_cache is not None
+        try:
+            return self.task_cache.restore(key, self.root)
+        except (OSError, ValueError):
+            return False
+
+    def _store(self, key: str, task: ResolvedCommand) -> None:
+        assert self.task_cache is not None
+        try:
+            self.task_cache.store(key, task, self.root)
+        except (OSError, ValueError):
+            pass
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Set
+
+from .config import ConfigLoader, ShemulConfig
+from .context import ContextDiscovery, ProjectContext
+from .util import global_config_path
+from .watch import ConfigWatcher, create_watcher
+
+
+WatcherFactory = Callable[[Sequence[Path], Sequence[Path]], ConfigWatcher]
+
+
+@dataclass
+class ReloadStats:
+    backend: str = ""
+    checks: int = 0
+    reloads: int = 0
+    project_reloads: int = 0
+    global_reloads: int = 0
+    last_ms: float = 0.0
+    total_ms: float = 0.0
+
+    def describe(self) -> str:
+        return (
+            f"Reloads: {self.reloads} (project {self.project_reloads}, global {self.global_reloads}) "
+            f"in {self.checks} checks via {self.backend}; last {self.last_ms:.2f}ms, total {self.total_ms:.2f}ms"
+        )
+
+
+class ConfigSession:
+    def __init__(
+        self,
+        loader: ConfigLoader,
+        start: Path,
+        global_path: Optional[Path] = None,
+        watcher_factory: WatcherFactory = create_watcher,
+    ) -> None:
+        self.loader = loader
+        self.start = start
+        self.global_path = global_path or global_config_path()
+        self.watcher_factory = watcher_factory
+        self.stats = ReloadStats()
+        self.context: Optional[ProjectContext] = ContextDiscovery(start).discover()
+        self.project_config = self._load(self.context.config_path if self.context else None)
+        self.global_config = self._load(self.global_path)
+        self.config = loader.merge(self.project_config, self.global_config)
+        self._pending: Set[str] = set()
+        self._watcher = self._watch()
+
+    def refresh(self) -> Optional[ShemulConfig]:
+        self.stats.checks += 1
+        self._pending.update(self._changed_scopes(self._watcher.changed()))
+        if not self._pending:
+            return self.config
+
+        started = time.perf_counter()
+        for scope in [item for item in ("project", "global") if item in self._pending]:
+            self._reload(scope)
+            self._pending.discard(scope)
+        self._watcher.close()
+        self._watcher = self._watch()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats.reloads += 1
+        self.stats.last_ms = elapsed
+        self.stats.total_ms += elapsed
+        return self.config
+
+    def close(self) -> None:
+        self._watcher.close()
+
+    def _reload(self, scope: str) -> None:
+        if scope == "project":
+            previous = self.project_config
+            self.context = ContextDiscovery(self.start).discover()
+            self.project_config = self._load(self.context.config_path if self.context else None)
+            self.stats.project_reloads += 1
+        else:
+            previous = self.global_config
+            self.global_config = self._load(self.global_path)
+            self.stats.global_reloads += 1
+        self.config = self.loader.remerge(self.config, self.project_config, self.global_config, previous, scope)
+
+    def _changed_scopes(self, changed: Set[Path]) -> List[str]:
+        scopes: List[str] = []
+        if changed & self._scope_paths(self.project_config) or (self.context is None and self._project_appeared()):
+            scopes.append("project")
+        if changed & self._scope_paths(self.global_config) or self.global_path in changed:
+            scopes.append("global")
+        return scopes
+
+    def _project_appeared(self) -> bool:
+        return ContextDiscovery(self.start).discover() is not None
+
+    def _scope_paths(self, config: Optional[ShemulConfig]) -> Set[Path]:
+        if config is None:
+            return set()
+        return {*config.files, *config.include_dirs}
+
+    def _load(self, path: Optional[Path]) -> Optional[ShemulConfig]:
+        if path is None or not path.exists():
+            return None
+        return self.loader.load(path)
+
+    def _watch(self) -> ConfigWatcher:
+        files: List[Path] = [self.global_path]
+        dirs: List[Path] = []
+        for config in (self.project_config, self.global_config):
+            if config is not None:
+                files.extend(config.files)
+                dirs.extend(config.include_dirs)
+        watcher = self.watcher_factory(files, dirs)
+        self.stats.backend = watcher.backend
+        return watcher
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import argparse
+import shlex
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import jsonschema
+
+from .app import App, AppState
+from .autocomplete import complete
+from .config import ShemulConfig
+from .util import cache_dir
+
+try:
+    import readline as _readline
+except ImportError:
+    _readline = None
+
+
+Dispatch = Callable[[App, AppState, argparse.Namespace, Path], int]
+
+SHELL_COMMANDS = [":dry", ":trace", ":jobs", ":wait", ":help", ":quit"]
+HISTORY_LENGTH = 1000
+
+
+@dataclass
+class Job:
+    id: int
+    line: str
+    thread: Optional[threading.Thread] = None
+    code: Optional[int] = None
+    reported: bool = False
+
+
+class Shell:
+    def __init__(
+        self,
+        app: App,
+        cwd: Path,
+        dispatch: Dispatch,
+        parser_factory: Callable[[], argparse.ArgumentParser],
+        input_func: Callable[[str], str] = input,
+    ) -> None:
+        self.app = app
+        self.cwd = cwd
+        self.dispatch = dispatch
+        self.parser_factory = parser_factory
+        self.input = input_func
+        self.dry = False
+        self.trace = False
+        self.jobs: Dict[int, Job] = {}
+        self._candidates: Tuple[Optional[ShemulConfig], List[str]] = (None, [])
+        self._matches: List[str] = []
+
+    def run(self) -> int:
+        ui = self.app.ui
+        try:
+            self.app.open_session(self.cwd)
+        except (OSError, ValueError, jsonschema.ValidationError) as exc:
+            ui.error(f"Could not load config: {exc}")
+            return 1
+        history = self._setup_readline()
+        ui.info("Shemul shell. Run commands by name; :help lists shell commands, :quit exits.")
+        code = 0
+        try:
+            while True:
+                self._report_jobs()
+                try:
+                    line = self.input(self._prompt())
+                except EOFError:
+                    break
+                except KeyboardInterrupt:
+                    ui.console.print()
+                    continue
+                result = self.execute(line)
+                if result is None:
+                    break
+                code = result
+        finally:
+            self._wait_jobs()
+            self._save_history(history)
+            self.app.close()
+        return code
+
+    def execute(self, line: str) -> Optional[int]:
+        ui = self.app.ui
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return 0
+        if line.startswith(":") or line in {"exit", "quit"}:
+            return self._builtin(line)
+
+        background = line.endswith("&")
+        if background:
+            line = line[:-1].rstrip()
+        try:
+            tokens = shlex.split(line)
+            ns = self.parser_factory().parse_args(tokens)
+        except ValueError as exc:
+            ui.error(str(exc))
+            return 2
+        except SystemExit as exc:
+            return exc.code if isinstance(exc.code, int) else 2
+        if ns.command == "shell":
+            ui.warn("Already in a shemul shell.")
+            return 0
+        ns.dry = ns.dry or self.dry
+        ns.trace = ns.trace or self.trace
+
+        try:
+            state = self.app.session_state()
+        except (OSError, ValueError, jsonschema.ValidationError) as exc:
+            ui.error(f"Config reload failed: {exc}")
+            return 1
+
+        if background:
+            return self._start_job(line, state, ns)
+        return self._dispatch(state, ns)
+
+    def complete(self, text: str, index: int) -> Optional[str]:
+        if index == 0:
+            words = _readline.get_line_buffer()[: _readline.get_begidx()].split() if _readline else []
+            session = self.app.session
+            if words and session is not None and session.config is not None:
+                self._matches = self.app.completion(session.config, words + [text])
+            else:
+                candidates = SHELL_COMMANDS if text.startswith(":") else self._names()
+                self._matches = complete([text], candidates)
+        return self._matches[index] if index < len(self._matches) else None
+
+    def _names(self) -> List[str]:
+        session = self.app.session
+        config = session.config if session else None
+        if config is None:
+            return []
+        if self._candidates[0] is not config:
+            builtins = ["init", "ls", "info", "help", "doctor", "schema", "compile", "resolve", "batch", "logs"]
+            self._candidates = (config, sorted(set(builtins) | set(config.commands)))
+        return self._candidates[1]
+
+    def _dispatch(self, state: AppState, ns: argparse.Namespace) -> int:
+        try:
+            return self.dispatch(self.app, state, ns, self.cwd)
+        except SystemExit as exc:
+            return exc.code if isinstance(exc.code, int) else 1
+        except KeyboardInterrupt:
+            self.app.ui.warn("Interrupted.")
+            return 130
+
+    def _start_job(self, line: str, state: AppState, ns: argparse.Namespace) -> int:
+        ui = self.app.ui
+        config = state.config
+        if config is not None and ns.command in config.commands:
+            self.app.configure_guard(config, yes=ns.yes)
+            try:
+                resolved = self.app.resolve(config, ns.command)
+            except ValueError as exc:
+                ui.error(str(exc))
+                return 1
+            if self.app.guard.decide(resolved) is None:
+                ui.warn(f"{ns.command} needs confirmation; run it in the foreground or pass --yes.")
+                return 1
+
+        job = Job(id=max(self.jobs, default=0) + 1, line=line)
+
+        def work() -> None:
+            job.code = self._dispatch(state, ns)
+
+        job.thread = threading.Thread(target=work, name=f"shemul-job-{job.id}", daemon=True)
+        self.jobs[job.id] = job
+        job.thread.start()
+        ui.info(f"[{job.id}] started: {line}")
+        return 0
+
+    def _report_jobs(self) -> None:
+        for job in self.jobs.values():
+            if job.code is not None and not job.reported:
+                job.reported = True
+                self.app.ui.info(f"[{job.id}] done (exit {job.code}): {job.line}")
+
+    def _wait_jobs(self) -> None:
+        for job in self.jobs.values():
+            if job.thread is not None:
+                job.thread.join()
+        self._report_jobs()
+
+    def _builtin(self, line: str) -> Optional[int]:
+        ui = self.app.ui
+        command = line.split()[0]
+        if command in {":quit", ":q", "exit", "quit"}:
+            return None
+        if command == ":dry":
+            self.dry = not self.dry
+            ui.info(f"dry run: {'on' if self.dry else 'off'}")
+            return 0
+        if command == ":trace":
+            self.trace = not self.trace
+            ui.info(f"trace: {'on' if self.trace else 'off'}")
+            return 0
+        if command == ":jobs":
+            rows = [[str(job.id), "running" if job.code is None else f"exit {job.code}", job.line] for job in self.jobs.values()]
+            ui.table("Jobs", ["id", "status", "command"], rows)
+            return 0
+        if command == ":wait":
+            self._wait_jobs()
+            return 0
+        if command == ":help":
+            rows = [
+                [":dry", "Toggle --dry for following commands"],
+                [":trace", "Toggle --trace for following commands"],
+                [":jobs", "List background jobs"],
+                [":wait", "Wait for background jobs"],
+                [":quit", "Leave the shell (also exit, quit, Ctrl-D)"],
+                ["<command> &", "Run a command in the background"],
+            ]
+            ui.table("Shell Commands", ["command", "description"], rows)
+            return 0
+        ui.error(f"Unknown shell command: {command}")
+        return 2
+
+    def _prompt(self) -> str:
+        flags = [name for name, enabled in (("dry", self.dry), ("trace", self.trace)) if enabled]
+        return f"shemul[{','.join(flags)}]> " if flags else "shemul> "
+
+    def _setup_readline(self) -> Optional[Path]:
+        if _readline is None or not sys.stdin.isatty():
+            return None
+        history = cache_dir() / "shell_history"
+        try:
+            _readline.read_history_file(str(history))
+        except OSError:
+            pass
+        _readline.set_history_length(HISTORY_LENGTH)
+        _readline.set_completer_delims(" \t\n")
+        _readline.set_completer(self.complete)
+        _readline.parse_and_bind("tab: complete")
+        return history
+
+    def _save_history(self, history: Optional[Path]) -> None:
+        if _readline is None or history is None:
+            return
+        try:
+            history.parent.mkdir(parents=True, exist_ok=True)
+            _readline.write_history_file(str(history))
+        except OSError:
+            pass
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .config import ShemulConfig
+from .util import cache_dir, is_truthy, json_loads, write_atomic
+from .version import __version__
+
+
+MAGIC = b"SHMS"
+VERSION = 2
+FLAG_CONFIRM = 1
+FLAG_DANGER = 2
+
+_HEADER = struct.Struct("<4sHHIIIII16s20s")
+SCHEMA_PATH = Path(__file__).parent / "schema.json"
+_RECORD = struct.Struct("<IIIIIIIIII")
+
+
+def snapshots_enabled() -> bool:
+    return is_truthy(os.environ.get("SHEMUL_SNAPSHOT", "1"))
+
+
+def snapshot_path(scopes: Sequence[Optional[Path]]) -> Path:
+    key = "|".join(str(path.resolve()) if path else "" for path in scopes)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return cache_dir() / "snapshots" / f"{digest}.bin"
+
+
+def write_snapshot(config: ShemulConfig, scopes: Sequence[Optional[ShemulConfig]], target: Path) -> Path:
+    commands = config.commands
+    names = sorted(commands, key=lambda item: item.encode("utf-8"))
+    strings = bytearray()
+
+    def add(text: str) -> Tuple[int, int]:
+        data = text.encode("utf-8")
+        offset = len(strings)
+        strings.extend(data)
+        return offset, len(data)
+
+    source_index: Dict[str, int] = {}
+    records = bytearray()
+    for name in names:
+        cfg = commands[name]
+        source = str(config.source_of(name))
+        index = source_index.setdefault(source, len(source_index))
+        flags = (FLAG_CONFIRM if cfg.get("confirm") else 0) | (FLAG_DANGER if cfg.get("danger") else 0)
+        fields = (
+            add(name)
+            + add(str(cfg.get("group", "core")))
+            + add(str(cfg.get("desc", "")))
+            + add(json.dumps(cfg, separators=(",", ":")))
+        )
+        records.extend(_RECORD.pack(*fields, index, flags))
+
+    meta = {
+        "path": str(config.path),
+        "raw": {key: value for key, value in config.raw.items() if key != "commands"},
+        "scopes": [_scope_meta(scope) for scope in scopes],
+        "sources": list(source_index),
+        "files": [_file_stamp(path) for path in config.files],
+        "dirs": [_dir_stamp(path) for path in config.include_dirs],
+    }
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+
+    records_offset = _HEADER.size
+    strings_offset = records_offset + len(records)
+    meta_offset = strings_offset + len(strings)
+    header = _HEADER.pack(
+        MAGIC, VERSION, 0, len(names), records_offset, strings_offset, meta_offset, len(meta_bytes), *_build()
+    )
+    return write_atomic(target, header + bytes(records) + bytes(strings) + meta_bytes)
+
+
+def fingerprint(config: ShemulConfig) -> Optional[str]:
+    if not config.files:
+        return None
+    stamps = {
+        "files": [_file_stamp(path) for path in config.files],
+        "dirs": [_dir_stamp(path) for path in config.include_dirs],
+    }
+    return hashlib.sha1(json.dumps(stamps, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class Snapshot:
+    def __init__(self, path: Path, view: mmap.mmap) -> None:
+        self.path = path
+        self._view = view
+        magic, version, _, count, records_offset, strings_offset, meta_offset, meta_len, *build = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION or tuple(build) != _build():
+            raise ValueError(f"Unsupported snapshot format: {path}")
+        self.count = count
+        self._records_offset = records_offset
+        self._strings_offset = strings_offset
+        self.meta: Dict[str, Any] = json_loads(view[meta_offset:meta_offset + meta_len])
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["Snapshot"]:
+        try:
+            with path.open("rb") as handle:
+                view = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(path, view)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def is_fresh(self, scopes: Sequence[Optional[Path]]) -> bool:
+        expected = [str(path.resolve()) if path else None for path in scopes]
+        if [scope["path"] if scope else None for scope in self.meta["scopes"]] != expected:
+            return False
+        for path, mtime_ns, size in self.meta["files"]:
+            if _file_stamp(Path(path)) != [path, mtime_ns, size]:
+                return False
+        for path, mtime_ns in self.meta["dirs"]:
+            if _dir_stamp(Path(path)) != [path, mtime_ns]:
+                return False
+        return True
+
+    def config(self) -> ShemulConfig:
+        raw = dict(self.meta["raw"])
+        raw["commands"] = SnapshotCommands(self)
+        return ShemulConfig(
+            raw=raw,
+            path=Path(self.meta["path"]),
+            sources=SnapshotSources(self),
+            files=[Path(item[0]) for item in self.meta["files"]],
+            include_dirs=[Path(item[0]) for item in self.meta["dirs"]],
+        )
+
+    def scope_config(self, index: int) -> Optional[ShemulConfig]:
+        scope = self.meta["scopes"][index]
+        if not scope:
+            return None
+        return ShemulConfig(raw={"name": scope["name"]}, path=Path(scope["path"]))
+
+    def record(self, index: int) -> Tuple[int, ...]:
+        return _RECORD.unpack_from(self._view, self._records_offset + index * _RECORD.size)
+
+    def string(self, offset: int, length: int) -> bytes:
+        start = self._strings_offset + offset
+        return self._view[start:start + length]
+
+    def find(self, name: str) -> int:
+        target = name.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record = self.record(middle)
+            current = self.string(record[0], record[1])
+            if current == target:
+                return middle
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle
+        return -1
+
+
+class SnapshotCommands(Mapping[str, Dict[str, Any]]):
+    def __init__(self, snapshot: Snapshot) -> None:
+        self._snapshot = snapshot
+        self._decoded: Dict[str, Dict[str, Any]] = {}
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        cached = self._decoded.get(name)
+        if cached is not None:
+            return cached
+        index = self._snapshot.find(name)
+        if index < 0:
+            raise KeyError(name)
+        record = self._snapshot.record(index)
+        value = json_loads(self._snapshot.string(record[6], record[7]))
+        self._decoded[name] = value
+        return value
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._snapshot.find(name) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._snapshot.count):
+            record = self._snapshot.record(index)
+            yield self._snapshot.string(record[0], record[1]).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._snapshot.count
+
+    def groups(self) -> Dict[str, str]:
+        groups: Dict[str, str] = {}
+        for index in range(self._snapshot.count):
+            record = self._snapshot.record(index)
+            name = self._snapshot.string(record[0], record[1]).decode("utf-8")
+            groups[name] = self._snapshot.string(record[2], record[3]).decode("utf-8")
+        return groups
+
+
+class SnapshotSources(Mapping[str, Path]):
+    def __init__(self, snapshot: Snapshot) -> None:
+        self._snapshot = snapshot
+        self._sources: List[str] = snapshot.meta["sources"]
+
+    def __getitem__(self, name: str) -> Path:
+        index = self._snapshot.find(name)
+        if index < 0:
+            raise KeyError(name)
+        return Path(self._sources[self._snapshot.record(index)[8]])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(SnapshotCommands(self._snapshot))
+
+    def __len__(self) -> int:
+        return self._snapshot.count
+
+
+@functools.lru_cache(maxsize=None)
+def _build() -> Tuple[bytes, bytes]:
+    try:
+        schema = hashlib.sha1(SCHEMA_PATH.read_bytes()).digest()
+    except OSError:
+        schema = bytes(20)
+    return __version__.encode("utf-8")[:16].ljust(16, b"\0"), schema
+
+
+def _scope_meta(scope: Optional[ShemulConfig]) -> Optional[Dict[str, str]]:
+    if scope is None:
+        return None
+    return {"path": str(scope.path.resolve()), "name": scope.name}
+
+
+def _file_stamp(path: Path) -> List[Any]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return [str(path), None, None]
+    return [str(path), stat.st_mtime_ns, stat.st_size]
+
+
+def _dir_stamp(path: Path) -> List[Any]:
+    try:
+        return [str(path), path.stat().st_mtime_ns]
+    except OSError:
+        return [str(path), None]
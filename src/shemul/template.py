@@ -1,186 +1,143 @@
 from __future__ import annotations
 
 from pathlib import Path
+import copy
 import json
+import os
 import re
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional
+
+from .util import detect_project_type
 
 
 TemplateInfo = Dict[str, str]
 
+BUNDLED_DIR = Path(__file__).parent / "templates"
+INDEX_FILE = "index.json"
 
-_TEMPLATES: Dict[str, Dict[str, Any]] = {
-    "docker-fastapi-backend": {
-        "title": "Docker FastAPI Backend",
-        "aliases": ["docker fastapi backend", "docker-fastapi", "fastapi-docker"],
-        "desc": "FastAPI backend using docker compose for local/prod workflows.",
-    },
-    "fastapi-backend": {
-        "title": "FastAPI Backend",
-        "aliases": ["fastapi backend", "fastapi"],
-        "desc": "Local FastAPI backend workflow without docker.",
-    },
-    "django-drf-backend": {
-        "title": "Django DRF Backend",
-        "aliases": ["django drf backend", "drf backend", "django-backend"],
-        "desc": "Django + DRF backend workflow.",
-    },
-    "expressjs-backend": {
-        "title": "Express.js Backend",
-        "aliases": ["express.js backend", "express backend", "expressjs", "express"],
-        "desc": "Express.js backend workflow.",
-    },
-    "nestjs-backend": {
-        "title": "Nest.js Backend",
-        "aliases": ["nest.js backend", "nest backend", "nestjs", "nest"],
-        "desc": "Nest.js backend workflow.",
-    },
-    "react-native-expo-app": {
-        "title": "React Native Expo App",
-        "aliases": ["react native expo app", "expo app", "react-native", "expo"],
-        "desc": "React Native app workflow using Expo.",
-    },
-    "nextjs-frontend": {
-        "title": "Next.js Frontend",
-        "aliases": ["next.js frontend", "next frontend", "nextjs"],
-        "desc": "Next.js frontend workflow.",
-    },
-    "none": {
-        "title": "None (Starter Schema)",
-        "aliases": ["blank", "starter", "minimal"],
-        "desc": "Minimal valid shemul.json to get started quickly.",
-    },
-}
+_SPACES = re.compile(r"\s+")
+_PUNCTUATION = str.maketrans({".": "", "_": " ", "-": " "})
 
 
 def _normalize(text: str) -> str:
-    text = text.strip().lower()
-    text = text.replace(".", "")
-    text = text.replace("_", " ")
-    text = text.replace("-", " ")
-    text = re.sub(r"\s+", " ", text)
-    return text
+    return _SPACES.sub(" ", text.strip().lower().translate(_PUNCTUATION))
+
+
+class TemplateRegistry:
+    def __init__(self, dirs: List[Path]) -> None:
+        self.dirs = dirs
+        self._catalog: Optional[Dict[str, Dict[str, Any]]] = None
+        self._aliases: Optional[Dict[str, str]] = None
+        self._bodies: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def catalog(self) -> Dict[str, Dict[str, Any]]:
+        if self._catalog is None:
+            catalog: Dict[str, Dict[str, Any]] = {}
+            for directory in self.dirs:
+                catalog.update(_read_catalog(directory))
+            self._catalog = catalog
+        return self._catalog
+
+    def aliases(self) -> Dict[str, str]:
+        if self._aliases is None:
+            index: Dict[str, str] = {}
+            entries = list(self.catalog().items())
+            user = [item for item in entries if item[1]["dir"] != BUNDLED_DIR]
+            bundled = [item for item in entries if item[1]["dir"] == BUNDLED_DIR]
+            for key, data in user + bundled:
+                for name in [key, data["title"], *data["aliases"]]:
+                    index.setdefault(_normalize(name), key)
+            self._aliases = index
+        return self._aliases
+
+    def resolve(self, template_name: str) -> Optional[str]:
+        query = _normalize(template_name)
+        if not query:
+            return None
+        return self.aliases().get(query)
+
+    def body(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached is not None:
+            return cached
+        data = self.catalog().get(key) or self.catalog()["none"]
+        body = json.loads((data["dir"] / data["file"]).read_text(encoding="utf-8"))
+        with self._lock:
+            self._bodies[key] = body
+        return body
+
+
+def template_dirs() -> List[Path]:
+    dirs = [BUNDLED_DIR]
+    for item in os.environ.get("SHEMUL_TEMPLATE_PATH", "").split(os.pathsep):
+        if item.strip():
+            dirs.append(Path(item.strip()).expanduser())
+    return dirs
+
+
+_registries: Dict[str, TemplateRegistry] = {}
+
+
+def registry() -> TemplateRegistry:
+    key = os.environ.get("SHEMUL_TEMPLATE_PATH", "")
+    current = _registries.get(key)
+    if current is None:
+        current = _registries[key] = TemplateRegistry(template_dirs())
+    return current
 
 
 def list_templates() -> List[TemplateInfo]:
     items: List[TemplateInfo] = []
-    for key, data in _TEMPLATES.items():
+    for key, data in registry().catalog().items():
         items.append({"key": key, "title": data["title"], "desc": data["desc"]})
     return items
 
 
 def resolve_template_key(template_name: str) -> str | None:
-    query = _normalize(template_name)
-    if not query:
-        return None
-    for key, data in _TEMPLATES.items():
-        if query == _normalize(key):
-            return key
-        if query == _normalize(data["title"]):
-            return key
-        for alias in data["aliases"]:
-            if query == _normalize(alias):
-                return key
-    return None
+    return registry().resolve(template_name)
 
 
 def template_aliases(key: str) -> List[str]:
-    data = _TEMPLATES.get(key)
+    data = registry().catalog().get(key)
     if not data:
         return []
     return list(data["aliases"])
 
 
+_NODE_TEMPLATES = [
+    ("next", "nextjs-frontend"),
+    ("@nestjs/core", "nestjs-backend"),
+    ("expo", "react-native-expo-app"),
+    ("express", "expressjs-backend"),
+]
+
+
+def suggest_template(root: Path) -> str:
+    project_type = detect_project_type(root)
+    if project_type in {"node", "mixed"}:
+        dependencies = _package_dependencies(root / "package.json")
+        for package, key in _NODE_TEMPLATES:
+            if package in dependencies:
+                return key
+    if project_type in {"python", "docker", "mixed"}:
+        requirements = _python_requirements(root)
+        if (root / "manage.py").exists() or "django" in requirements:
+            return "django-drf-backend"
+        if "fastapi" in requirements:
+            return "docker-fastapi-backend" if project_type in {"docker", "mixed"} else "fastapi-backend"
+    return "none"
+
+
 def build_template_config(template_key: str, project_name: str) -> Dict[str, Any]:
     base = {
         "name": project_name,
         "version": "1.0.0",
         "commands": {},
     }
-
-    if template_key == "docker-fastapi-backend":
-        base["runtime"] = "docker"
-        base["env"] = {
-            "local": {"compose": "docker-compose.yml"},
-            "prod": {"compose": "docker-compose.prod.yml"},
-        }
-        base["vars"] = {"API": "api"}
-        base["commands"] = {
-            "up": {"run": "docker compose up --build", "env": "local", "desc": "Start local stack"},
-            "up:bg": {"run": "docker compose up -d --build", "env": "local", "desc": "Start local stack in background"},
-            "down": {"run": "docker compose down --remove-orphans", "env": "local", "desc": "Stop local stack"},
-            "logs": {"run": "docker compose logs -f {{API}}", "env": "local", "desc": "Tail API logs"},
-            "migrate:up": {"run": "docker compose exec {{API}} alembic upgrade head", "confirm": True, "desc": "Run DB migrations"},
-            "test": {"run": "docker compose exec {{API}} pytest -q", "group": "quality", "desc": "Run tests"},
-            "prod:up": {"run": "docker compose -f {{env.compose}} up -d", "env": "prod", "danger": True, "desc": "Start production stack"},
-        }
-    elif template_key == "fastapi-backend":
-        base["runtime"] = "python"
-        base["commands"] = {
-            "dev": {"run": "uvicorn app.main:app --reload --host 0.0.0.0 --port 8000", "desc": "Run dev server"},
-            "start": {"run": "python -m app.main", "desc": "Run app entrypoint"},
-            "test": {"run": "pytest -q", "group": "quality", "desc": "Run tests"},
-            "lint": {"run": "ruff check .", "group": "quality", "desc": "Run linter"},
-            "format": {"run": "ruff format .", "group": "quality", "desc": "Format source"},
-        }
-    elif template_key == "django-drf-backend":
-        base["runtime"] = "python"
-        base["commands"] = {
-            "dev": {"run": "python manage.py runserver 0.0.0.0:8000", "desc": "Run dev server"},
-            "migrate:make": {"run": "python manage.py makemigrations", "group": "db", "desc": "Create migrations"},
-            "migrate:up": {"run": "python manage.py migrate", "group": "db", "desc": "Apply migrations"},
-            "superuser": {"run": "python manage.py createsuperuser", "confirm": True, "desc": "Create admin user"},
-            "test": {"run": "python manage.py test", "group": "quality", "desc": "Run tests"},
-            "lint": {"run": "ruff check .", "group": "quality", "desc": "Run linter"},
-        }
-    elif template_key == "expressjs-backend":
-        base["runtime"] = "node"
-        base["commands"] = {
-            "install": {"run": "npm install", "group": "setup", "desc": "Install dependencies"},
-            "dev": {"run": "npm run dev", "desc": "Run dev server"},
-            "start": {"run": "npm start", "desc": "Run production server"},
-            "test": {"run": "npm test", "group": "quality", "desc": "Run tests"},
-            "lint": {"run": "npm run lint", "group": "quality", "desc": "Run linter"},
-        }
-    elif template_key == "nestjs-backend":
-        base["runtime"] = "node"
-        base["commands"] = {
-            "install": {"run": "npm install", "group": "setup", "desc": "Install dependencies"},
-            "dev": {"run": "npm run start:dev", "desc": "Run dev server"},
-            "build": {"run": "npm run build", "group": "build", "desc": "Build application"},
-            "start": {"run": "npm run start:prod", "desc": "Run production server"},
-            "test": {"run": "npm run test", "group": "quality", "desc": "Run tests"},
-            "lint": {"run": "npm run lint", "group": "quality", "desc": "Run linter"},
-        }
-    elif template_key == "react-native-expo-app":
-        base["runtime"] = "node"
-        base["commands"] = {
-            "install": {"run": "npm install", "group": "setup", "desc": "Install dependencies"},
-            "dev": {"run": "npx expo start", "desc": "Start Expo dev server"},
-            "android": {"run": "npx expo run:android", "desc": "Run Android build"},
-            "ios": {"run": "npx expo run:ios", "desc": "Run iOS build"},
-            "web": {"run": "npx expo start --web", "desc": "Run web preview"},
-            "test": {"run": "npm test", "group": "quality", "desc": "Run tests"},
-        }
-    elif template_key == "nextjs-frontend":
-        base["runtime"] = "node"
-        base["commands"] = {
-            "install": {"run": "npm install", "group": "setup", "desc": "Install dependencies"},
-            "dev": {"run": "npm run dev", "desc": "Run dev server"},
-            "build": {"run": "npm run build", "group": "build", "desc": "Build frontend"},
-            "start": {"run": "npm run start", "desc": "Run production server"},
-            "lint": {"run": "npm run lint", "group": "quality", "desc": "Run linter"},
-            "test": {"run": "npm test", "group": "quality", "desc": "Run tests"},
-        }
-    else:
-        base["runtime"] = "generic"
-        base["commands"] = {
-            "example": {
-                "run": "echo \"Edit shemul.json and replace this command\"",
-                "desc": "Starter command",
-            }
-        }
-
+    base.update(copy.deepcopy(registry().body(template_key)))
     return base
 
 
@@ -190,3 +147,46 @@ def write_template_file(template_key: str, target_path: Path, project_name: str,
     payload = build_template_config(template_key, project_name)
     target_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
     return target_path
+
+
+def _package_dependencies(path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {**(data.get("devDependencies") or {}), **(data.get("dependencies") or {})}
+
+
+def _python_requirements(root: Path) -> str:
+    chunks: List[str] = []
+    for name in ("pyproject.toml", "requirements.txt"):
+        try:
+            chunks.append((root / name).read_text(encoding="utf-8").lower())
+        except OSError:
+            continue
+    return "\n".join(chunks)
+
+
+def _read_catalog(directory: Path) -> Dict[str, Dict[str, Any]]:
+    index = directory / INDEX_FILE
+    catalog: Dict[str, Dict[str, Any]] = {}
+    if index.is_file():
+        try:
+            entries = json.loads(index.read_text(encoding="utf-8")).get("templates", {})
+        except (OSError, ValueError):
+            entries = {}
+        for key, data in entries.items():
+            catalog[key] = {
+                "title": str(data.get("title", key)),
+                "desc": str(data.get("desc", "")),
+                "aliases": [str(item) for item in data.get("aliases", [])],
+                "file": str(data.get("file", f"{key}.json")),
+                "dir": directory,
+            }
+        return catalog
+    if directory.is_dir():
+        for path in sorted(directory.glob("*.json")):
+            catalog[path.stem] = {"title": path.stem, "desc": f"User template from {directory}", "aliases": [], "file": path.name, "dir": directory}
+    return catalog
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .util import cache_dir, json_loads, write_atomic
+
+
+SMOOTHING = 0.3
+
+
+@dataclass
+class Slot:
+    name: str
+    lane: int
+    start: float
+    end: float
+
+
+class TimingStore:
+    def __init__(self, root: Path, path: Optional[Path] = None) -> None:
+        self.root = root.resolve()
+        self.path = path or timings_path(self.root)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict[str, float]] = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        try:
+            data = json_loads(self.path.read_bytes())
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("root") != str(self.root):
+            return {}
+        entries = data.get("commands")
+        return entries if isinstance(entries, dict) else {}
+
+    def estimate(self, name: str) -> Optional[float]:
+        entry = self._entries.get(name)
+        if not entry:
+            return None
+        return float(entry["avg"])
+
+    def record(self, name: str, duration: float) -> None:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry:
+                average = entry["avg"] + SMOOTHING * (duration - entry["avg"])
+                self._entries[name] = {"avg": average, "runs": entry.get("runs", 0) + 1}
+            else:
+                self._entries[name] = {"avg": duration, "runs": 1}
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {"root": str(self.root), "commands": self._entries}
+            self._dirty = False
+        try:
+            write_atomic(self.path, json.dumps(payload, sort_keys=True))
+        except OSError:
+            pass
+
+
+def timings_path(root: Path) -> Path:
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()
+    return cache_dir() / "timings" / f"{digest}.json"
+
+
+def estimates_for(names: Sequence[str], store: Optional[TimingStore]) -> List[float]:
+    if store is None:
+        return [0.0] * len(names)
+    known = [store.estimate(name) for name in names]
+    measured = [value for value in known if value is not None]
+    fallback = sum(measured) / len(measured) if measured else 0.0
+    return [fallback if value is None else value for value in known]
+
+
+def longest_first(names: Sequence[str], store: Optional[TimingStore]) -> List[int]:
+    estimates = estimates_for(names, store)
+    return sorted(range(len(names)), key=lambda index: -estimates[index])
+
+
+def plan(names: Sequence[str], store: Optional[TimingStore], jobs: int) -> List[Slot]:
+    estimates = estimates_for(names, store)
+    lanes: List[Tuple[float, int, int]] = [(0.0, 0, lane) for lane in range(max(1, jobs))]
+    slots: List[Slot] = []
+    for index in longest_first(names, store):
+        lanes.sort()
+        free_at, count, lane = lanes[0]
+        end = free_at + estimates[index]
+        slots.append(Slot(names[index], lane, free_at, end))
+        lanes[0] = (end, count + 1, lane)
+    return slots
@@ -32,3 +32,12 @@ class UI:
 
     def panel(self, title: str, body: str) -> None:
         self.console.print(Panel(Text(body), title=title))
+
+    def write(self, data: bytes) -> None:
+        stream = getattr(self.console.file, "buffer", None)
+        if stream is None:
+            self.console.file.write(data.decode("utf-8", "replace"))
+            self.console.file.flush()
+            return
+        stream.write(data)
+        stream.flush()
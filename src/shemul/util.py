@@ -4,12 +4,31 @@ import json
 import os
 import subprocess
 import sys
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+def json_backend() -> str:
+    requested = os.environ.get("SHEMUL_JSON_BACKEND", "").strip().lower()
+    if requested == "json" or _orjson is None:
+        return "json"
+    return "orjson"
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    if _orjson is not None and json_backend() == "orjson":
+        return _orjson.loads(data)
+    return json.loads(data)
 
 
 def read_json(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return json_loads(path.read_bytes())
 
 
 def find_upward(start: Path, filename: str) -> Path | None:
@@ -23,6 +42,26 @@ def find_upward(start: Path, filename: str) -> Path | None:
         current = current.parent
 
 
+def detect_project_type(root: Path) -> str:
+    has_docker = (root / "docker-compose.yml").exists() or (root / "compose.yml").exists()
+    has_node = (root / "package.json").exists()
+    has_python = (root / "pyproject.toml").exists() or (root / "requirements.txt").exists()
+
+    types = []
+    if has_docker:
+        types.append("docker")
+    if has_node:
+        types.append("node")
+    if has_python:
+        types.append("python")
+
+    if not types:
+        return "unknown"
+    if len(types) == 1:
+        return types[0]
+    return "mixed"
+
+
 def is_truthy(value: str) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "y", "on"}
 
@@ -49,6 +88,66 @@ def global_config_path() -> Path:
     return base / "shemul" / "shemul.json"
 
 
+def cache_dir() -> Path:
+    override = os.environ.get("SHEMUL_CACHE_HOME")
+    if override:
+        return Path(override).expanduser()
+
+    if sys.platform.startswith("win"):
+        local = os.environ.get("LOCALAPPDATA")
+        base = Path(local).expanduser() if local else (Path.home() / "AppData" / "Local")
+        return base / "Shemul" / "Cache"
+
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "Shemul"
+
+    xdg_cache = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache).expanduser() if xdg_cache else (Path.home() / ".cache")
+    return base / "shemul"
+
+
+def data_dir() -> Path:
+    override = os.environ.get("SHEMUL_DATA_HOME")
+    if override:
+        return Path(override).expanduser()
+
+    if sys.platform.startswith("win"):
+        local = os.environ.get("LOCALAPPDATA")
+        base = Path(local).expanduser() if local else (Path.home() / "AppData" / "Local")
+        return base / "Shemul" / "Data"
+
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Application Support" / "Shemul"
+
+    xdg_data = os.environ.get("XDG_DATA_HOME")
+    base = Path(xdg_data).expanduser() if xdg_data else (Path.home() / ".local" / "share")
+    return base / "shemul"
+
+
+def file_stamps(paths: List[str], cwd: Path) -> Dict[str, Optional[int]]:
+    stamps: Dict[str, Optional[int]] = {}
+    for item in paths:
+        path = Path(os.path.expanduser(item))
+        try:
+            stamps[item] = (path if path.is_absolute() else cwd / path).stat().st_mtime_ns
+        except OSError:
+            stamps[item] = None
+    return stamps
+
+
+def write_atomic(path: Path, data: Union[bytes, str]) -> Path:
+    payload = data.encode("utf-8") if isinstance(data, str) else data
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
 def open_in_editor(path: Path) -> bool:
     editor = os.environ.get("SHEMUL_EDITOR") or os.environ.get("VISUAL") or os.environ.get("EDITOR")
     if editor:
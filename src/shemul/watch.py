@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+class ConfigWatcher:
+    backend = "none"
+
+    def __init__(self, files: Sequence[Path], dirs: Sequence[Path] = ()) -> None:
+        self.files = _keyed(files)
+        self.dirs = _keyed(dirs)
+
+    def changed(self) -> Set[Path]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class PollingWatcher(ConfigWatcher):
+    backend = "poll"
+
+    def __init__(self, files: Sequence[Path], dirs: Sequence[Path] = ()) -> None:
+        super().__init__(files, dirs)
+        self._stamps = self._scan()
+
+    def _scan(self) -> Dict[Path, Optional[Tuple[int, int]]]:
+        return {path: _stamp(path) for path in [*self.files.values(), *self.dirs.values()]}
+
+    def changed(self) -> Set[Path]:
+        current = self._scan()
+        changed = {path for path, stamp in current.items() if self._stamps.get(path) != stamp}
+        self._stamps = current
+        return changed
+
+
+class InotifyWatcher(ConfigWatcher):
+    backend = "inotify"
+
+    def __init__(self, files: Sequence[Path], dirs: Sequence[Path] = (), libc: Any = None) -> None:
+        super().__init__(files, dirs)
+        self._libc = libc or _libc()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._watches: Dict[int, str] = {}
+        targets = {os.path.dirname(key) for key in self.files} | set(self.dirs)
+        for target in sorted(targets):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(target), _MASK)
+            if wd >= 0:
+                self._watches[wd] = target
+
+    def changed(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            if not data:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self.files.values())
+                    changed.update(self.dirs.values())
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if directory in self.dirs:
+                    changed.add(self.dirs[directory])
+                target = self.files.get(os.path.join(directory, os.fsdecode(name)) if name else directory)
+                if target is not None:
+                    changed.add(target)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(files: Sequence[Path], dirs: Sequence[Path] = (), polling: bool = False) -> ConfigWatcher:
+    if not polling and sys.platform.startswith("linux") and os.environ.get("SHEMUL_WATCH", "").lower() != "poll":
+        try:
+            return InotifyWatcher(files, dirs)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(files, dirs)
+
+
+def _libc() -> Any:
+    name = ctypes.util.find_library("c") or "libc.so.6"
+    libc = ctypes.CDLL(name, use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def _keyed(paths: Sequence[Path]) -> Dict[str, Path]:
+    keyed: Dict[str, Path] = {}
+    for path in paths:
+        keyed[os.path.realpath(path)] = path
+    return keyed
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+
+CONFIG_NAME = "shemul.json"
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", "dist", "build", "target"}
+DEFAULT_BASE_REFS = ("@{upstream}", "origin/HEAD", "origin/main", "origin/master", "main", "master")
+
+
+class ProjectIndex:
+    def __init__(self, root: Path) -> None:
+        self.root = root.resolve()
+        self._owners: Dict[Path, Optional[Path]] = {}
+
+    def owner(self, path: Path) -> Optional[Path]:
+        path = path if path.is_absolute() else self.root / path
+        current = path.parent
+        if not _is_within(current, self.root):
+            return None
+        visited: List[Path] = []
+        found: Optional[Path] = None
+        while True:
+            if current in self._owners:
+                found = self._owners[current]
+                break
+            visited.append(current)
+            if (current / CONFIG_NAME).is_file():
+                found = current
+                break
+            if current == self.root or current.parent == current:
+                break
+            current = current.parent
+        for directory in visited:
+            self._owners[directory] = found
+        return found
+
+    def owners(self, paths: Iterable[Path]) -> Dict[Path, List[Path]]:
+        grouped: Dict[Path, List[Path]] = {}
+        for path in paths:
+            root = self.owner(path)
+            if root is not None:
+                grouped.setdefault(root, []).append(path if path.is_absolute() else self.root / path)
+        return grouped
+
+
+def discover_projects(root: Path) -> List[Path]:
+    projects: List[Path] = []
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not name.startswith(".") and name not in SKIP_DIRS)
+        if CONFIG_NAME in files:
+            projects.append(Path(current))
+    return projects
+
+
+def git_toplevel(cwd: Path) -> Optional[Path]:
+    completed = _git(["rev-parse", "--show-toplevel"], cwd)
+    if completed is None:
+        return None
+    return Path(completed.strip())
+
+
+def changed_files(cwd: Path, base: str) -> List[Path]:
+    top = git_toplevel(cwd)
+    if top is None:
+        raise ValueError("--affected needs a git repository or a --changed file list")
+    diff = _git(["diff", "--name-only", base], top)
+    if diff is None:
+        raise ValueError(f"git diff against {base} failed")
+    untracked = _git(["ls-files", "--others", "--exclude-standard"], top) or ""
+    names = {line.strip() for line in (diff + untracked).splitlines() if line.strip()}
+    return [top / name for name in sorted(names)]
+
+
+def default_base(cwd: Path) -> Tuple[str, bool]:
+    head = (_git(["rev-parse", "HEAD"], cwd) or "").strip()
+    on_base = False
+    for ref in DEFAULT_BASE_REFS:
+        merge_base = (_git(["merge-base", "HEAD", ref], cwd) or "").strip()
+        if not merge_base:
+            continue
+        if merge_base != head:
+            return merge_base, True
+        on_base = True
+    if on_base:
+        parent = (_git(["rev-parse", "--verify", "-q", "HEAD~1"], cwd) or "").strip()
+        if parent:
+            return parent, True
+    return "HEAD", False
+
+
+def read_changed_list(source: str, cwd: Path) -> List[Path]:
+    text = sys.stdin.read() if source == "-" else Path(source).read_text(encoding="utf-8")
+    return [(cwd / line.strip()).resolve() for line in text.splitlines() if line.strip()]
+
+
+def touches_inputs(inputs: Sequence[str], root: Path, changed: Sequence[Path]) -> bool:
+    if not inputs:
+        return True
+    patterns = [glob_pattern(item) for item in inputs]
+    for path in changed:
+        if path.name == CONFIG_NAME and path.parent == root:
+            return True
+        try:
+            relative = path.relative_to(root).as_posix()
+        except ValueError:
+            continue
+        if any(pattern.match(relative) for pattern in patterns):
+            return True
+    return False
+
+
+def glob_pattern(pattern: str) -> Pattern[str]:
+    pattern = pattern[2:] if pattern.startswith("./") else pattern
+    parts: List[str] = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+        elif pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif pattern[index] == "*":
+            parts.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            parts.append("[^/]")
+            index += 1
+        else:
+            parts.append(re.escape(pattern[index]))
+            index += 1
+    return re.compile("".join(parts) + r"\Z")
+
+
+def _is_within(path: Path, root: Path) -> bool:
+    return path == root or root in path.parents
+
+
+def _git(args: List[str], cwd: Path) -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=False)
+    except OSError:
+        return None
+    if completed.returncode != 0:
+        return None
+    return completed.stdout
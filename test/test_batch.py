@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+from shemul.app import App
+from shemul.batch import BatchEntry, BatchError, parse_entry, read_plan
+from shemul.cache import FileShareCache, TaskCache
+from shemul.guard import ConfirmPolicy
+from shemul.locks import CommandLock
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base.resolve()
+
+
+def _config(temp: Path, monkeypatch, commands: dict):
+    monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+    path = temp / "shemul.json"
+    path.write_text(json.dumps({"commands": commands}), encoding="utf-8")
+    app = App()
+    return app, app.loader.load(path)
+
+
+def test_parse_shlex_and_json_entries():
+    entry = parse_entry("REGION=eu --dry deploy --tag 'v1 rc'", 3)
+    assert entry == BatchEntry(index=3, command="deploy", args=["--tag", "v1 rc"], dry=True, env={"REGION": "eu"})
+    entry = parse_entry('{"command": "deploy", "args": ["--fast"], "env": {"N": 2}}', 4)
+    assert entry == BatchEntry(index=4, command="deploy", args=["--fast"], dry=False, env={"N": "2"})
+    with pytest.raises(ValueError, match="line 5: missing command"):
+        parse_entry("A=1", 5)
+
+
+def test_read_plan_skips_comments_and_reports_bad_lines():
+    items = list(read_plan(["# setup\n", "\n", "build\n", "{not json\n", "test --fast\n"]))
+    assert [type(item) for item in items] == [BatchEntry, BatchError, BatchEntry]
+    assert [item.index for item in items] == [3, 4, 5]
+    assert "invalid JSON" in items[1].error
+
+
+def test_batch_runs_entries_with_env_and_stops_after_failure(monkeypatch):
+    temp = _temp_dir("batch_run")
+    try:
+        app, config = _config(
+            temp,
+            monkeypatch,
+            {
+                "note": {"run": f"echo $WHO >> '{temp / 'notes.txt'}'"},
+                "fail": {"run": "echo broken; exit 3"},
+            },
+        )
+        lines, output = [], []
+        plan = ["WHO=amy note\n", "--dry fail\n", "fail\n", "note\n"]
+        code = app.run_batch(config, read_plan(plan), lines.append, output.append, root=temp)
+        records = [json.loads(line) for line in lines]
+
+        assert code == 3
+        assert [item["status"] for item in records] == ["ok", "dry", "failed", "not-run"]
+        assert records[1]["commands"] == ["echo broken; exit 3"]
+        assert (temp / "notes.txt").read_text() == "amy\n"
+        assert b"".join(output) == b"broken\n"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_batch_keep_going_runs_concurrently(monkeypatch):
+    temp = _temp_dir("batch_jobs")
+    try:
+        app, config = _config(temp, monkeypatch, {"tick": {"run": "sleep 0.3; echo tick"}, "fail": {"run": "exit 2"}})
+        lines, output = [], []
+        plan = ["tick\n", "fail\n", "tick\n", "missing\n", "tick\n"]
+        began = time.perf_counter()
+        code = app.run_batch(config, read_plan(plan), lines.append, output.append, jobs=3, keep_going=True, root=temp)
+        records = sorted((json.loads(line) for line in lines), key=lambda item: item["index"])
+
+        assert code != 0
+        assert [item["status"] for item in records] == ["ok", "failed", "ok", "error", "ok"]
+        assert records[3]["error"] == "Unknown command: missing"
+        assert b"".join(output).count(b"tick\n") == 3
+        assert time.perf_counter() - began < 0.8
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+
+def test_batch_env_overrides_are_part_of_task_identity(monkeypatch):
+    temp = _temp_dir("batch_env")
+    try:
+        app, config = _config(temp, monkeypatch, {"show": {"run": "echo $REGION"}})
+        plain = app._batch_tasks(config, parse_entry("show", 1))[0]
+        eu = app._batch_tasks(config, parse_entry("REGION=eu show", 1))[0]
+        us = app._batch_tasks(config, parse_entry("REGION=us show", 1))[0]
+        assert eu.environ == {"REGION": "eu"}
+        locks = CommandLock(temp, lambda data: None)
+        assert len({locks.key(plain), locks.key(eu), locks.key(us)}) == 3
+        cache = TaskCache(FileShareCache(temp / "share"))
+        assert len({cache.key_for(plain, temp), cache.key_for(eu, temp), cache.key_for(us, temp)}) == 3
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_batch_args_keep_their_shell_quoting(monkeypatch):
+    temp = _temp_dir("batch_quote")
+    try:
+        app, config = _config(temp, monkeypatch, {"show": {"run": f"printf '%s|' >> '{temp / 'args.txt'}'"}})
+        app.run_batch(config, read_plan(["show --tag 'v1 rc' \"a;b\"\n"]), lambda line: None, lambda data: None, root=temp)
+        assert (temp / "args.txt").read_text() == "--tag|v1 rc|a;b|"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_batch_exit_code_follows_plan_order(monkeypatch):
+    temp = _temp_dir("batch_order")
+    try:
+        app, config = _config(temp, monkeypatch, {"late": {"run": "sleep 0.3; exit 4"}, "early": {"run": "exit 5"}})
+        plan = ["late\n", "early\n"]
+        code = app.run_batch(config, read_plan(plan), lambda line: None, lambda data: None, jobs=2, keep_going=True, root=temp)
+        assert code == 4
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_batch_collects_confirmations_before_running(monkeypatch):
+    temp = _temp_dir("batch_confirm")
+    try:
+        marker = temp / "ran.txt"
+        app, config = _config(
+            temp,
+            monkeypatch,
+            {"note": {"run": f"echo ran >> '{marker}'"}, "deploy": {"run": "echo deploy", "confirm": True}},
+        )
+        app.guard.policy = ConfirmPolicy(interactive=True)
+        asked = []
+        monkeypatch.setattr(app.guard, "confirm", lambda message: asked.append(marker.exists()) or False)
+        lines = []
+        plan = ["note\n", "deploy\n", "note\n", "deploy\n"]
+        code = app.run_batch(config, read_plan(plan), lines.append, lambda data: None, jobs=2, keep_going=True, root=temp)
+        records = sorted((json.loads(line) for line in lines), key=lambda item: item["index"])
+
+        assert asked == [False]
+        assert [item["status"] for item in records] == ["ok", "refused", "ok", "refused"]
+        assert code == 1
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+
+import jsonschema
+
+from shemul.util import read_json
+
+
+def _load_bench():
+    spec = importlib.util.spec_from_file_location("shemul_bench", Path("bench/shemul_bench.py"))
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_generated_configs_are_deterministic_and_valid():
+    bench = _load_bench()
+    first = bench.generate_config(100, seed=3)
+    assert first == bench.generate_config(100, seed=3)
+    assert len(first["commands"]) == 100
+    jsonschema.validate(instance=first, schema=read_json(Path("src/shemul/schema.json")))
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    bench = _load_bench()
+    baseline = {"results": {"fast": {"median_s": 1.0}, "slow": {"median_s": 1.0}, "gone": {"median_s": 1.0}}}
+    current = {"results": {"fast": {"median_s": 1.1}, "slow": {"median_s": 1.3}}}
+    rows = {row["name"]: row for row in bench.compare(baseline, current, threshold=0.2)}
+    assert set(rows) == {"fast", "slow"}
+    assert rows["fast"]["regressed"] is False
+    assert rows["slow"]["regressed"] is True
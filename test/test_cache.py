@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import shutil
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from shemul.cache import FileShareCache, HttpCache, TaskCache
+from shemul.command import Command
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _resolved(root: Path):
+    cmd = Command(
+        "build",
+        {"run": "make dist", "inputs": ["src/*.txt"], "outputs": ["dist/*.bin"], "cache": True},
+        {},
+        {},
+    )
+    (root / "src").mkdir(parents=True, exist_ok=True)
+    (root / "src" / "a.txt").write_text("source", encoding="utf-8")
+    (root / "dist").mkdir(parents=True, exist_ok=True)
+    (root / "dist" / "one.bin").write_bytes(b"\x00" * 4096)
+    (root / "dist" / "two.bin").write_bytes(b"two")
+    return cmd.resolve()
+
+
+def test_file_share_cache_round_trip_and_input_keys():
+    temp = _temp_dir("cache_share")
+    try:
+        root = temp / "project"
+        resolved = _resolved(root)
+        cache = TaskCache(FileShareCache(temp / "share"))
+        key = cache.key_for(resolved, root)
+        assert cache.store(key, resolved, root) is True
+
+        shutil.rmtree(root / "dist")
+        assert cache.restore(key, root) is True
+        assert (root / "dist" / "one.bin").read_bytes() == b"\x00" * 4096
+        assert (root / "dist" / "two.bin").read_bytes() == b"two"
+
+        (root / "src" / "a.txt").write_text("changed", encoding="utf-8")
+        assert cache.key_for(resolved, root) != key
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_cache_rejects_corrupt_and_oversized_objects():
+    temp = _temp_dir("cache_integrity")
+    try:
+        root = temp / "project"
+        resolved = _resolved(root)
+        backend = FileShareCache(temp / "share")
+        key = TaskCache(backend).key_for(resolved, root)
+        assert TaskCache(backend, max_object_size=100).store(key, resolved, root) is False
+
+        cache = TaskCache(backend)
+        cache.store(key, resolved, root)
+        for blob in (temp / "share").rglob("*"):
+            if blob.is_file() and not blob.name.endswith(".manifest"):
+                blob.write_bytes(b"tampered")
+        assert cache.restore(key, root) is False
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+class _Store(BaseHTTPRequestHandler):
+    objects: dict = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200 if self.path in self.objects else 404)
+        self.end_headers()
+
+    def do_GET(self):
+        data = self.objects.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):
+        length = int(self.headers["Content-Length"])
+        self.objects[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.end_headers()
+
+
+def test_http_cache_round_trip():
+    temp = _temp_dir("cache_http")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Store)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        root = temp / "project"
+        resolved = _resolved(root)
+        cache = TaskCache(HttpCache(f"http://127.0.0.1:{server.server_address[1]}/cas"))
+        key = cache.key_for(resolved, root)
+        assert cache.restore(key, root) is False
+        assert cache.store(key, resolved, root) is True
+
+        shutil.rmtree(root / "dist")
+        assert cache.restore(key, root) is True
+        assert (root / "dist" / "two.bin").read_bytes() == b"two"
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_restore_rejects_escaping_paths_and_keeps_outputs_on_partial_failure():
+    temp = _temp_dir("cache_unsafe")
+    try:
+        root = temp / "project"
+        resolved = _resolved(root)
+        backend = FileShareCache(temp / "share")
+        cache = TaskCache(backend)
+        key = cache.key_for(resolved, root)
+        assert cache.store(key, resolved, root) is True
+        manifest_path = next((temp / "share").rglob("*.manifest"))
+        manifest = json.loads(manifest_path.read_text())
+
+        for name in ("../escaped.bin", str((temp / "abs.bin").resolve()), "dist/../../escaped.bin"):
+            forged = {"command": manifest["command"], "outputs": {name: manifest["outputs"]["dist/two.bin"]}}
+            manifest_path.write_text(json.dumps(forged))
+            assert cache.restore(key, root) is False
+        assert not (temp / "escaped.bin").exists() and not (temp / "abs.bin").exists()
+
+        broken = dict(manifest["outputs"])
+        broken["dist/two.bin"] = {**broken["dist/two.bin"], "digest": "0" * 64}
+        manifest_path.write_text(json.dumps({"command": manifest["command"], "outputs": broken}))
+        (root / "dist" / "one.bin").write_bytes(b"stale")
+        assert cache.restore(key, root) is False
+        assert (root / "dist" / "one.bin").read_bytes() == b"stale"
+        assert sorted(item.name for item in (root / "dist").iterdir()) == ["one.bin", "two.bin"]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_file_share_publishes_atomically_with_concurrent_writers():
+    temp = _temp_dir("cache_share_race")
+    try:
+        share = FileShareCache(temp / "share")
+        payload = b"x" * (1024 * 1024)
+        key = hashlib.sha256(payload).hexdigest()
+
+        def publish() -> None:
+            share.put(key, io.BytesIO(payload), len(payload))
+
+        threads = [threading.Thread(target=publish) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        out = io.BytesIO()
+        assert share.get(key, out) and out.getvalue() == payload
+        assert [item.name for item in (temp / "share").rglob("*") if item.is_file()] == [key]
+
+        (temp / "share" / "ab").mkdir(parents=True)
+        (temp / "share" / "ab" / "abroken").mkdir()
+        assert share.get("abroken", io.BytesIO()) is False
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from shemul.autocomplete import REFRESH_GRACE, CompletionCache, complete
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base.resolve()
+
+
+class _RecordingCache(CompletionCache):
+    def __init__(self, root: Path) -> None:
+        super().__init__(root)
+        self.spawned = []
+
+    def _spawn_refresh(self, key, command, deps, cwd) -> None:
+        self.spawned.append(command)
+
+
+def test_static_list_and_prefix_filter():
+    temp = _temp_dir("complete_static")
+    try:
+        values = CompletionCache(temp / "cache").values(["head", "base", "+1"], temp)
+        assert complete(["migrate", "h"], values) == ["head"]
+        assert not (temp / "cache").exists()
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_first_call_runs_provider_then_serves_cache():
+    temp = _temp_dir("complete_first")
+    try:
+        cache = _RecordingCache(temp / "cache")
+        spec = {"cmd": "echo api; echo worker; echo x >> calls", "ttl": 60}
+        assert cache.values(spec, temp) == ["api", "worker"]
+        assert cache.values(spec, temp) == ["api", "worker"]
+        assert (temp / "calls").read_text().count("x") == 1
+        assert cache.spawned == []
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_stale_entry_serves_old_values_and_refreshes_once():
+    temp = _temp_dir("complete_stale")
+    try:
+        cache = _RecordingCache(temp / "cache")
+        spec = {"cmd": "echo one", "ttl": 10}
+        assert cache.values(spec, temp) == ["one"]
+        entry_path = next((temp / "cache").glob("*.json"))
+        entry = json.loads(entry_path.read_text())
+        entry["values"] = ["old"]
+        entry["at"] = time.time() - 20
+        entry_path.write_text(json.dumps(entry))
+
+        assert cache.values(spec, temp) == ["old"]
+        assert cache.values(spec, temp) == ["old"]
+        assert cache.spawned == ["echo one"]
+
+        entry = json.loads(entry_path.read_text())
+        entry["refreshing"] = time.time() - REFRESH_GRACE
+        entry_path.write_text(json.dumps(entry))
+        cache.values(spec, temp)
+        assert len(cache.spawned) == 2
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_dependency_change_triggers_refresh():
+    temp = _temp_dir("complete_deps")
+    try:
+        (temp / "compose.yaml").write_text("services: {}", encoding="utf-8")
+        cache = _RecordingCache(temp / "cache")
+        spec = {"cmd": "echo api", "deps": ["compose.yaml"]}
+        assert cache.values(spec, temp) == ["api"]
+        assert cache.values(spec, temp) == ["api"]
+        assert cache.spawned == []
+        stat = (temp / "compose.yaml").stat()
+        os.utime(temp / "compose.yaml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert cache.values(spec, temp) == ["api"]
+        assert cache.spawned == ["echo api"]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+
+def test_slow_provider_is_filled_in_background():
+    temp = _temp_dir("complete_slow")
+    try:
+        cache = _RecordingCache(temp / "cache")
+        spec = {"cmd": "sleep 2; echo late"}
+        began = time.perf_counter()
+        assert cache.values(spec, temp) == []
+        assert cache.values(spec, temp) == []
+        assert time.perf_counter() - began < 1.5
+        assert cache.spawned == ["sleep 2; echo late"]
+        entry = json.loads(next((temp / "cache").glob("*.json")).read_text())
+        assert "at" not in entry
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_failed_refresh_is_not_cached_and_retries():
+    temp = _temp_dir("complete_failed")
+    try:
+        cache = _RecordingCache(temp / "cache")
+        spec = {"cmd": "echo partial; exit 1", "ttl": 600}
+        assert cache.values(spec, temp) == []
+        assert cache.spawned == ["echo partial; exit 1"]
+        entry_path = next((temp / "cache").glob("*.json"))
+        assert cache.refresh(entry_path.stem, spec["cmd"], [], temp, 1.0) is None
+        entry = json.loads(entry_path.read_text())
+        assert "at" not in entry and "refreshing" not in entry
+
+        assert cache.values(spec, temp) == []
+        assert len(cache.spawned) == 2
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
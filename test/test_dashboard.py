@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import io
+
+from rich.console import Console
+
+from shemul.dashboard import Dashboard, dashboard_mode
+
+
+def _console() -> Console:
+    return Console(file=io.StringIO(), width=100)
+
+
+def test_plain_mode_prefixes_complete_lines_per_task():
+    written = []
+    dashboard = Dashboard(_console(), written.append, live=False)
+    build = dashboard.task("build[os=linux]")
+    test = dashboard.task("test")
+    build.feed(b"compiling\npart")
+    test.feed(b"ok 1\n")
+    build.feed(b"ial\n\n")
+    build.feed(b"done")
+    build.close(0)
+    assert b"".join(written) == (
+        b"[build[os=linux]] compiling\n[test] ok 1\n[build[os=linux]] partial\n[build[os=linux]] \n[build[os=linux]] done\n"
+    )
+
+
+def test_live_mode_aggregates_state_without_writing():
+    written = []
+    dashboard = Dashboard(_console(), written.append, live=True)
+    view = dashboard.task("lint")
+    for index in range(1000):
+        chunk = f"line {index}\n".encode()
+        view.write(chunk)
+        view.feed(chunk)
+    view.feed(b"tail without newline")
+    assert written == []
+    assert view.state.last_line == b"line 999"
+    assert view.state.bytes == sum(len(f"line {index}\n") for index in range(1000))
+    view.close(2)
+    assert view.state.code == 2 and view.state.last_line == b"tail without newline"
+
+    console = _console()
+    console.print(dashboard.render())
+    rendered = console.file.getvalue()
+    assert "lint" in rendered and "tail without newline" in rendered and "KB" in rendered
+
+
+def test_mode_follows_env_and_terminal(monkeypatch):
+    monkeypatch.delenv("SHEMUL_DASHBOARD", raising=False)
+    assert dashboard_mode(_console()) == "plain"
+    assert dashboard_mode(Console(file=io.StringIO(), force_terminal=True)) == "live"
+    monkeypatch.setenv("SHEMUL_DASHBOARD", "off")
+    assert dashboard_mode(Console(file=io.StringIO(), force_terminal=True)) == "off"
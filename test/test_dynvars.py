@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from shemul.command import Command
+from shemul.dynvars import VarResolver
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base.resolve()
+
+
+def _counted(name: str, value: str) -> Dict[str, Any]:
+    return {"cmd": f"echo x >> {name}.count; echo {value}"}
+
+
+def _count(root: Path, name: str) -> int:
+    path = root / f"{name}.count"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="helpers use POSIX shell syntax")
+def test_only_referenced_vars_run_and_each_helper_runs_once():
+    temp = _temp_dir("dynvars_lazy")
+    try:
+        resolver = VarResolver(root=temp / "cache")
+        vars_map = {"SHA": _counted("sha", "abc123"), "HOST": _counted("host", "docker.local"), "TAG": "v1"}
+        command = Command("build", {"run": "build {{SHA}} {{TAG}}", "matrix": {"PY": ["3.11", "3.12"]}}, vars_map, {}, resolver, temp)
+
+        assert command.dynamic_refs() == {"SHA"}
+        assert [cell.command for cell in command.expand()] == ["build abc123 v1", "build abc123 v1"]
+        Command("again", {"run": "deploy {{SHA}}"}, vars_map, {}, resolver, temp).resolve()
+        assert _count(temp, "sha") == 1
+        assert _count(temp, "host") == 0
+        assert resolver.spawned == 1
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="helpers use POSIX shell syntax")
+def test_independent_vars_run_concurrently_and_dependents_wait():
+    temp = _temp_dir("dynvars_waves")
+    try:
+        vars_map = {
+            "A": {"cmd": "sleep 0.4; echo a"},
+            "B": {"cmd": "sleep 0.4; echo b"},
+            "AB": {"cmd": "echo {{A}}-{{B}}"},
+            "LOOP1": {"cmd": "echo {{LOOP2}}"},
+            "LOOP2": {"cmd": "echo {{LOOP1}}"},
+        }
+        resolver = VarResolver(root=temp / "cache")
+        started = time.perf_counter()
+        resolved = Command("show", {"run": "echo {{AB}}"}, vars_map, {}, resolver, temp).resolve()
+        assert resolved.command == "echo a-b"
+        assert time.perf_counter() - started < 0.75
+        with pytest.raises(ValueError, match="cycle"):
+            Command("loop", {"run": "{{LOOP1}}"}, vars_map, {}, resolver, temp).resolve()
+        with pytest.raises(ValueError, match="exited with 3"):
+            Command("bad", {"run": "{{X}}"}, {"X": {"cmd": "exit 3"}}, {}, resolver, temp).resolve()
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="helpers use POSIX shell syntax")
+def test_ttl_and_deps_cache_values_across_processes():
+    temp = _temp_dir("dynvars_cache")
+    try:
+        (temp / "HEAD").write_text("one", encoding="utf-8")
+        vars_map = {
+            "REF": {"cmd": "echo x >> ref.count; cat HEAD", "deps": ["HEAD"]},
+            "NOW": {"cmd": "echo x >> now.count; echo now", "ttl": 3600},
+        }
+
+        def resolve() -> str:
+            return Command("show", {"run": "{{REF}} {{NOW}}"}, vars_map, {}, VarResolver(root=temp / "cache"), temp).resolve().command
+
+        assert resolve() == "one now"
+        assert resolve() == "one now"
+        assert (_count(temp, "ref"), _count(temp, "now")) == (1, 1)
+
+        (temp / "HEAD").write_text("two", encoding="utf-8")
+        os.utime(temp / "HEAD", ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        assert resolve() == "two now"
+        assert (_count(temp, "ref"), _count(temp, "now")) == (2, 1)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_static_templating_keeps_sequential_substitution():
+    vars_map = {"GREETING": "hello {{WHO}}", "WHO": "world", "EMPTY": None}
+    envs = {"prod": {"HOST": "db.internal"}}
+    config = {"run": "echo {{GREETING}} {{EMPTY}} {{env.HOST}} {{MISSING}}", "env": "prod"}
+    resolved = Command("greet", config, vars_map, envs).resolve()
+    assert resolved.command == "echo hello world None db.internal {{MISSING}}"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="helpers use POSIX shell syntax")
+def test_dynamic_vars_reached_through_static_vars_are_resolved():
+    temp = _temp_dir("dynvars_nested")
+    try:
+        resolver = VarResolver(root=temp / "cache")
+        vars_map = {"IMAGE": "app:{{SHA}}", "SHA": _counted("sha", "abc123"), "HOST": _counted("host", "docker.local")}
+        command = Command("image", {"run": "docker build -t {{IMAGE}}"}, vars_map, {}, resolver, temp)
+
+        assert command.dynamic_refs() == {"SHA"}
+        assert command.resolve().command == "docker build -t app:abc123"
+        assert _count(temp, "host") == 0
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from shemul.command import Command
+from shemul.guard import ConfirmPolicy, Guard
+
+
+class _CountingGuard(Guard):
+    def __init__(self, policy: ConfirmPolicy, answer: bool) -> None:
+        super().__init__(policy)
+        self.answer = answer
+        self.prompts = []
+
+    def confirm(self, message: str) -> bool:
+        self.prompts.append(message)
+        return self.answer
+
+
+def _resolved(name: str, group: str = "core", **extra):
+    return Command(name, {"run": "true", "group": group, **extra}, {}, {}).resolve()
+
+
+def test_policy_from_env_combines_yes_assume_and_allow_lists(monkeypatch):
+    monkeypatch.setenv("SHEMUL_ASSUME", "no")
+    monkeypatch.setenv("SHEMUL_ALLOW", "db:*, group:quality")
+    policy = ConfirmPolicy.from_env(allow=["deploy"])
+    assert policy.assume is False
+    assert policy.allow == ["db:*", "group:quality", "deploy"]
+    assert ConfirmPolicy.from_env(yes=True).assume is True
+
+    guard = Guard(policy)
+    assert guard.decide(_resolved("db:reset", confirm=True)) is True
+    assert guard.decide(_resolved("lint", group="quality", danger=True)) is True
+    assert guard.decide(_resolved("deploy", confirm=True)) is True
+    assert guard.decide(_resolved("wipe", danger=True)) is False
+    assert guard.decide(_resolved("plain")) is True
+
+
+def test_non_interactive_refuses_without_prompting():
+    guard = _CountingGuard(ConfirmPolicy(interactive=False), answer=True)
+    assert guard.approve(_resolved("wipe", danger=True)) is False
+    assert guard.prompts == []
+
+
+def test_approve_all_prompts_once_per_command_before_running():
+    guard = _CountingGuard(ConfirmPolicy(interactive=True), answer=True)
+    cells = Command("deploy", {"run": "deploy {{R}}", "confirm": True, "matrix": {"R": ["eu", "us", "ap"]}}, {}, {}).expand()
+    other = _resolved("migrate", danger=True, confirm=True)
+    decisions = guard.approve_all([*cells, other])
+    assert all(decisions.values()) and len(decisions) == 4
+    assert len(guard.prompts) == 3
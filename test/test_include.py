@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from shemul.config import ConfigLoader
+
+
+SCHEMA_PATH = Path("src/shemul/schema.json")
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _write(path: Path, payload: dict) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload) + "\n", encoding="utf-8")
+    return path
+
+
+def test_include_merges_fragments_and_tracks_sources():
+    temp = _temp_dir("include_merge")
+    try:
+        root = _write(
+            temp / "shemul.json",
+            {"include": ["shemul.d/*.json"], "commands": {"build": {"run": "echo root"}}},
+        )
+        db = _write(temp / "shemul.d" / "db.json", {"commands": {"migrate": {"run": "echo migrate"}}})
+        _write(
+            temp / "shemul.d" / "web.json",
+            {"vars": {"PORT": 8000}, "commands": {"build": {"run": "echo web"}, "serve": {"run": "echo serve"}}},
+        )
+
+        config = ConfigLoader(SCHEMA_PATH).load(root)
+        assert config.commands["build"]["run"] == "echo root"
+        assert config.commands["migrate"]["run"] == "echo migrate"
+        assert config.vars["PORT"] == 8000
+        assert config.source_of("build") == root
+        assert config.source_of("migrate") == db
+        assert config.source_of("serve") == temp / "shemul.d" / "web.json"
+        assert "include" not in config.raw
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_extends_is_lower_precedence_than_includes():
+    temp = _temp_dir("include_extends")
+    try:
+        _write(temp / "base.json", {"commands": {"test": {"run": "echo base"}, "lint": {"run": "echo lint"}}})
+        _write(temp / "extra.json", {"commands": {"test": {"run": "echo extra"}}})
+        root = _write(temp / "shemul.json", {"extends": "base.json", "include": "extra.json"})
+
+        config = ConfigLoader(SCHEMA_PATH).load(root)
+        assert config.commands["test"]["run"] == "echo extra"
+        assert config.commands["lint"]["run"] == "echo lint"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_fragment_cache_revalidates_only_changed_files(monkeypatch):
+    temp = _temp_dir("include_cache")
+    try:
+        root = _write(temp / "shemul.json", {"include": "parts/*.json"})
+        first = _write(temp / "parts" / "a.json", {"commands": {"a": {"run": "echo a"}}})
+        second = _write(temp / "parts" / "b.json", {"commands": {"b": {"run": "echo b"}}})
+
+        loader = ConfigLoader(SCHEMA_PATH)
+        loader.load(root)
+
+        reads: list[Path] = []
+        original = loader._read.__func__
+
+        def tracking_read(self, path, fragment):
+            key = (path.resolve(), fragment)
+            stat = path.stat()
+            cached = self._fragments.get(key)
+            if not cached or cached[0] != (stat.st_mtime_ns, stat.st_size):
+                reads.append(path)
+            return original(self, path, fragment)
+
+        monkeypatch.setattr(ConfigLoader, "_read", tracking_read)
+        _write(second, {"commands": {"b": {"run": "echo changed"}}})
+        stat = second.stat()
+        os.utime(second, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        config = loader.load(root)
+        assert config.commands["b"]["run"] == "echo changed"
+        assert reads == [second]
+        assert first not in reads
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_include_cycle_is_reported():
+    temp = _temp_dir("include_cycle")
+    try:
+        _write(temp / "a.json", {"include": "b.json", "commands": {"a": {"run": "echo a"}}})
+        _write(temp / "b.json", {"include": "a.json", "commands": {"b": {"run": "echo b"}}})
+        failed = False
+        try:
+            ConfigLoader(SCHEMA_PATH).load(temp / "a.json")
+        except ValueError:
+            failed = True
+        assert failed is True
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
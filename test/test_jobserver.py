@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import select
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+from shemul.command import ResolvedCommand
+from shemul.executor import ExecutionResult
+from shemul.jobserver import Jobserver, LoadLimits, LoadMonitor, SpawnGate
+from shemul.scheduler import Scheduler
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+class _ConcurrencyExecutor:
+    def __init__(self) -> None:
+        self.active = 0
+        self.peak = 0
+        self.envs = []
+        self._lock = threading.Lock()
+
+    def run(self, command, env=None, dry=False, cwd=None, sinks=None, pass_fds=()):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.envs.append(env)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        return ExecutionResult(command=command, return_code=0)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="jobserver pipes are POSIX only")
+def test_jobserver_server_and_client_share_tokens():
+    server = Jobserver.create(3, environ={"MAKEFLAGS": "s --jobserver-auth=fifo:/old"})
+    try:
+        assert server.makeflags == f"s -j3 --jobserver-auth={server.read_fd},{server.write_fd}"
+        client = Jobserver.from_env(server.env())
+        assert client is not None
+        first, second = client.acquire(), client.acquire()
+        assert first == second == b"+"
+        client.release(first)
+        assert server.acquire() == b"+"
+        client.close()
+    finally:
+        server.close()
+    assert Jobserver.from_env({"MAKEFLAGS": "-j4"}) is None
+
+
+@pytest.mark.skipif(os.name != "posix", reason="jobserver pipes are POSIX only")
+def test_acquire_waits_on_non_blocking_read_fd():
+    read_fd, write_fd = os.pipe()
+    try:
+        os.set_blocking(read_fd, False)
+        client = Jobserver(read_fd, write_fd, f"-j2 --jobserver-auth={read_fd},{write_fd}")
+        timer = threading.Timer(0.1, lambda: os.write(write_fd, b"+"))
+        timer.start()
+        began = time.perf_counter()
+        assert client.acquire() == b"+"
+        assert time.perf_counter() - began >= 0.05
+        timer.join()
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="jobserver pipes are POSIX only")
+def test_scheduler_respects_jobserver_budget():
+    executor = _ConcurrencyExecutor()
+    tasks = [ResolvedCommand(f"t{index}", "true", {}, False, False, "", "core") for index in range(6)]
+    with SpawnGate(Jobserver.create(2)) as gate:
+        results = Scheduler(executor, jobs=6, gate=gate).run(tasks)
+    assert [item.status for item in results] == ["ok"] * 6
+    assert executor.peak == 2
+    assert all("--jobserver-auth=" in env["MAKEFLAGS"] for env in executor.envs)
+
+
+def test_load_monitor_reads_proc_files():
+    temp = _temp_dir("jobserver_proc")
+    try:
+        (temp / "pressure").mkdir()
+        (temp / "loadavg").write_text("1.50 1.00 0.50 2/300 1234\n", encoding="utf-8")
+        (temp / "meminfo").write_text("MemTotal: 1000 kB\nMemFree: 100 kB\nMemAvailable: 400 kB\n", encoding="utf-8")
+        (temp / "pressure" / "cpu").write_text("some avg10=12.00 avg60=5.00 avg300=1.00 total=1\n", encoding="utf-8")
+        assert LoadMonitor(LoadLimits(max_load=2.0), proc=temp).admit() is True
+        assert LoadMonitor(LoadLimits(max_load=1.0), proc=temp).admit() is False
+        assert LoadMonitor(LoadLimits(max_load=2.0, min_memory=0.5), proc=temp).admit() is False
+        assert LoadMonitor(LoadLimits(max_load=2.0, max_pressure=10.0), proc=temp).admit() is False
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+class _ThrottledMonitor:
+    def __init__(self, jobserver: Jobserver, refusals: int) -> None:
+        self.jobserver = jobserver
+        self.refusals = refusals
+        self.throttled = 0
+        self.token_free = []
+
+    def admit(self) -> bool:
+        self.token_free.append(bool(select.select([self.jobserver.read_fd], [], [], 0)[0]))
+        if self.refusals:
+            self.refusals -= 1
+            return False
+        return True
+
+
+@pytest.mark.skipif(os.name != "posix", reason="jobserver pipes are POSIX only")
+def test_throttled_task_does_not_hold_a_jobserver_token():
+    jobserver = Jobserver.create(2)
+    monitor = _ThrottledMonitor(jobserver, refusals=2)
+    with SpawnGate(jobserver, monitor) as gate:
+        first = gate.acquire()
+        second = gate.acquire()
+        assert monitor.token_free == [True, True, True]
+        assert monitor.throttled == 2
+        gate.release(second)
+        gate.release(first)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import shutil
+import uuid
+from pathlib import Path
+
+import jsonschema
+
+from shemul.config import ConfigLoader, ShemulConfig
+from shemul.lazy import LazyCommands, split_commands
+
+
+SCHEMA_PATH = Path("src/shemul/schema.json")
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def test_split_commands_indexes_byte_offsets():
+    payload = {
+        "name": "demo",
+        "vars": {"API": "api", "LIST": [1, {"x": "}"}]},
+        "commands": {
+            "plain": {"run": "echo {{API}}", "desc": "a \"quoted\" } brace"},
+            "we\"ird": {"run": "echo [x]"},
+        },
+        "runtime": "generic",
+    }
+    data = json.dumps(payload, indent=2).encode("utf-8")
+    top, pending = split_commands(data, Path("shemul.json"))
+
+    assert top["commands"] == {}
+    assert top["vars"] == payload["vars"]
+    assert top["runtime"] == "generic"
+    assert pending is not None
+    assert list(pending) == ["plain", "we\"ird"]
+    for name, entry in pending.items():
+        assert json.loads(data[entry.start:entry.end]) == payload["commands"][name]
+
+
+def test_lazy_load_decodes_only_requested_command():
+    temp = _temp_dir("lazy_load")
+    try:
+        path = temp / "shemul.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "vars": {"API": "api"},
+                    "commands": {
+                        "good": {"run": "echo {{API}}"},
+                        "broken": {"run": 42},
+                    },
+                }
+            ),
+            encoding="utf-8",
+        )
+
+        config = ConfigLoader(SCHEMA_PATH, lazy=True).load(path)
+        commands = config.commands
+        assert isinstance(commands, LazyCommands)
+        assert "broken" in commands
+        assert commands.pending() == 2
+        assert commands["good"]["run"] == "echo {{API}}"
+        assert commands.pending() == 1
+        assert config.vars["API"] == "api"
+
+        failed = False
+        try:
+            commands["broken"]
+        except jsonschema.ValidationError as exc:
+            failed = True
+            assert list(exc.path)[:2] == ["commands", "broken"]
+        assert failed is True
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_merge_keeps_lazy_tables_lazy():
+    temp = _temp_dir("lazy_merge")
+    try:
+        path = temp / "shemul.json"
+        path.write_text(json.dumps({"commands": {"hello": {"run": "echo project"}}}), encoding="utf-8")
+        loader = ConfigLoader(SCHEMA_PATH, lazy=True)
+        project = loader.load(path)
+        global_cfg = ShemulConfig(
+            raw={"commands": {"hello": {"run": "echo global"}, "gonly": {"run": "echo gonly"}}},
+            path=Path("global.json"),
+        )
+
+        merged = loader.merge(project, global_cfg)
+        assert merged is not None
+        assert isinstance(merged.commands, LazyCommands)
+        assert merged.commands["hello"]["run"] == "echo project"
+        assert merged.commands["gonly"]["run"] == "echo gonly"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from shemul.command import ResolvedCommand
+from shemul.locks import CommandLock
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base.resolve()
+
+
+def _task(lock: str) -> ResolvedCommand:
+    return replace(ResolvedCommand("build", "make", {}, False, False, "", "core"), lock=lock, inputs=["src/*.c"])
+
+
+def _slow(code: int, started: threading.Event):
+    def execute(sinks):
+        started.set()
+        for index in range(3):
+            for sink in sinks or []:
+                sink.write(f"line {index}\n".encode())
+            time.sleep(0.1)
+        for sink in sinks or []:
+            sink.close(code)
+        return code
+
+    return execute
+
+
+@pytest.mark.skipif(os.name != "posix", reason="command locks use flock")
+def test_second_share_invocation_attaches_to_first_run():
+    temp = _temp_dir("locks_share")
+    try:
+        leader_out, follower_out = [], []
+        started = threading.Event()
+        results = {}
+
+        def lead() -> None:
+            results["leader"] = CommandLock(temp, leader_out.append).run(_task("share"), None, _slow(4, started))
+
+        thread = threading.Thread(target=lead)
+        thread.start()
+        started.wait(5)
+        follower = CommandLock(temp, follower_out.append).run(_task("share"), None, lambda sinks: pytest.fail("ran twice"))
+        thread.join()
+
+        assert results["leader"] == ("failed", 4)
+        assert follower == ("shared", 4)
+        assert b"".join(leader_out) == b"line 0\nline 1\nline 2\n"
+        assert b"".join(follower_out).endswith(b"line 0\nline 1\nline 2\n")
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="command locks use flock")
+def test_skip_and_wait_modes():
+    temp = _temp_dir("locks_modes")
+    try:
+        started = threading.Event()
+        thread = threading.Thread(target=lambda: CommandLock(temp, lambda data: None).run(_task("skip"), None, _slow(0, started)))
+        thread.start()
+        started.wait(5)
+        assert CommandLock(temp, lambda data: None).run(_task("skip"), None, lambda sinks: 9) == ("skipped", 0)
+        thread.join()
+
+        started.clear()
+        thread = threading.Thread(target=lambda: CommandLock(temp, lambda data: None).run(_task("wait"), None, _slow(0, started)))
+        thread.start()
+        started.wait(5)
+        began = time.perf_counter()
+        assert CommandLock(temp, lambda data: None).run(_task("wait"), None, lambda sinks: 2) == ("failed", 2)
+        assert time.perf_counter() - began >= 0.15
+        thread.join()
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_lock_key_follows_command_and_inputs():
+    temp = _temp_dir("locks_key")
+    try:
+        (temp / "src").mkdir()
+        (temp / "src" / "main.c").write_text("int main;", encoding="utf-8")
+        locks = CommandLock(temp, lambda data: None)
+        first = locks.key(_task("share"))
+        assert locks.key(_task("share")) == first
+        assert locks.key(replace(_task("share"), command="make all")) != first
+        (temp / "src" / "util.c").write_text("", encoding="utf-8")
+        assert locks.key(_task("share")) != first
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import gzip
+import os
+import re
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+from shemul.command import ResolvedCommand
+from shemul.executor import Executor
+from shemul.logs import LogArchive
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _resolved(name: str) -> ResolvedCommand:
+    return ResolvedCommand(name, "true", {}, False, False, "", "core")
+
+
+def _record(archive: LogArchive, name: str, chunks, code: int = 0, root: Path = Path("/project")) -> None:
+    sink = archive.sink(_resolved(name), root)
+    for chunk in chunks:
+        sink.write(chunk)
+    sink.close(code)
+
+
+def test_runs_are_indexed_and_searchable_per_command():
+    temp = _temp_dir("logs_index")
+    try:
+        archive = LogArchive(temp)
+        _record(archive, "build", [b"compiling\nERROR: mis", b"sing header\ndone\n"], code=2)
+        _record(archive, "test", [b"ERROR in test\n"])
+        _record(archive, "build", [b"compiling\ndone\n"], root=Path("/other"))
+
+        builds = archive.runs("build", root=Path("/project"))
+        assert [(item.name, item.code, item.size) for item in builds] == [("build", 2, 37)]
+        assert b"".join(archive.chunks(builds[0])) == b"compiling\nERROR: missing header\ndone\n"
+        assert len(archive.runs("build")) == 2
+
+        matches = [line for _, line in archive.grep(builds, re.compile("ERROR"))]
+        assert matches == ["ERROR: missing header"]
+
+        with gzip.open(temp / builds[0].segment) as handle:
+            assert handle.read().count(b"compiling") == 2
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_segments_rotate_and_oldest_are_evicted_over_budget():
+    temp = _temp_dir("logs_budget")
+    try:
+        archive = LogArchive(temp, budget=4096, segment_size=1024)
+        for index in range(12):
+            _record(archive, "noisy", [os.urandom(600).hex().encode() + f" run {index}\n".encode()])
+
+        segments = sorted(temp.glob("segment-*.gz"))
+        assert len(segments) > 1
+        assert segments[0].name != "segment-00000001.gz"
+        assert archive.disk_usage() <= 4096 + 2048
+        runs = archive.runs("noisy")
+        assert runs and runs[-1].segment == segments[-1].name
+        assert [line for _, line in archive.grep(runs[-1:], re.compile("run 11$"))]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_executor_streams_into_archive():
+    temp = _temp_dir("logs_exec")
+    try:
+        archive = LogArchive(temp)
+        sink = archive.sink(_resolved("hello"), Path.cwd())
+        result = Executor().run(f'"{sys.executable}" -c "print(\'hi there\')"', sinks=[sink])
+        assert result.return_code == 0
+        (record,) = archive.runs("hello")
+        assert b"".join(archive.chunks(record)).strip() == b"hi there"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
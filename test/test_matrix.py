@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+from shemul.app import App
+from shemul.command import Command
+from shemul.executor import Executor
+from shemul.scheduler import Scheduler
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def test_matrix_expands_cells_through_template():
+    cmd = Command(
+        "test",
+        {
+            "run": "docker compose exec {{SERVICE}} pytest --py {{PY}} -f {{env.compose}}",
+            "env": "local",
+            "matrix": {"SERVICE": ["api", "worker"], "PY": ["3.11", "3.12"]},
+        },
+        {"SERVICE": "default"},
+        {"local": {"compose": "compose.yml"}},
+    )
+    cells = cmd.expand()
+    assert [cell.name for cell in cells] == [
+        "test[SERVICE=api,PY=3.11]",
+        "test[SERVICE=api,PY=3.12]",
+        "test[SERVICE=worker,PY=3.11]",
+        "test[SERVICE=worker,PY=3.12]",
+    ]
+    assert cells[1].command == "docker compose exec api pytest --py 3.12 -f compose.yml"
+    assert cells[2].cell == {"SERVICE": "worker", "PY": "3.11"}
+
+
+def test_scheduler_runs_cells_in_parallel_and_skips_up_to_date():
+    temp = _temp_dir("matrix_run")
+    try:
+        (temp / "src.txt").write_text("input\n", encoding="utf-8")
+        cmd = Command(
+            "build",
+            {
+                "run": f'"{sys.executable}" -c "open(r\'{temp}/out-{{{{T}}}}.txt\', \'w\').write(\'{{{{T}}}}\')"',
+                "matrix": {"T": ["a", "b", "c"]},
+                "inputs": ["src.txt"],
+                "outputs": ["out-{{T}}.txt"],
+            },
+            {},
+            {},
+        )
+        (temp / "out-b.txt").write_text("b", encoding="utf-8")
+        src = temp / "src.txt"
+        stat = src.stat()
+        os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10_000_000_000))
+
+        results = Scheduler(Executor(), jobs=3, root=temp).run(cmd.expand())
+        assert [item.status for item in results] == ["ok", "up-to-date", "ok"]
+        assert (temp / "out-a.txt").read_text(encoding="utf-8") == "a"
+        assert (temp / "out-c.txt").read_text(encoding="utf-8") == "c"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_up_to_date_checks_use_project_root_from_subdirectory(monkeypatch):
+    temp = _temp_dir("matrix_root").resolve()
+    try:
+        monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+        marker = temp / "ran.txt"
+        config = {
+            "commands": {
+                "build": {"run": f"echo build >> '{marker}'", "inputs": ["src/*.txt"], "outputs": ["out/*.bin"]},
+                "cells": {
+                    "run": f"echo {{{{v}}}} >> '{marker}'",
+                    "matrix": {"v": ["a", "b"]},
+                    "inputs": ["src/*.txt"],
+                    "outputs": ["out/*.bin"],
+                },
+            }
+        }
+        (temp / "shemul.json").write_text(json.dumps(config), encoding="utf-8")
+        (temp / "src").mkdir()
+        (temp / "src" / "a.txt").write_text("a", encoding="utf-8")
+        (temp / "out").mkdir()
+        (temp / "out" / "a.bin").write_bytes(b"a")
+        stat = (temp / "src" / "a.txt").stat()
+        os.utime(temp / "out" / "a.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        (temp / "nested").mkdir()
+        monkeypatch.chdir(temp / "nested")
+
+        app = App()
+        loaded = app.loader.load(temp / "shemul.json")
+        assert app.run_command(loaded, "build", dry=False, trace=False, extra_args=[], root=temp) == 0
+        assert app.run_command(loaded, "cells", dry=False, trace=False, extra_args=[], jobs=1, root=temp) == 0
+        assert not marker.exists()
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from shemul.app import App
+from shemul.command import Command
+from shemul.config import ConfigLoader
+from shemul.memo import ResolveCache
+
+
+SCHEMA = Path(__file__).resolve().parent.parent / "src" / "shemul" / "schema.json"
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _write(path: Path, value: str) -> None:
+    data = {"vars": {"TAG": value}, "commands": {"up": {"run": "deploy {{TAG}}"}, "down": {"run": "stop"}}}
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def _resolver(config, name, calls):
+    def resolve():
+        calls.append(name)
+        return Command(name, config.commands[name], config.vars, config.envs).resolve()
+
+    return resolve
+
+
+def test_resolve_cache_persists_across_instances_and_invalidates_on_edit():
+    temp = _temp_dir("memo_persist")
+    try:
+        path = temp / "shemul.json"
+        _write(path, "v1")
+        config = ConfigLoader(SCHEMA).load(path)
+        calls = []
+        first = ResolveCache(root=temp / "memo")
+        assert first.get(config, "up", _resolver(config, "up", calls)).command == "deploy v1"
+        assert first.get(config, "up", _resolver(config, "up", calls)).command == "deploy v1"
+        assert not (temp / "memo").exists()
+        first.flush()
+        second = ResolveCache(root=temp / "memo")
+        assert second.get(config, "up", _resolver(config, "up", calls)).command == "deploy v1"
+        assert calls == ["up"]
+        assert (first.hits, first.misses, second.hits) == (1, 1, 1)
+
+        _write(path, "v2")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        config = ConfigLoader(SCHEMA).load(path)
+        assert second.get(config, "up", _resolver(config, "up", calls)).command == "deploy v2"
+        assert calls == ["up", "up"]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_resolve_cache_evicts_least_recently_used():
+    temp = _temp_dir("memo_lru")
+    try:
+        path = temp / "shemul.json"
+        _write(path, "v1")
+        config = ConfigLoader(SCHEMA).load(path)
+        calls = []
+        cache = ResolveCache(capacity=1, persist=False)
+        cache.get(config, "up", _resolver(config, "up", calls))
+        cache.get(config, "down", _resolver(config, "down", calls))
+        cache.get(config, "up", _resolver(config, "up", calls))
+        assert calls == ["up", "down", "up"]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_resolve_cache_only_writes_new_entries_that_were_stored():
+    temp = _temp_dir("memo_store")
+    try:
+        path = temp / "shemul.json"
+        _write(path, "v1")
+        config = ConfigLoader(SCHEMA).load(path)
+        calls = []
+        cache = ResolveCache(root=temp / "memo")
+        cache.get(config, "up", _resolver(config, "up", calls), store=False)
+        cache.flush()
+        assert not (temp / "memo").exists()
+
+        cache.get(config, "down", _resolver(config, "down", calls))
+        cache.flush()
+        written = sorted((temp / "memo").rglob("*.json"))
+        assert len(written) == 1
+        stamp = written[0].stat().st_mtime_ns
+
+        reader = ResolveCache(root=temp / "memo")
+        reader.get(config, "down", _resolver(config, "down", calls))
+        reader.flush()
+        assert written[0].stat().st_mtime_ns == stamp
+        assert calls == ["up", "down"]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_dry_runs_reuse_the_on_disk_memo(monkeypatch):
+    temp = _temp_dir("memo_dry")
+    try:
+        monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+        path = temp / "shemul.json"
+        _write(path, "v1")
+        first = App()
+        assert first.run_command(first.loader.load(path), "up", dry=True, trace=False, extra_args=[], root=temp) == 0
+        first.close()
+        assert list((temp / "cache" / "resolved").rglob("*.json"))
+
+        second = App()
+        assert second.run_command(second.loader.load(path), "up", dry=True, trace=False, extra_args=[], root=temp) == 0
+        second.close()
+        assert (second.resolved.hits, second.resolved.misses) == (1, 0)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
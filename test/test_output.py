@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sys
+
+from shemul.executor import Executor
+from shemul.output import OutputFilter, OutputOptions
+
+
+def _collect(options: OutputOptions):
+    written = []
+    return OutputFilter(options, written.append), written
+
+
+def test_filter_applies_include_and_exclude_across_chunk_boundaries():
+    output, written = _collect(OutputOptions(include=["ERROR|WARN"], exclude=["ignored"]))
+    for chunk in [b"info start\nWA", b"RN disk low\nERROR ignored here\nER", b"ROR boom\ntrailing"]:
+        output.write(chunk)
+    output.close(0)
+    assert b"".join(written) == b"WARN disk low\nERROR boom\n"
+    assert output.bytes_in == 63
+
+
+def test_quiet_prints_tail_only_on_failure():
+    output, written = _collect(OutputOptions(quiet=True, tail=2))
+    output.write(b"one\ntwo\nthree\n")
+    output.close(0)
+    assert written == []
+
+    output, written = _collect(OutputOptions(quiet=True, tail=2))
+    output.write(b"one\ntwo\nthree\n")
+    output.close(3)
+    assert b"".join(written).endswith(b"two\nthree\n")
+
+
+def test_summary_keeps_last_matches_and_streams_from_executor():
+    options = OutputOptions.from_config({"summary": [r"^\d+ passed"], "summary_limit": 1})
+    assert options is not None
+    output, written = _collect(options)
+    script = "print('1 passed'); print('noise'); print('2 passed')"
+    result = Executor().run(f'"{sys.executable}" -c "{script}"', sinks=[output])
+    assert result.return_code == 0
+    assert list(output.summary) == [b"2 passed"]
+    assert b"noise" in b"".join(written)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+from shemul.command import Command
+from shemul.pipeline import Pipeline, Stage, pipefail
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base.resolve()
+
+
+def _python(code: str) -> str:
+    return f'"{sys.executable}" -c "{code}"'
+
+
+@pytest.mark.skipif(os.name != "posix", reason="pipelines use POSIX pipes")
+def test_stages_stream_through_pipes_with_counts_and_tee():
+    temp = _temp_dir("pipeline_tee")
+    try:
+        stages = [
+            Stage("export", _python("import sys; sys.stdout.write('row\\n' * 50000)")),
+            Stage("transform", _python("import sys; sys.stdout.write(sys.stdin.read().upper())"), tee=temp / "mid.txt"),
+            Stage("load", _python("import sys; open('out.txt', 'w').write(str(len(sys.stdin.read())))")),
+        ]
+        results = Pipeline(stages, cwd=temp).run()
+        assert [item.return_code for item in results] == [0, 0, 0]
+        assert [item.bytes_out for item in results] == [None, 200000, None]
+        assert (temp / "out.txt").read_text() == "200000"
+        assert (temp / "mid.txt").read_text() == "ROW\n" * 50000
+        assert results[0].transfer == "pipe"
+        assert results[1].transfer in {"splice", "copy"}
+        assert pipefail(results) == 0
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="pipelines use POSIX pipes")
+def test_tee_creates_parent_and_reports_unwritable_target():
+    temp = _temp_dir("pipeline_tee_dirs")
+    try:
+        stages = [Stage("export", "echo rows", tee=temp / "new" / "dir" / "raw.txt"), Stage("load", "cat > out.txt")]
+        results = Pipeline(stages, cwd=temp).run()
+        assert [item.return_code for item in results] == [0, 0]
+        assert (temp / "new" / "dir" / "raw.txt").read_text() == "rows\n"
+
+        (temp / "blocked").write_text("", encoding="utf-8")
+        stages = [Stage("export", "echo rows", tee=temp / "blocked" / "raw.txt"), Stage("load", "cat > out.txt")]
+        results = Pipeline(stages, cwd=temp).run()
+        assert results[0].return_code != 0
+        assert "blocked" in results[0].error
+        assert pipefail(results) != 0
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="pipelines use POSIX pipes")
+def test_pipefail_reports_rightmost_failing_stage():
+    stages = [
+        Stage("first", "echo data; exit 3"),
+        Stage("middle", "cat >/dev/null; exit 5"),
+        Stage("last", "cat"),
+    ]
+    results = Pipeline(stages).run()
+    assert [item.return_code for item in results] == [3, 5, 0]
+    assert pipefail(results) == 5
+
+
+def test_pipe_commands_resolve_to_stage_list():
+    commands = {
+        "export": {"run": "pg_dump {{DB}}"},
+        "load": {"run": "psql staging"},
+        "etl": {"pipe": ["export", {"command": "load", "tee": "{{OUT}}/raw.ndjson"}]},
+        "broken": {"pipe": ["export", "missing"]},
+    }
+    vars_map = {"OUT": "build", "DB": "app"}
+    resolved = Command("etl", commands["etl"], vars_map, {}, commands=commands).resolve()
+    assert resolved.command == ""
+    assert resolved.stages == [
+        {"name": "export", "command": "pg_dump app", "tee": None},
+        {"name": "load", "command": "psql staging", "tee": "build/raw.ndjson"},
+    ]
+    with pytest.raises(ValueError, match="unknown command missing"):
+        Command("broken", commands["broken"], vars_map, {}, commands=commands).resolve()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import pytest
+
+from shemul.app import App
+from shemul.executor import Executor
+from shemul.pool import ShellPool, pool_supported
+
+
+pytestmark = pytest.mark.skipif(not pool_supported(), reason="warm shell pool requires a POSIX shell")
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def test_pool_reports_exit_status_and_isolates_state():
+    temp = _temp_dir("pool_state")
+    try:
+        with ShellPool(1) as pool:
+            assert pool.run("exit 3") == 3
+            assert pool.run("true") == 0
+            assert pool.run("cd /; export LEAK=1; FOO=bar") == 0
+            out = temp / "out.txt"
+            assert pool.run(f'echo "$LEAK:$(pwd)" > "{out.resolve()}"', cwd=temp.resolve()) == 0
+            assert out.read_text(encoding="utf-8").strip() == f":{temp.resolve()}"
+            assert pool.run("printf 'multi\\nline\\n' >/dev/null\nexit 5") == 5
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_pool_applies_env_and_recovers_from_dead_worker():
+    temp = _temp_dir("pool_env")
+    try:
+        out = (temp / "env.txt").resolve()
+        with ShellPool(1) as pool:
+            env = {key: value for key, value in os.environ.items() if key != "HOME"}
+            env["SHEMUL_POOL_TEST"] = "it's set"
+            assert pool.run(f'echo "$SHEMUL_POOL_TEST|${{HOME:-unset}}" > "{out}"', env=env) == 0
+            assert out.read_text(encoding="utf-8").strip() == "it's set|unset"
+
+            assert pool.run("kill -9 $$") != 0
+            assert Executor(pool=pool).run("exit 7").return_code == 7
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_app_close_shuts_down_pool_workers(monkeypatch):
+    monkeypatch.setenv("SHEMUL_POOL", "2")
+    app = App()
+    assert app.batch_executor().run("true").return_code == 0
+    processes = [worker.process for worker in app.pool._workers]
+    assert len(processes) == 2
+    app.close()
+    assert app.pool is None
+    assert all(process.poll() is not None for process in processes)
+    app.close()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+import shutil
+import uuid
+from pathlib import Path
+
+from shemul.config import ConfigLoader
+from shemul.scaffold import expand_targets, scaffold_many
+from shemul.template import suggest_template
+
+
+SCHEMA = Path(__file__).resolve().parent.parent / "src" / "shemul" / "schema.json"
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def test_suggest_template_detects_stack():
+    temp = _temp_dir("scaffold_detect")
+    try:
+        web = temp / "web"
+        web.mkdir()
+        (web / "package.json").write_text(json.dumps({"dependencies": {"next": "14", "react": "18"}}), encoding="utf-8")
+        api = temp / "api"
+        api.mkdir()
+        (api / "requirements.txt").write_text("fastapi==0.110\nuvicorn\n", encoding="utf-8")
+        (api / "compose.yml").write_text("services: {}\n", encoding="utf-8")
+        assert suggest_template(web) == "nextjs-frontend"
+        assert suggest_template(api) == "docker-fastapi-backend"
+        assert suggest_template(temp) == "none"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_scaffold_many_writes_validated_configs_and_skips_existing():
+    temp = _temp_dir("scaffold_bulk")
+    try:
+        for name in ["svc-a", "svc-b", "svc-c"]:
+            (temp / name).mkdir()
+        (temp / "svc-b" / "pyproject.toml").write_text('[project]\ndependencies = ["django"]\n', encoding="utf-8")
+        (temp / "svc-c" / "shemul.json").write_text("{}", encoding="utf-8")
+        (temp / "notes.txt").write_text("not a dir", encoding="utf-8")
+
+        roots = expand_targets(["svc-*", "svc-a", "*.txt"], temp)
+        assert [root.name for root in roots] == ["svc-a", "svc-b", "svc-c"]
+
+        results = scaffold_many(roots, ConfigLoader(SCHEMA).validate)
+        assert [(item.path.parent.name, item.template, item.status) for item in results] == [
+            ("svc-a", "none", "created"),
+            ("svc-b", "django-drf-backend", "created"),
+            ("svc-c", "-", "skipped"),
+        ]
+        config = json.loads((temp / "svc-b" / "shemul.json").read_text(encoding="utf-8"))
+        assert config["name"] == "svc-b" and "migrate:up" in config["commands"]
+        assert (temp / "svc-c" / "shemul.json").read_text(encoding="utf-8") == "{}"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+from shemul.config import ConfigLoader
+from shemul.session import ConfigSession
+from shemul.watch import InotifyWatcher, PollingWatcher
+
+
+SCHEMA = Path(__file__).resolve().parent.parent / "src" / "shemul" / "schema.json"
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _write(path: Path, commands) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    previous = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(json.dumps({"commands": {name: {"run": run} for name, run in commands.items()}}), encoding="utf-8")
+    stat = path.stat()
+    if stat.st_mtime_ns <= previous:
+        os.utime(path, ns=(stat.st_atime_ns, previous + 1_000_000))
+
+
+def test_session_reloads_only_changed_scope_and_remerges():
+    temp = _temp_dir("session_reload")
+    try:
+        project = temp / "project" / "shemul.json"
+        global_path = temp / "global" / "shemul.json"
+        _write(project, {"up": "project up", "test": "pytest"})
+        _write(global_path, {"up": "global up", "doctor": "check"})
+        session = ConfigSession(ConfigLoader(SCHEMA), project.parent, global_path=global_path, watcher_factory=PollingWatcher)
+
+        assert session.refresh() is session.config
+        assert session.stats.reloads == 0
+
+        before = session.config
+        assert before is not None
+        _write(project, {"test": "pytest -q", "lint": "ruff"})
+        config = session.refresh()
+        assert config is not None
+        assert dict(before.commands) == {"up": {"run": "project up"}, "test": {"run": "pytest"}, "doctor": {"run": "check"}}
+        assert before.source_of("up") == project
+        assert dict(config.commands) == {"up": {"run": "global up"}, "doctor": {"run": "check"}, "test": {"run": "pytest -q"}, "lint": {"run": "ruff"}}
+        assert config.source_of("up") == global_path
+        assert (session.stats.project_reloads, session.stats.global_reloads) == (1, 0)
+
+        _write(global_path, {"up": "global up 2", "lint": "global lint"})
+        config = session.refresh()
+        assert config is not None
+        full = ConfigLoader(SCHEMA).merge(ConfigLoader(SCHEMA).load(project), ConfigLoader(SCHEMA).load(global_path))
+        assert full is not None
+        assert dict(config.commands) == dict(full.commands)
+        assert (session.stats.project_reloads, session.stats.global_reloads) == (1, 1)
+        assert "Reloads: 2" in session.stats.describe()
+        session.close()
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_atomic_replace_and_include_dir_changes():
+    temp = _temp_dir("session_inotify")
+    try:
+        config = temp / "shemul.json"
+        fragments = temp / "shemul.d"
+        _write(config, {"up": "a"})
+        fragments.mkdir()
+        watcher = InotifyWatcher([config], [fragments])
+        assert watcher.changed() == set()
+
+        replacement = temp / ".shemul.json.tmp"
+        _write(replacement, {"up": "b"})
+        os.replace(replacement, config)
+        (fragments / "db.json").write_text("{}", encoding="utf-8")
+        assert watcher.changed() == {config, fragments}
+        assert watcher.changed() == set()
+        watcher.close()
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import shutil
+import uuid
+from pathlib import Path
+
+from shemul.app import App
+from shemul.cli import _build_parser, dispatch
+from shemul.shell import Shell
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _shell(root: Path, lines):
+    feed = iter(lines)
+
+    def read(prompt: str) -> str:
+        try:
+            return next(feed)
+        except StopIteration:
+            raise EOFError
+
+    return Shell(App(), root, dispatch, _build_parser, input_func=read)
+
+
+def test_shell_keeps_session_and_applies_toggles(monkeypatch, capsys):
+    temp = _temp_dir("shell_toggles")
+    try:
+        monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+        monkeypatch.delenv("SHEMUL_ASSUME", raising=False)
+        config = {"commands": {"hello": {"run": "echo hello-from-shell"}, "deploy": {"run": "echo deploy", "confirm": True}}}
+        (temp / "shemul.json").write_text(json.dumps(config), encoding="utf-8")
+        shell = _shell(temp.resolve(), [":dry", "hello", "deploy &", ":dry", "hello &", ":wait", "missing"])
+        assert shell.run() == 0
+        out = capsys.readouterr().out
+        assert "INFO: echo hello-from-shell" in out
+        assert "Aborted: confirmation required" in out
+        assert "[1] done (exit 1): deploy" in out
+        assert "[2] done (exit 0): hello" in out
+        assert "Unknown command: missing" in out
+        assert shell.app.session is not None and shell.app.session.stats.checks == 4
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_shell_completion_uses_loaded_index(monkeypatch):
+    temp = _temp_dir("shell_complete")
+    try:
+        monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+        config = {"commands": {"db:up": {"run": "a"}, "db:down": {"run": "b"}, "lint": {"run": "c"}}}
+        (temp / "shemul.json").write_text(json.dumps(config), encoding="utf-8")
+        shell = _shell(temp.resolve(), [])
+        shell.app.open_session(temp.resolve())
+        assert [shell.complete("db", index) for index in range(3)] == ["db:down", "db:up", None]
+        assert shell.complete(":tr", 0) == ":trace"
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_shell_reports_failing_dynamic_vars(monkeypatch, capsys):
+    temp = _temp_dir("shell_dynvar_error")
+    try:
+        monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+        config = {"vars": {"SHA": {"cmd": "exit 3"}}, "commands": {"tag": {"run": "echo {{SHA}}"}}}
+        (temp / "shemul.json").write_text(json.dumps(config), encoding="utf-8")
+        shell = _shell(temp.resolve(), ["help tag", "resolve tag", "tag &", "tag"])
+        assert shell.run() == 1
+        out = capsys.readouterr().out
+        assert out.count("ERROR:") == 4
+        assert "[1] started" not in out
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from shemul.app import App
+from shemul.snapshot import SnapshotCommands
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _setup(temp: Path, monkeypatch) -> Path:
+    monkeypatch.setenv("SHEMUL_CACHE_HOME", str(temp / "cache"))
+    g_path = temp / "global" / "shemul.json"
+    g_path.parent.mkdir(parents=True, exist_ok=True)
+    g_path.write_text(
+        json.dumps({"vars": {"WHO": "global"}, "commands": {"hello": {"run": "echo {{WHO}}", "group": "demo"}}}),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("SHEMUL_GLOBAL_CONFIG_PATH", str(g_path))
+
+    project = temp / "project"
+    project.mkdir(parents=True, exist_ok=True)
+    (project / "shemul.json").write_text(
+        json.dumps({"commands": {"build": {"run": "make", "confirm": True}, "zeta": {"run": "echo z"}}}),
+        encoding="utf-8",
+    )
+    return project
+
+
+def test_compile_snapshot_serves_lookup_and_listing(monkeypatch):
+    temp = _temp_dir("snapshot_compile")
+    try:
+        project = _setup(temp, monkeypatch)
+        app = App()
+        target = app.compile(app.load_state(project, use_snapshot=False))
+        assert target is not None and target.exists()
+
+        state = app.load_state(project)
+        assert state.snapshot == target
+        assert isinstance(state.config.commands, SnapshotCommands)
+        assert list(state.config.commands) == ["build", "hello", "zeta"]
+        assert "missing" not in state.config.commands
+        assert state.config.commands["build"]["confirm"] is True
+        assert state.config.vars["WHO"] == "global"
+        assert state.config.source_of("hello") == temp / "global" / "shemul.json"
+        assert app.list_commands(state.config) == {"core": ["build", "zeta"], "demo": ["hello"]}
+        assert app.resolve(state.config, "hello").command == "echo global"
+        assert state.global_config is not None
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_stale_snapshot_falls_back_to_json(monkeypatch):
+    temp = _temp_dir("snapshot_stale")
+    try:
+        project = _setup(temp, monkeypatch)
+        app = App()
+        app.compile(app.load_state(project, use_snapshot=False))
+
+        config_path = project / "shemul.json"
+        config_path.write_text(json.dumps({"commands": {"fresh": {"run": "echo fresh"}}}), encoding="utf-8")
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        state = app.load_state(project)
+        assert state.snapshot is None
+        assert "fresh" in state.config.commands
+        assert "build" not in state.config.commands
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_snapshot_notices_new_fragment_in_nested_include_dir(monkeypatch):
+    temp = _temp_dir("snapshot_nested")
+    try:
+        project = _setup(temp, monkeypatch)
+        (project / "shemul.json").write_text(
+            json.dumps({"include": "services/**/shemul.json", "commands": {"build": {"run": "make"}}}), encoding="utf-8"
+        )
+        nested = project / "services" / "a" / "b"
+        nested.mkdir(parents=True)
+        app = App()
+        app.compile(app.load_state(project, use_snapshot=False))
+        assert app.load_state(project).snapshot is not None
+
+        parent = project / "services"
+        stamp = parent.stat().st_mtime_ns
+        (nested / "shemul.json").write_text(json.dumps({"commands": {"svc": {"run": "echo svc"}}}), encoding="utf-8")
+        os.utime(nested, ns=(stamp + 1_000_000, stamp + 1_000_000))
+        assert parent.stat().st_mtime_ns == stamp
+
+        state = app.load_state(project)
+        assert state.snapshot is None
+        assert "svc" in state.config.commands
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_snapshot_from_another_build_is_ignored(monkeypatch):
+    temp = _temp_dir("snapshot_build")
+    try:
+        project = _setup(temp, monkeypatch)
+        app = App()
+        target = app.compile(app.load_state(project, use_snapshot=False))
+        assert app.load_state(project).snapshot == target
+
+        monkeypatch.setattr("shemul.snapshot._build", lambda: (b"0.0.0".ljust(16, b"\0"), bytes(20)))
+        assert app.load_state(project).snapshot is None
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import json
 import shutil
 import uuid
 from pathlib import Path
 
-from shemul.template import resolve_template_key, write_template_file
+from shemul.template import build_template_config, list_templates, registry, resolve_template_key, write_template_file
 
 
 def test_template_alias_resolution():
@@ -41,3 +42,23 @@ def test_write_template_file_respects_force_flag():
         assert failed is True
     finally:
         shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_user_template_dirs_extend_and_override_bundled(monkeypatch):
+    temp_dir = Path(".tmp_test") / f"template_{uuid.uuid4().hex}"
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        index = {"templates": {"go-service": {"title": "Go Service", "aliases": ["golang", "fastapi"], "desc": "Go"}}}
+        (temp_dir / "index.json").write_text(json.dumps(index), encoding="utf-8")
+        (temp_dir / "go-service.json").write_text(json.dumps({"runtime": "go", "commands": {"test": {"run": "go test ./..."}}}), encoding="utf-8")
+        monkeypatch.setenv("SHEMUL_TEMPLATE_PATH", str(temp_dir))
+
+        assert [item["key"] for item in list_templates()][-1] == "go-service"
+        assert resolve_template_key("GoLang") == "go-service"
+        assert resolve_template_key("fastapi") == "go-service"
+        assert resolve_template_key("fastapi backend") == "fastapi-backend"
+        assert registry()._bodies == {}
+        assert build_template_config("go-service", "svc")["commands"] == {"test": {"run": "go test ./..."}}
+        assert list(registry()._bodies) == ["go-service"]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import shutil
+import uuid
+from pathlib import Path
+
+from shemul.command import ResolvedCommand
+from shemul.executor import ExecutionResult
+from shemul.scheduler import Scheduler
+from shemul.timings import TimingStore, plan
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+class _RecordingExecutor:
+    def __init__(self) -> None:
+        self.order = []
+
+    def run(self, command, env=None, dry=False, cwd=None, sinks=None):
+        self.order.append(command)
+        return ExecutionResult(command=command, return_code=0)
+
+
+def _task(name: str) -> ResolvedCommand:
+    return ResolvedCommand(name, f"run {name}", {}, False, False, "", "core")
+
+
+def test_timing_store_moving_average_persists_per_root():
+    temp = _temp_dir("timings_store")
+    try:
+        path = temp / "timings.json"
+        store = TimingStore(temp, path=path)
+        store.record("build", 10.0)
+        store.record("build", 20.0)
+        store.save()
+        reloaded = TimingStore(temp, path=path)
+        assert reloaded.estimate("build") == 13.0
+        assert reloaded.estimate("missing") is None
+        assert TimingStore(temp / "other", path=path).estimate("build") is None
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_scheduler_starts_longest_tasks_first():
+    temp = _temp_dir("timings_order")
+    try:
+        store = TimingStore(temp, path=temp / "timings.json")
+        for name, duration in [("lint", 1.0), ("unit", 5.0), ("integration", 480.0)]:
+            store.record(name, duration)
+        executor = _RecordingExecutor()
+        tasks = [_task("lint"), _task("unit"), _task("integration"), _task("new")]
+        results = Scheduler(executor, timings=store).run(tasks)
+        assert executor.order == ["run integration", "run new", "run unit", "run lint"]
+        assert [item.name for item in results] == ["lint", "unit", "integration", "new"]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_plan_packs_lanes_longest_first():
+    temp = _temp_dir("timings_plan")
+    try:
+        store = TimingStore(temp, path=temp / "timings.json")
+        for name, duration in [("a", 8.0), ("b", 3.0), ("c", 4.0), ("d", 2.0)]:
+            store.record(name, duration)
+        slots = {slot.name: slot for slot in plan(["a", "b", "c", "d"], store, 2)}
+        assert (slots["a"].lane, slots["a"].start, slots["a"].end) == (0, 0.0, 8.0)
+        assert (slots["c"].start, slots["b"].start, slots["d"].start) == (0.0, 4.0, 7.0)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
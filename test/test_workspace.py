@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+import uuid
+from pathlib import Path
+
+import pytest
+
+from shemul.workspace import ProjectIndex, changed_files, default_base, discover_projects, glob_pattern, touches_inputs
+
+
+def _temp_dir(prefix: str) -> Path:
+    base = Path(".tmp_test") / f"{prefix}_{uuid.uuid4().hex}"
+    base.mkdir(parents=True, exist_ok=True)
+    return base.resolve()
+
+
+def _project(root: Path) -> Path:
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "shemul.json").write_text('{"commands": {"test": {"run": "true"}}}', encoding="utf-8")
+    return root
+
+
+def test_index_maps_paths_to_nearest_project_and_caches_prefixes():
+    temp = _temp_dir("workspace_index")
+    try:
+        api = _project(temp / "apps" / "api")
+        nested = _project(api / "plugins" / "auth")
+        (temp / "docs").mkdir()
+        index = ProjectIndex(temp)
+
+        grouped = index.owners(
+            [
+                Path("apps/api/src/main.py"),
+                Path("apps/api/src/deep/util.py"),
+                Path("apps/api/plugins/auth/handler.py"),
+                Path("docs/readme.md"),
+                temp.parent / "outside.txt",
+            ]
+        )
+        assert sorted(grouped) == [api, nested]
+        assert len(grouped[api]) == 2
+        assert index._owners[api / "src"] == api
+        assert index._owners[temp / "docs"] is None
+        assert discover_projects(temp) == [api, nested]
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def test_inputs_limit_which_changes_count():
+    root = Path("/repo/web")
+    changed = [root / "README.md", root / "src" / "pages" / "index.ts"]
+    assert touches_inputs(["src/**/*.ts"], root, changed)
+    assert not touches_inputs(["src/*.ts", "package.json"], root, changed)
+    assert touches_inputs([], root, [root / "README.md"])
+    assert touches_inputs(["src/**"], root, [root / "shemul.json"])
+    assert glob_pattern("**/*.py").match("a/b/c.py")
+    assert glob_pattern("**/*.py").match("c.py")
+    assert not glob_pattern("*.py").match("a/c.py")
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_changed_files_includes_diff_and_untracked():
+    temp = _temp_dir("workspace_git")
+    try:
+        def git(*args: str) -> None:
+            subprocess.run(["git", *args], cwd=temp, check=True, capture_output=True)
+
+        git("init", "-q")
+        git("-c", "user.email=a@b", "-c", "user.name=a", "commit", "-q", "--allow-empty", "-m", "init")
+        _project(temp / "api")
+        git("add", "api/shemul.json")
+        git("-c", "user.email=a@b", "-c", "user.name=a", "commit", "-q", "-m", "api")
+        (temp / "api" / "shemul.json").write_text('{"commands": {}}', encoding="utf-8")
+        (temp / "api" / "new.py").write_text("", encoding="utf-8")
+
+        names = {path.relative_to(temp).as_posix() for path in changed_files(temp, "HEAD")}
+        assert names == {"api/shemul.json", "api/new.py"}
+        assert {path.name for path in changed_files(temp, "HEAD~1")} >= {"shemul.json", "new.py"}
+        with pytest.raises(ValueError):
+            changed_files(temp, "no-such-ref")
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_default_base_uses_merge_base_on_clean_branch():
+    temp = _temp_dir("workspace_base")
+    try:
+        def git(*args: str) -> str:
+            done = subprocess.run(["git", *args], cwd=temp, check=True, capture_output=True, text=True)
+            return done.stdout.strip()
+
+        identity = ["-c", "user.email=a@b", "-c", "user.name=a"]
+        git("init", "-q")
+        git("checkout", "-q", "-b", "feature")
+        git(*identity, "commit", "-q", "--allow-empty", "-m", "init")
+        assert default_base(temp) == ("HEAD", False)
+
+        git("branch", "main")
+        fork = git("rev-parse", "HEAD")
+        _project(temp / "api")
+        git("add", "api/shemul.json")
+        git(*identity, "commit", "-q", "-m", "api")
+
+        assert default_base(temp) == (fork, True)
+        names = {path.relative_to(temp).as_posix() for path in changed_files(temp, default_base(temp)[0])}
+        assert names == {"api/shemul.json"}
+
+        git("checkout", "-q", "main")
+        git("merge", "-q", "--ff-only", "feature")
+        assert default_base(temp) == (fork, True)
+        git("checkout", "-q", "feature")
+        assert default_base(temp) == (fork, True)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)